@@ -0,0 +1,64 @@
+"""
+Adaptive vs. fixed 400 DPI OCR on data/sample_cvs.
+
+Each mode runs in a fresh process so its peak RSS can be measured on its
+own; OCR runs serially (OCR_MAX_WORKERS=1) so both modes do the same work
+per page.
+
+    python -m benchmarks.bench_adaptive_ocr
+"""
+
+import multiprocessing
+import resource
+import sys
+import time
+
+from benchmarks.common import NO_OCR_CACHE, sample_cvs, setup_django
+
+
+def run_mode(adaptive):
+    setup_django()
+    from django.test.utils import override_settings
+
+    from core.ocr import extract_text_from_pdf
+
+    page_stats = []
+    start = time.perf_counter()
+    try:
+        with override_settings(
+            OCR_ADAPTIVE=adaptive, OCR_MAX_WORKERS=1, CACHES=NO_OCR_CACHE
+        ):
+            for path in sample_cvs():
+                extract_text_from_pdf(str(path), page_stats)
+    except Exception as e:
+        # pytesseract errors do not always survive pickling back to the parent.
+        raise RuntimeError(str(e)) from None
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, page_stats, peak_rss_mb
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    for label, adaptive in (("fixed 400 DPI", False), ("adaptive", True)):
+        with context.Pool(1) as pool:
+            elapsed, page_stats, peak_rss_mb = pool.apply(run_mode, (adaptive,))
+        pages = len(page_stats)
+        print(
+            f"{label:<14} {pages} pages in {elapsed:6.2f}s "
+            f"({pages / elapsed * 60:6.1f} pages/min), peak RSS {peak_rss_mb:7.1f} MB"
+        )
+        for stats in page_stats:
+            confidence = stats["confidence"]
+            print(
+                f"    page {stats['page']}: dpi={stats['dpi']} "
+                f"confidence={'n/a' if confidence is None else f'{confidence:.1f}'} "
+                f"seconds={stats['seconds']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
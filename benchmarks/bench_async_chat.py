@@ -0,0 +1,277 @@
+"""
+How many concurrent chat requests one ASGI worker serves while they wait on
+a slow LLM.
+
+Starts a single uvicorn worker on mysite.asgi's application in this
+process, against a throwaway test database with --rows candidates, and, in
+child processes, a FakeOpenAIServer that answers every chat completion
+after --latency seconds and the load generator. For each concurrency level,
+that many clients POST a question to the chat view at once, --rounds times
+in a row, through:
+
+  - sync: the previous handle_response, a sync view. Under ASGI, Django
+    runs each request's sync code on a thread of its own, so every chat
+    waiting on the LLM holds a thread.
+  - async: the current handle_response, which awaits the LLM on the event
+    loop.
+
+Throughput, median and p95 latency and the most threads the worker process
+had alive are reported per level. The LLM's concurrency limits and rate
+budgets are lifted, and sessions are kept in the local-memory cache (SQLite
+rejects concurrent session writes), so only the worker is measured. The
+worker, the LLM stub and the clients share the machine's CPUs; throughput
+is capped by them once the LLM wait is overlapped.
+
+    python -m benchmarks.bench_async_chat [--latency 0.5] [--levels 1 10 50 200]
+"""
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import socket
+import statistics
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+from django.urls import path
+
+from benchmarks.common import setup_django
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 1_000_000},
+    }
+}
+
+# Without CSRF and rate limiting, which would reject the load generator.
+MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+
+
+def legacy_handle_response(request):
+    """handle_response as a sync view, as it was before it became async."""
+    from django.shortcuts import redirect
+
+    from core.conversation import Conversation
+    from core.forms import PromptForm
+    from core.llm_client import llm_client
+    from core.openai_services import CHAT_MODEL
+    from core.views import _candidate_context
+
+    form = PromptForm(request.POST)
+    form.is_valid()
+    prompt = form.cleaned_data["prompt"]
+    conversation = Conversation(request.session)
+    messages = conversation.build_messages(prompt, _candidate_context(prompt))
+    response = llm_client().chat.completions.create(model=CHAT_MODEL, messages=messages)
+    conversation.record_reply(prompt, response.choices[0].message.content, messages)
+    return redirect("chat_prompt")
+
+
+def _urlpatterns():
+    from core.views import handle_response
+
+    return [
+        path("chat/", handle_response, name="chat_prompt"),
+        path("chat-sync/", legacy_handle_response),
+    ]
+
+
+# The worker's URLconf, filled in once Django is set up.
+URLCONF = types.ModuleType("bench_async_chat_urls")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(port):
+    import uvicorn
+
+    from mysite.asgi import application
+
+    config = uvicorn.Config(
+        application,
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        lifespan="off",
+        backlog=4096,
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def run_fake_llm(latency, pipe):
+    """
+    Serves a FakeOpenAIServer in a child process: sends its base_url, waits
+    for a message to stop, then sends the most requests it had in flight.
+    """
+    from benchmarks.fake_openai import FakeOpenAIServer
+
+    with FakeOpenAIServer(latency=latency) as server:
+        pipe.send(server.base_url)
+        pipe.recv()
+        pipe.send(server.max_in_flight)
+
+
+class ThreadPeak:
+    """Samples threading.active_count() in the background, keeping the max."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+
+def run_load(url, concurrency, rounds):
+    return asyncio.run(chat_load(url, concurrency, rounds))
+
+
+async def chat_load(url, concurrency, rounds):
+    """
+    Runs `concurrency` clients that each send `rounds` chat POSTs in a row,
+    with their own session. Returns (requests per second, latencies,
+    status codes).
+    """
+    import httpx
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async def user(client, i):
+        timings, statuses = [], []
+        for turn in range(rounds):
+            question = f"Who knows Python? (user {i}, turn {turn})"
+            started = time.perf_counter()
+            response = await client.post(url, data={"prompt": question})
+            timings.append(time.perf_counter() - started)
+            statuses.append(response.status_code)
+        return timings, statuses
+
+    # One client (cookie jar) per user, built before timing starts; the
+    # URLs are plain HTTP, so skip loading CA certificates for each one.
+    clients = [
+        httpx.AsyncClient(limits=limits, timeout=None, verify=False)
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(user(c, i) for i, c in enumerate(clients)))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        await client.aclose()
+    latencies = [t for timings, _ in results for t in timings]
+    statuses = {s for _, codes in results for s in codes}
+    return len(latencies) / elapsed, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from core.llm_client import reset_llm_clients
+    from core.models import Candidate
+
+    URLCONF.urlpatterns = _urlpatterns()
+    # The LLM stub and the load generator run in their own processes so
+    # that the worker has this interpreter (and its GIL) to itself.
+    spawn = multiprocessing.get_context("spawn")
+    llm_pipe, child_pipe = spawn.Pipe()
+    llm = spawn.Process(target=run_fake_llm, args=(args.latency, child_pipe))
+    llm.start()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with ProcessPoolExecutor(1, mp_context=spawn) as load, override_settings(
+            CACHES=CACHES,
+            MIDDLEWARE=MIDDLEWARE,
+            ROOT_URLCONF=URLCONF,
+            OPENAI_KEY="bench",
+            OPENAI_BASE_URL=llm_pipe.recv(),
+            LLM_MAX_CONCURRENCY=10_000,
+            LLM_MAX_CONNECTIONS=10_000,
+            LLM_TOKENS_PER_MINUTE=0,
+            LLM_REQUESTS_PER_MINUTE=0,
+            SESSION_ENGINE="django.contrib.sessions.backends.cache",
+            CHAT_MAX_CANDIDATES=5,
+        ):
+            reset_llm_clients()
+            Candidate.objects.bulk_create(
+                Candidate(
+                    personal_info={"name": f"Candidate {i}"},
+                    skills=["Python", "Django"] if i % 10 == 0 else ["Go"],
+                    status=Candidate.Status.DONE,
+                )
+                for i in range(args.rows)
+            )
+            port = free_port()
+            server, thread = start_worker(port)
+            base = f"http://127.0.0.1:{port}"
+            print(
+                f"One uvicorn worker, LLM latency {args.latency:.2f}s, "
+                f"{args.rounds} chats per client.\n"
+            )
+            print(
+                f"{'view':<7}{'clients':>8}{'req/s':>9}{'p50 (s)':>10}"
+                f"{'p95 (s)':>10}{'threads':>9}  status"
+            )
+            try:
+                for level in args.levels:
+                    for label, route in (("sync", "chat-sync/"), ("async", "chat/")):
+                        with ThreadPeak() as threads:
+                            rate, latencies, statuses = load.submit(
+                                run_load, f"{base}/{route}", level, args.rounds
+                            ).result()
+                        latencies.sort()
+                        p95 = latencies[math.ceil(0.95 * len(latencies)) - 1]
+                        print(
+                            f"{label:<7}{level:>8}{rate:>9.1f}"
+                            f"{statistics.median(latencies):>10.2f}{p95:>10.2f}"
+                            f"{threads.peak:>9}  {sorted(statuses)}"
+                        )
+            finally:
+                server.should_exit = True
+                thread.join()
+        llm_pipe.send("stop")
+        print(f"\nMost LLM calls in flight at once: {llm_pipe.recv()}")
+    finally:
+        llm.terminate()
+        reset_llm_clients()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Response time of the candidate list API from page 1 to page 1000.
+
+Seeds a throwaway test database with --rows Candidates (and their skill,
+company and degree terms), then walks the list with keyset cursors and times
+the candidate_list view (query plus JSON rendering) at selected page
+numbers. The same pages fetched with OFFSET are timed for comparison; those
+timings cover the query alone.
+
+    python -m benchmarks.bench_candidate_list --rows 100000 --pages 1 10 100 1000
+"""
+
+import argparse
+import json
+import random
+
+from benchmarks.common import report, setup_django, timed
+
+SKILLS = ["Python", "Django", "Java", "Go", "SQL", "React", "AWS", "Docker"]
+COMPANIES = ["Acme", "Initech", "Globex", "Umbrella", "Hooli", "Stark"]
+DEGREES = ["BSc Computer Science", "MSc Data Science", "BA Economics"]
+
+
+def seed(rows, batch_size=5000):
+    from core.models import Candidate, CandidateTerm
+    from core.retrieval import candidate_terms
+
+    rng = random.Random(0)
+    for start in range(0, rows, batch_size):
+        batch = [
+            Candidate(
+                personal_info={"name": f"Candidate {i}", "email": f"c{i}@example.com"},
+                skills=rng.sample(SKILLS, 3),
+                work_experience=[
+                    {"company": rng.choice(COMPANIES), "job_title": "Engineer"}
+                ],
+                education=[{"degree": rng.choice(DEGREES), "institution": "MIT"}],
+                projects=[{"description": "x" * 500}],
+                certificates=[],
+            )
+            for i in range(start, min(start + batch_size, rows))
+        ]
+        batch = Candidate.objects.bulk_create(batch)
+        CandidateTerm.objects.bulk_create(
+            CandidateTerm(candidate=candidate, kind=kind, value=value)
+            for candidate in batch
+            for kind, value in candidate_terms(candidate)
+        )
+
+
+def walk(view, factory, params, pages, page_size):
+    """
+    Follows next_cursor through the list and returns {page: seconds} for the
+    requested page numbers.
+    """
+    timings = {}
+    cursor = None
+    for page in range(1, max(pages) + 1):
+        query = dict(params, page_size=page_size)
+        if cursor:
+            query["cursor"] = cursor
+        response, t = timed(view, factory.get("/candidates/", query))
+        if page in pages:
+            timings[page] = t
+        cursor = json.loads(response.content)["next_cursor"]
+        if not cursor:
+            break
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+
+    from core.listing import CandidateFilters, filter_candidates
+    from core.views import candidate_list
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        _, t = timed(seed, args.rows)
+        report(f"seed {args.rows} candidates", t)
+
+        factory = RequestFactory()
+        for label, params in (("all", {}), ("skill=python", {"skill": "python"})):
+            samples = {page: [] for page in args.pages}
+            for _ in range(args.repeat):
+                walked = walk(
+                    candidate_list, factory, params, args.pages, args.page_size
+                )
+                for page, timings in walked.items():
+                    samples[page] += timings
+            for page, timings in samples.items():
+                if timings:
+                    report(f"keyset {label:<13} page {page:>5}", timings)
+
+            queryset = filter_candidates(CandidateFilters(skills=list(params.values())))
+            for page in args.pages:
+                offset = (page - 1) * args.page_size
+                _, timings = timed(
+                    lambda: list(queryset[offset : offset + args.page_size]),
+                    repeat=args.repeat,
+                )
+                report(f"offset {label:<13} page {page:>5}", timings)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Requests per second of the candidate page, before and after the render cache.
+
+Seeds a throwaway test database with --rows Candidates holding CV-sized JSON
+fields, then sends --requests GETs for random candidates straight to the
+view (no middleware) in four ways:
+
+  - before: the previous view, which loaded the whole row and rendered the
+    template on every request,
+  - cold: candidate_view with every lookup missing the page cache,
+  - warm: candidate_view with every page already cached,
+  - 304: warm, with the If-None-Match of a previous response.
+
+    python -m benchmarks.bench_candidate_page --rows 1000 --requests 5000
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import setup_django
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 1_000_000},
+    },
+    "extraction": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    "none": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+def fake_candidate(rng, i):
+    from core.models import Candidate
+
+    words = ["python", "django", "aws", "react", "sql", "docker", "kafka"]
+    sentence = " ".join(rng.choices(words, k=50))
+    return Candidate(
+        personal_info={
+            "name": f"Candidate {i}",
+            "email": f"c{i}@example.com",
+            "phone": "+1 555 0100",
+            "address": "1 Main Street, Springfield",
+        },
+        education=[
+            {"degree": "BSc Computer Science", "institution": "MIT", "year": "2015"}
+        ]
+        * 2,
+        work_experience=[
+            {
+                "job_title": "Engineer",
+                "company": f"Company {j}",
+                "start_date": "2018",
+                "end_date": "2020",
+                "responsibilities": sentence,
+            }
+            for j in range(5)
+        ],
+        skills=rng.sample(words, 5) + [f"skill {j}" for j in range(10)],
+        projects=[
+            {
+                "project_name": f"Project {j}",
+                "description": sentence,
+                "technologies": "",
+            }
+            for j in range(3)
+        ],
+        certificates=[{"certificate_name": "AWS SA", "issued_by": "AWS", "year": ""}],
+    )
+
+
+def legacy_candidate_view(request, pk):
+    from django.shortcuts import get_object_or_404, render
+
+    from core.models import Candidate
+
+    candidate = get_object_or_404(Candidate, pk=pk)
+    return render(request, "core/candidate.html", {"candidate": candidate})
+
+
+def load(view, factory, pks, headers=None):
+    """
+    Sends one GET per pk and returns (requests per second, status codes).
+    """
+    statuses = set()
+    started = time.perf_counter()
+    for pk in pks:
+        request = factory.get(f"/candidate/{pk}/", headers=(headers or {}).get(pk))
+        statuses.add(view(request, pk).status_code)
+    return len(pks) / (time.perf_counter() - started), statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    from core.models import Candidate
+    from core.views import candidate_view
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(CACHES=CACHES):
+            rng = random.Random(0)
+            Candidate.objects.bulk_create(
+                fake_candidate(rng, i) for i in range(args.rows)
+            )
+            all_pks = list(Candidate.objects.values_list("pk", flat=True))
+            pks = [rng.choice(all_pks) for _ in range(args.requests)]
+            factory = RequestFactory()
+
+            results = [("before", *load(legacy_candidate_view, factory, pks))]
+            with override_settings(CANDIDATE_PAGE_CACHE_ALIAS="none"):
+                results.append(("cold", *load(candidate_view, factory, pks)))
+            load(candidate_view, factory, all_pks)
+            results.append(("warm", *load(candidate_view, factory, pks)))
+            etags = {
+                pk: {"If-None-Match": candidate_view(factory.get("/"), pk)["ETag"]}
+                for pk in all_pks
+            }
+            results.append(("304", *load(candidate_view, factory, pks, etags)))
+
+        baseline = results[0][1]
+        for label, rate, statuses in results:
+            print(
+                f"{label:<8}{rate:>10.0f} req/s   {rate / baseline:>5.1f}x   "
+                f"status {sorted(statuses)}"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
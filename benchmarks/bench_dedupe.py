@@ -0,0 +1,128 @@
+"""
+Near-duplicate lookup cost with MinHash/LSH at scale.
+
+Seeds a throwaway test database with --rows signed Candidates, a
+--duplicates fraction of them lightly edited copies of another, then times:
+
+  - signing a CV (shingling + MinHash),
+  - the LSH lookup a new upload goes through (core.dedupe.find_duplicates),
+  - a linear scan comparing the new signature with every stored one,
+  - the bulk `dedupe_candidates --dry-run` pass over the whole table.
+
+    python -m benchmarks.bench_dedupe --rows 100000
+"""
+
+import argparse
+import random
+from io import StringIO
+
+from benchmarks.common import report, setup_django, timed
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def fake_cv(rng, words):
+    return rng.choices(VOCABULARY, k=words)
+
+
+def edited(rng, tokens, edits):
+    tokens = list(tokens)
+    for _ in range(edits):
+        tokens[rng.randrange(len(tokens))] = rng.choice(VOCABULARY)
+    return tokens
+
+
+def seed(rows, words, duplicates, batch_size=2000):
+    from core.dedupe import sign_candidates
+    from core.models import Candidate
+
+    rng = random.Random(0)
+    originals = []
+    for start in range(0, rows, batch_size):
+        batch = Candidate.objects.bulk_create(
+            Candidate(personal_info={"name": f"Candidate {i}"})
+            for i in range(start, min(start + batch_size, rows))
+        )
+        texts = []
+        for _ in batch:
+            if originals and rng.random() < duplicates:
+                tokens = edited(rng, rng.choice(originals), 5)
+            else:
+                tokens = fake_cv(rng, words)
+                originals.append(tokens)
+            texts.append(" ".join(tokens))
+        sign_candidates(zip(batch, texts))
+    return originals
+
+
+def linear_scan(signature):
+    from core.dedupe import from_bytes, is_duplicate, similarity
+    from core.models import CandidateSignature
+
+    return [
+        pk
+        for pk, data in CandidateSignature.objects.values_list(
+            "candidate", "signature"
+        ).iterator(chunk_size=5000)
+        if is_duplicate(similarity(signature, from_bytes(data)), False)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--duplicates", type=float, default=0.05)
+    parser.add_argument("--probes", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+
+    from core.dedupe import compute_signature, find_duplicates
+    from core.models import Candidate
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        originals, timings = timed(seed, args.rows, args.words, args.duplicates)
+        report(f"seed + sign {args.rows} CVs", timings)
+
+        rng = random.Random(1)
+        probe = Candidate(pk=0, personal_info={})
+        texts = [
+            " ".join(edited(rng, rng.choice(originals), 5)) for _ in range(args.probes)
+        ]
+        signatures = []
+        timings = []
+        for text in texts:
+            (signature, phone), t = timed(compute_signature, probe, text)
+            signatures.append((signature, phone))
+            timings.extend(t)
+        report("sign one CV", timings)
+
+        found = 0
+        timings = []
+        for signature, phone in signatures:
+            matches, t = timed(find_duplicates, probe, signature, phone)
+            found += bool(matches)
+            timings.extend(t)
+        report("LSH lookup per upload", timings)
+        print(f"    {found}/{args.probes} edited uploads matched")
+
+        timings = []
+        for signature, _ in signatures[:5]:
+            _, t = timed(linear_scan, signature)
+            timings.extend(t)
+        report("linear scan per upload", timings)
+
+        out = StringIO()
+        _, timings = timed(call_command, "dedupe_candidates", "--dry-run", stdout=out)
+        report("dedupe_candidates --dry-run", timings)
+        print("    " + out.getvalue().strip().replace("\n", "\n    "))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Latency of full-text keyword search over stored CV text.
+
+Seeds a throwaway test database with --rows Candidates whose raw text is
+drawn from a skills/roles vocabulary plus filler words, then times boolean,
+phrase and prefix queries through core.fulltext.search_text.
+
+    python -m benchmarks.bench_fulltext --rows 100000
+"""
+
+import argparse
+import random
+
+from benchmarks.common import report, setup_django, timed
+
+KEYWORDS = [
+    "python",
+    "django",
+    "java",
+    "kubernetes",
+    "terraform",
+    "react",
+    "postgresql",
+    "machine learning",
+    "data engineering",
+    "project management",
+    "golang",
+    "rust",
+]
+FILLER = [f"word{i}" for i in range(5000)]
+
+QUERIES = [
+    "python",
+    "python AND django",
+    "python NOT java",
+    "(react OR golang) AND kubernetes",
+    '"machine learning" AND python',
+    "terra*",
+]
+
+
+def fake_cv(rng, words):
+    tokens = rng.choices(FILLER, k=words)
+    for keyword in rng.sample(KEYWORDS, 4):
+        tokens.insert(rng.randrange(len(tokens)), keyword)
+    return " ".join(tokens)
+
+
+def seed(rows, words, batch_size=5000):
+    from core.fulltext import store_raw_text
+    from core.models import Candidate
+
+    rng = random.Random(0)
+    for start in range(0, rows, batch_size):
+        batch = Candidate.objects.bulk_create(
+            Candidate(personal_info={"name": f"Candidate {i}"})
+            for i in range(start, min(start + batch_size, rows))
+        )
+        store_raw_text((candidate, fake_cv(rng, words)) for candidate in batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from core.fulltext import search_text
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        _, t = timed(seed, args.rows, args.words)
+        report(f"seed {args.rows} CVs", t)
+        for query in QUERIES:
+            _, timings = timed(search_text, query, args.limit, repeat=args.repeat)
+            report(query, timings)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
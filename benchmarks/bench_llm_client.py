@@ -0,0 +1,110 @@
+"""
+Load test of the shared LLM client against a local fake OpenAI server.
+
+The fake server answers after --latency seconds and, like a provider at its
+rate limit, replies 429 (with Retry-After) to requests beyond
+--server-limit in flight. --threads callers send --requests prompts each,
+a --duplicates fraction of them identical to another caller's, through:
+
+  - a bare openai.OpenAI client (SDK retries, no concurrency cap), and
+  - core.llm_client.llm_client() (governor, jittered backoff, coalescing).
+
+    python -m benchmarks.bench_llm_client --threads 64 --server-limit 8
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def prompts(threads, requests, duplicates, seed=0):
+    rng = random.Random(seed)
+    return [
+        [
+            "shared prompt" if rng.random() < duplicates else f"prompt {t}-{i}"
+            for i in range(requests)
+        ]
+        for t in range(threads)
+    ]
+
+
+def run(client, workload):
+    latencies = []
+    failures = 0
+
+    def caller(batch):
+        nonlocal failures
+        for prompt in batch:
+            started = time.perf_counter()
+            try:
+                client.chat.completions.create(
+                    model="gpt-4o", messages=[{"role": "user", "content": prompt}]
+                )
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workload)) as executor:
+        list(executor.map(caller, workload))
+    return time.perf_counter() - started, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--duplicates", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--server-limit", type=int, default=8)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    setup_django()
+    import openai
+    from django.test.utils import override_settings
+
+    from core.llm_client import llm_client
+
+    workload = prompts(args.threads, args.requests, args.duplicates)
+    total = args.threads * args.requests
+    server_options = {
+        "latency": args.latency,
+        "concurrency_limit": args.server_limit,
+        "retry_after": args.retry_after,
+    }
+
+    for label in ("bare SDK client", "llm_client"):
+        with FakeOpenAIServer(**server_options) as server:
+            if label == "llm_client":
+                overrides = override_settings(
+                    OPENAI_KEY="bench",
+                    OPENAI_BASE_URL=server.base_url,
+                    LLM_MAX_CONCURRENCY=args.server_limit,
+                    LLM_TOKENS_PER_MINUTE=0,
+                    LLM_REQUESTS_PER_MINUTE=0,
+                )
+                with overrides:
+                    elapsed, latencies, failures = run(llm_client(), workload)
+            else:
+                client = openai.OpenAI(base_url=server.base_url, api_key="bench")
+                elapsed, latencies, failures = run(client, workload)
+
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0
+        print(
+            f"{label:<16} {total - failures:>4}/{total} ok in {elapsed:6.2f}s "
+            f"({(total - failures) / elapsed:6.1f} req/s)  "
+            f"upstream calls {len(server.requests):>4}  429s {server.rejected:>4}  "
+            f"p50 {statistics.median(latencies or [0]) * 1000:7.0f} ms  "
+            f"p95 {p95 * 1000:7.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Wall-clock benchmark for page-parallel OCR in extract_text_from_pdf.
+
+Every sample CV is a single scanned page, so the script also stitches them
+into one multi-page PDF to show the effect of the OCR process pool, and the
+time to the first chunk of stream_text_from_file on the same PDF.
+
+    python -m benchmarks.bench_ocr --workers 4 --repeat 3
+"""
+
+import argparse
+import os
+import tempfile
+
+import pypdfium2 as pdfium
+
+from benchmarks.common import NO_OCR_CACHE, report, sample_cvs, setup_django, timed
+
+
+def build_multipage_pdf(paths, out_path):
+    merged = pdfium.PdfDocument.new()
+    for path in paths:
+        merged.import_pages(pdfium.PdfDocument(str(path)))
+    merged.save(out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    from core.ocr import extract_text_from_pdf, stream_text_from_file
+
+    paths = sample_cvs()
+    with tempfile.TemporaryDirectory() as tmp:
+        combined = os.path.join(tmp, "combined.pdf")
+        build_multipage_pdf(paths, combined)
+
+        for workers in (1, args.workers):
+            with override_settings(OCR_MAX_WORKERS=workers, CACHES=NO_OCR_CACHE):
+                # Warm the pool so worker start-up is not billed to the first run.
+                extract_text_from_pdf(combined)
+                _, timings = timed(extract_text_from_pdf, combined, repeat=args.repeat)
+                report(f"{len(paths)}-page PDF, workers={workers}", timings)
+                _, timings = timed(
+                    lambda: next(stream_text_from_file(combined)), repeat=args.repeat
+                )
+                report(f"  first chunk, workers={workers}", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+How much of each CV the rule-based pre-parser resolves, and the LLM input
+tokens and calls it saves.
+
+Extracts the text of every CV in data/sample_cvs (OCR needs Tesseract; use
+--text-dir to read already extracted .txt files instead), runs
+core.preparse on it and compares the requests parse_resume_with_llm would
+send with LLM_PREPARSE off and on. Tokens are estimated at four characters
+each, for the system prompt, the CV text and the JSON schema.
+
+    python -m benchmarks.bench_preparse [--text-dir DIR]
+"""
+
+import argparse
+import json
+import statistics
+from pathlib import Path
+
+from benchmarks.common import NO_OCR_CACHE, sample_cvs, setup_django, timed
+
+
+def load_texts(text_dir):
+    if text_dir:
+        return {
+            path.name: path.read_text() for path in sorted(Path(text_dir).glob("*.txt"))
+        }
+    from django.test.utils import override_settings
+
+    from core.ocr import extract_text_from_file
+
+    with override_settings(CACHES=NO_OCR_CACHE):
+        return {path.name: extract_text_from_file(str(path)) for path in sample_cvs()}
+
+
+def call_tokens(keys, text):
+    from core.conversation import estimate_tokens
+    from core.openai_services import RESUME_KEYS
+    from core.prompts import RESUME_PROMPT, section_prompt
+
+    prompt = RESUME_PROMPT if tuple(keys) == RESUME_KEYS else section_prompt(keys)
+    return (
+        estimate_tokens(prompt.system)
+        + estimate_tokens(text)
+        + estimate_tokens(json.dumps(prompt.response_format))
+    )
+
+
+def calls_without_preparse(text):
+    from django.conf import settings
+
+    from core.openai_services import RESUME_KEYS, section_requests
+
+    if settings.LLM_SECTION_PARSE and len(text) >= settings.LLM_SECTION_PARSE_MIN_CHARS:
+        requests = section_requests(text, settings.LLM_SECTION_MAX_CHARS)
+        if len(requests) > 1:
+            return requests
+    return [(RESUME_KEYS, text)]
+
+
+def calls_with_preparse(text, pre):
+    from core.openai_services import pending_calls, pending_requests
+
+    if not pre.parsed:
+        return calls_without_preparse(text)
+    if not pre.pending:
+        return []
+    return pending_calls(text, pending_requests(text, pre))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--text-dir", help="Directory of extracted .txt CVs.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.preparse import RESUME_KEYS, preparse
+
+    try:
+        texts = load_texts(args.text_dir)
+    except Exception as e:
+        raise SystemExit(f"Could not extract the sample CVs ({e}); use --text-dir.")
+
+    print(
+        f"{'cv':<16}{'chars':>7}{'local fields':>14}"
+        f"{'calls':>10}{'tokens before':>15}{'tokens after':>14}"
+    )
+    fully_local = partial = 0
+    before_total = after_total = 0
+    preparse_seconds = []
+    for name, text in texts.items():
+        pre, timings = timed(preparse, text, repeat=args.repeat)
+        preparse_seconds.append(statistics.median(timings))
+        before = calls_without_preparse(text)
+        after = calls_with_preparse(text, pre)
+        before_tokens = sum(call_tokens(keys, body) for keys, body in before)
+        after_tokens = sum(call_tokens(keys, body) for keys, body in after)
+        before_total += before_tokens
+        after_total += after_tokens
+        fully_local += not pre.pending
+        partial += bool(pre.parsed and pre.pending)
+        print(
+            f"{name[:15]:<16}{len(text):>7}"
+            f"{len(pre.parsed):>8}/{len(RESUME_KEYS)}     "
+            f"{len(before):>3} -> {len(after):<3}"
+            f"{before_tokens:>13}{after_tokens:>14}"
+        )
+
+    count = len(texts)
+    saved = before_total - after_total
+    print(
+        f"\nFully parsed locally: {fully_local}/{count} "
+        f"({fully_local / count:.0%}); partly: {partial}/{count}."
+    )
+    print(
+        f"LLM input tokens: {before_total} -> {after_total} "
+        f"({saved / before_total:.0%} saved)."
+    )
+    print(
+        f"Pre-parse time: median {statistics.median(preparse_seconds) * 1000:.2f} ms "
+        "per CV."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Per-call Python overhead of building and sending LLM requests, and how much
+of each request is a cacheable static prefix.
+
+Requests go through core.llm_client.LLMClient into an openai.OpenAI client
+whose HTTP transport answers in-process, so only client-side work is timed:
+building the messages and schema, the governor's token estimate, the
+coalescing key and the SDK's request preparation. Each case is run with the
+precompiled templates of core.prompts and with plain dicts built the way
+the parse code used to build them.
+
+The prefix table estimates (four characters per token) the static part of
+each template, its schema plus system prompt, and how many of those tokens
+the provider can serve from its prompt cache (prefixes of 1024 tokens or
+more, in steps of 128).
+
+    python -m benchmarks.bench_prompts [--calls 2000]
+"""
+
+import argparse
+import json
+
+from benchmarks.common import report, setup_django, timed
+
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+CV_TEXT = "Jane Doe\njane@example.com\n" + "Built data pipelines in Python. " * 150
+
+
+def cacheable_tokens(tokens):
+    if tokens < CACHE_MIN_TOKENS:
+        return 0
+    return CACHE_MIN_TOKENS + (tokens - CACHE_MIN_TOKENS) // CACHE_STEP_TOKENS * (
+        CACHE_STEP_TOKENS
+    )
+
+
+def legacy_section_request(keys, text):
+    """A section request built per call, as before core.prompts."""
+    from core.prompts import RESUME_SCHEMA, SECTION_SYSTEM_PROMPT
+
+    properties = json.loads(json.dumps(RESUME_SCHEMA))["json_schema"]["schema"][
+        "properties"
+    ]
+    schema = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "cv_section_parser",
+            "schema": {
+                "type": "object",
+                "properties": {key: properties[key] for key in keys},
+                "required": list(keys),
+                "additionalProperties": False,
+            },
+            "strict": True,
+        },
+    }
+    system = SECTION_SYSTEM_PROMPT.format(keys=", ".join(keys))
+    return {
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": text},
+        ],
+        "response_format": schema,
+    }
+
+
+def stub_client():
+    import httpx
+    import openai
+
+    from core.llm_client import LLMClient, LLMGovernor
+
+    reply = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "{}"},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=reply))
+    client = openai.OpenAI(
+        api_key="bench",
+        max_retries=0,
+        http_client=httpx.Client(transport=transport),
+    )
+    return LLMClient(
+        client, LLMGovernor(64), max_retries=0, backoff_base=0, backoff_max=0
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.conversation import estimate_tokens
+    from core.openai_services import RESUME_KEYS
+    from core.prompts import CHAT_PROMPT, RESUME_PROMPT, section_prompt
+
+    plain_schema = json.loads(json.dumps(RESUME_PROMPT.response_format))
+    keys = ("work_experience", "skills")
+    cases = [
+        (
+            "full parse",
+            lambda: {
+                "messages": RESUME_PROMPT.messages(CV_TEXT),
+                "response_format": RESUME_PROMPT.response_format,
+            },
+            lambda: {
+                "messages": [
+                    {"role": "system", "content": RESUME_PROMPT.system},
+                    {"role": "user", "content": CV_TEXT},
+                ],
+                "response_format": plain_schema,
+            },
+        ),
+        (
+            "section parse",
+            lambda: {
+                "messages": section_prompt(keys).messages(CV_TEXT),
+                "response_format": section_prompt(keys).response_format,
+            },
+            lambda: legacy_section_request(keys, CV_TEXT),
+        ),
+    ]
+
+    client = stub_client()
+    print(f"Per-call overhead over {args.calls} calls:")
+    for label, precompiled, plain in cases:
+        for variant, build in (("plain dicts", plain), ("precompiled", precompiled)):
+
+            def call():
+                client.create(model="gpt-4o", **build())
+
+            call()
+            _, timings = timed(call, repeat=args.calls)
+            report(f"  {label}, {variant}", timings)
+
+    print("\nStatic prefix per template (estimated tokens):")
+    print(f"  {'template':<34}{'prefix':>8}{'cacheable':>11}")
+    templates = [RESUME_PROMPT, CHAT_PROMPT] + [
+        section_prompt((key,)) for key in RESUME_KEYS
+    ]
+    for prompt in templates:
+        tokens = estimate_tokens("x" * prompt.prefix_chars)
+        name = prompt.name
+        if prompt.name == "cv_section_parser":
+            name += f" ({prompt.system.rsplit(': ', 1)[-1].rstrip('.')})"
+        print(f"  {name:<34}{tokens:>8}{cacheable_tokens(tokens):>11}")
+
+    history = []
+    print("\nChat prefix (system prompt + history) as the conversation grows:")
+    for turn in range(1, 21):
+        history += [
+            {"role": "user", "content": f"Question {turn} about the candidates?"},
+            {"role": "assistant", "content": "An answer naming candidates. " * 40},
+        ]
+        if turn % 5 == 0:
+            prefix = CHAT_PROMPT.messages("", history)[:-1]
+            tokens = sum(estimate_tokens(message["content"]) for message in prefix)
+            print(
+                f"  after {turn:>2} turns: {tokens:>6} tokens, "
+                f"{cacheable_tokens(tokens):>6} cacheable"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-request overhead of RateLimitMiddleware.
+
+Times process_request for each limiter algorithm, and the previous
+implementation (a JSON list of every timestamp per IP) for comparison, with
+the cache either in-process (LocMem) or Redis.
+
+    python -m benchmarks.bench_ratelimit --backend local --requests 5000
+    python -m benchmarks.bench_ratelimit --backend redis
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import report, setup_django
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def legacy_process_request(cache, request, limit, window):
+    """The JSON-list limiter this middleware replaced, kept for comparison."""
+    key = f"rate_limit:{request.META['REMOTE_ADDR']}"
+    rate_limit = cache.get(key)
+    timestamps = json.loads(rate_limit) if rate_limit is not None else []
+    now = time.time()
+    timestamps = [ts for ts in timestamps if ts > now - window]
+    if len(timestamps) >= limit:
+        return False
+    timestamps.append(now)
+    cache.set(key, json.dumps(timestamps), window)
+    return True
+
+
+def measure(func, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=["local", "redis"], default="local")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    from core import ratelimit
+    from core.middleware import RateLimitMiddleware
+
+    caches = {} if args.backend == "redis" else {"CACHES": LOCMEM}
+    # A budget large enough that every request is counted but none rejected.
+    limit = args.requests * 10
+    with override_settings(
+        RATE_LIMIT_PER_MINUTE=limit, RATE_LIMIT_WINDOW_SECONDS=3600, **caches
+    ):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get("/")
+
+        for algorithm in ratelimit.ALGORITHMS:
+            ratelimit._limiters.clear()
+            cache.clear()
+            with override_settings(RATE_LIMIT_ALGORITHM=algorithm):
+                timings = measure(
+                    lambda: middleware.process_request(request), args.requests
+                )
+            report(f"{args.backend} {algorithm}", timings)
+
+        cache.clear()
+        timings = measure(
+            lambda: legacy_process_request(cache, request, limit, 3600),
+            args.requests,
+        )
+        report(f"{args.backend} legacy JSON list", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Wall-clock time of one-call vs. section-wise LLM parsing of long CVs.
+
+Runs parse_resume_with_llm against a local FakeOpenAIServer whose latency
+grows with the length of the prompt (--seconds-per-char), once with a single
+full-schema call and once with concurrent per-section calls, on synthetic
+CVs of increasing length.
+
+    python -m benchmarks.bench_section_parse --jobs 10 40 160
+"""
+
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import report, setup_django, timed
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def synthetic_cv(jobs):
+    lines = ["Jane Doe", "jane@example.com", "Python, Django", "", "Experience"]
+    lines += [
+        f"Engineer {i} | Company {i} | 2001 | 2002 | " + "Built services. " * 6
+        for i in range(jobs)
+    ]
+    lines += ["", "Education", "PhD Computer Science | MIT | 2010", "", "Publications"]
+    lines += [
+        f"Paper {i} | " + "A study of distributed systems. " * 4 + "| LaTeX"
+        for i in range(jobs * 2)
+    ]
+    lines += ["", "Skills", "Python, SQL, Docker, Kubernetes"]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--seconds-per-char", type=float, default=0.0002)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    import openai
+    from django.test.utils import override_settings
+
+    from core.openai_services import parse_resume_sections, parse_resume_with_llm
+
+    no_cache = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    with FakeOpenAIServer(args.latency, args.seconds_per_char) as server:
+        sync_client = openai.OpenAI(base_url=server.base_url, api_key="bench")
+
+        def sectioned(text):
+            client = openai.AsyncOpenAI(base_url=server.base_url, api_key="bench")
+            return json.dumps(asyncio.run(parse_resume_sections(text, client)))
+
+        with override_settings(CACHES=no_cache, LLM_PARSE_CONCURRENCY=args.concurrency):
+            for jobs in args.jobs:
+                text = synthetic_cv(jobs)
+                with override_settings(LLM_SECTION_PARSE=False):
+                    _, timings = timed(
+                        parse_resume_with_llm,
+                        text,
+                        client=sync_client,
+                        repeat=args.repeat,
+                    )
+                report(f"{len(text):>7} chars, one call", timings)
+                server.requests.clear()
+                content, timings = timed(sectioned, text, repeat=args.repeat)
+                calls = len(server.requests) // args.repeat
+                report(f"{len(text):>7} chars, {calls:>2} section calls", timings)
+                parsed = json.loads(content)
+                print(
+                    f"    merged: {len(parsed['work_experience'])} jobs, "
+                    f"{len(parsed['projects'])} projects, {len(parsed['skills'])} skills"
+                )
+
+
+if __name__ == "__main__":
+    main()
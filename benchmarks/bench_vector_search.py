@@ -0,0 +1,58 @@
+"""
+Query latency of the memory-mapped candidate vector index.
+
+Fills a temporary VectorIndex with random unit vectors at each size and
+times top-k cosine queries against it.
+
+    python -m benchmarks.bench_vector_search --sizes 10000 100000 --k 10
+"""
+
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import report, setup_django, timed
+
+
+def random_unit_vectors(rng, rows, dim):
+    vectors = rng.standard_normal((rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.embeddings import VectorIndex
+
+    rng = np.random.default_rng(0)
+    queries = random_unit_vectors(rng, args.queries, args.dim)
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            index = VectorIndex(tmp, args.dim)
+            _, build = timed(
+                index.upsert, np.arange(size), random_unit_vectors(rng, size, args.dim)
+            )
+            report(f"build {size:>7} rows", build)
+
+            index.search(queries[0], args.k)  # map the files
+            timings = []
+            for query in queries:
+                _, t = timed(index.search, query, args.k)
+                timings += t
+            report(f"top-{args.k} query, {size:>7} rows", timings)
+
+            _, upsert = timed(
+                index.upsert, [size], random_unit_vectors(rng, 1, args.dim), repeat=20
+            )
+            report(f"single upsert, {size:>7} rows", upsert)
+
+
+if __name__ == "__main__":
+    main()
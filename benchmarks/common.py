@@ -0,0 +1,54 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks are run from the project root as modules, e.g.:
+
+    python -m benchmarks.bench_ocr
+"""
+
+import os
+import statistics
+import time
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_CVS_DIR = BASE_DIR / "data" / "sample_cvs"
+
+# OCR results are cached per page; OCR benchmarks override CACHES with this
+# so every run does the work.
+NO_OCR_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "extraction": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+    django.setup()
+
+
+def sample_cvs():
+    return sorted(SAMPLE_CVS_DIR.glob("*.pdf"))
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """
+    Calls func(*args, **kwargs) `repeat` times and returns
+    (last_result, list_of_wall_clock_seconds).
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<40} median {statistics.median(timings) * 1000:10.2f} ms"
+        f"   min {min(timings) * 1000:10.2f} ms   n={len(timings)}"
+    )
@@ -0,0 +1,208 @@
+"""
+A local stand-in for the OpenAI chat completions endpoint.
+
+FakeOpenAIServer answers POST /v1/chat/completions after a simulated
+latency of `latency + seconds_per_char * len(user message)` seconds, which
+models output tokens being generated in proportion to the input. The reply
+fills the requested JSON schema from the user message:
+
+  - string fields of an object get the first line of the message,
+  - arrays of objects get one item per line containing " | ", with the
+    parts assigned to the item's properties in schema order,
+  - arrays of strings get the comma-separated values of lines containing
+    "," but no " | ".
+
+It can also fail on purpose: `errors` is a list of HTTP statuses returned
+(in order) to the first requests, and requests beyond `concurrency_limit`
+in flight get a 429. Error replies carry `Retry-After: retry_after`.
+
+Use it as a context manager and point a client at `server.base_url`:
+
+    with FakeOpenAIServer(latency=0.2) as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="test")
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def fill_schema(schema, text):
+    """
+    Builds a value matching a JSON schema from the text of a user message
+    (see the module docstring).
+    """
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fill_schema(prop, text)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        if items.get("type") == "object":
+            names = list(items.get("properties", {}))
+            rows = [line.split(" | ") for line in _lines(text) if " | " in line]
+            return [
+                {
+                    name: (row[i].strip() if i < len(row) else "")
+                    for i, name in enumerate(names)
+                }
+                for row in rows
+            ]
+        return [
+            value.strip()
+            for line in _lines(text)
+            if "," in line and " | " not in line
+            for value in line.split(",")
+            if value.strip()
+        ]
+    lines = _lines(text)
+    return lines[0] if lines else ""
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under concurrent load,
+    # which shows up as one-second SYN retry stalls.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server imitating the chat completions API.
+
+    latency (float): Seconds every request takes.
+    seconds_per_char (float): Extra seconds per character of user message.
+    errors (list): Statuses returned to the first requests, in order.
+    concurrency_limit (int): Requests beyond this many in flight get a 429.
+    retry_after (float): Retry-After sent with error replies (None to omit).
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        seconds_per_char=0.0,
+        errors=(),
+        concurrency_limit=None,
+        retry_after=None,
+    ):
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+        self.errors = list(errors)
+        self.concurrency_limit = concurrency_limit
+        self.retry_after = retry_after
+        self.rejected = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.httpd = _Server(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def completion(self, body):
+        """
+        Returns the JSON body of the reply to a chat completions request.
+        """
+        user = "\n".join(
+            message["content"]
+            for message in body.get("messages", [])
+            if message.get("role") == "user"
+        )
+        response_format = body.get("response_format") or {}
+        schema = response_format.get("json_schema", {}).get("schema")
+        content = json.dumps(fill_schema(schema, user)) if schema else user
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(user) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(user) + len(content)) // 4,
+            },
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server.lock:
+                    server.requests.append(body)
+                    status = server.errors.pop(0) if server.errors else None
+                    if status is None and server.concurrency_limit is not None:
+                        if server.in_flight >= server.concurrency_limit:
+                            status = 429
+                    if status is None:
+                        server.in_flight += 1
+                        server.max_in_flight = max(
+                            server.max_in_flight, server.in_flight
+                        )
+                    else:
+                        server.rejected += 1
+                if status is not None:
+                    self.send_error_reply(status)
+                    return
+                try:
+                    user_chars = sum(
+                        len(message.get("content") or "")
+                        for message in body.get("messages", [])
+                        if message.get("role") == "user"
+                    )
+                    time.sleep(server.latency + server.seconds_per_char * user_chars)
+                    payload = json.dumps(server.completion(body)).encode()
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def send_error_reply(self, status):
+                payload = json.dumps(
+                    {"error": {"message": "fake error", "type": "fake", "code": None}}
+                ).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if server.retry_after is not None:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
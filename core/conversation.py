@@ -0,0 +1,114 @@
+import json
+import logging
+import math
+
+from django.conf import settings
+
+from .metrics import record_chat_turn
+from .prompts import CHAT_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Rough average for English text with OpenAI tokenizers; good enough for
+# budgeting without pulling in a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+# Fixed per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(messages):
+    return sum(
+        estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+def turn_prompt(candidate_data, prompt):
+    # The instructions are in CHAT_PROMPT; the data goes last.
+    return f"{prompt}\n\nRelevant candidate resumes:\n{candidate_data}"
+
+
+class Conversation:
+    """
+    Chat history kept in the session under "messages", bounded by a token
+    budget.
+
+    Only the compact user prompt and the assistant reply of each turn are
+    stored. The candidate data is attached to the current question when the
+    request is built, so it is never repeated in later turns. When the stored
+    history exceeds settings.CHAT_HISTORY_TOKEN_BUDGET the oldest turns are
+    evicted.
+    """
+
+    def __init__(self, session, token_budget=None, history=None):
+        self.session = session
+        self.token_budget = token_budget or settings.CHAT_HISTORY_TOKEN_BUDGET
+        if history is None:
+            history = session.get("messages", [])
+        self.history = history
+
+    @classmethod
+    async def aload(cls, session, token_budget=None):
+        """
+        Builds a Conversation from an async view, loading the session
+        without blocking the event loop.
+        """
+        return cls(session, token_budget, await session.aget("messages", []))
+
+    def build_messages(self, prompt, candidate_data):
+        """
+        Returns the messages to send for a new question: the static system
+        prompt, the (trimmed) history, then the question with fresh
+        candidate data. Only the last message changes from one turn to the
+        next, so the rest is a prefix the provider's prompt cache can reuse.
+        """
+        return CHAT_PROMPT.messages(
+            turn_prompt(candidate_data, prompt), history=self.history
+        )
+
+    def record_reply(self, prompt, final_response, messages=None):
+        """
+        Stores the compact turn, evicts old turns over budget and saves the
+        reply under "final_response" for display. The turn's prompt, history
+        and session sizes are exported as metrics (see record_chat_turn).
+
+        messages (list): The messages that were sent for this turn, used to
+            report prompt size.
+        """
+        self.history = self.history + [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": final_response},
+        ]
+        self._trim()
+        self.session["messages"] = self.history
+        self.session["final_response"] = final_response
+
+        metrics = self.metrics(messages or [])
+        record_chat_turn(metrics)
+        logger.info(
+            "chat turn: prompt_tokens=%(prompt_tokens)d "
+            "history_tokens=%(history_tokens)d history_turns=%(history_turns)d "
+            "session_bytes=%(session_bytes)d",
+            metrics,
+        )
+        return metrics
+
+    def _trim(self):
+        # Evict whole user/assistant pairs, oldest first, but always keep the
+        # latest turn so a follow-up question has something to refer to.
+        while (
+            len(self.history) > 2 and message_tokens(self.history) > self.token_budget
+        ):
+            self.history = self.history[2:]
+
+    def metrics(self, messages):
+        return {
+            "prompt_tokens": message_tokens(messages),
+            "history_tokens": message_tokens(self.history),
+            "history_turns": len(self.history) // 2,
+            "session_bytes": len(json.dumps(self.history).encode("utf-8")),
+        }
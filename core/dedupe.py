@@ -0,0 +1,292 @@
+import hashlib
+import re
+import struct
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .derived import JSON_FIELDS, normalize_email
+from .embeddings import index_candidate_embeddings
+from .models import Candidate, CandidateBucket, CandidateSignature
+from .openai_services import merge_parsed_sections
+
+# MinHash signature length and its split into LSH bands. With 32 bands of 4
+# rows, a pair with Jaccard similarity s shares at least one bucket with
+# probability 1 - (1 - s**4)**32: ~100% at 0.8, 87% at 0.5, 3% at 0.2.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Phone numbers are compared on their last digits, which ignores country
+# code and trunk prefix differences; shorter numbers are ignored.
+PHONE_DIGITS = 10
+MIN_PHONE_DIGITS = 7
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+_random = np.random.RandomState(20240601)
+_PERM_A = _random.randint(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_PERM_B = _random.randint(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+# A near-duplicate found for a candidate: its primary key, the candidate it
+# is itself flagged as a duplicate of (or None), the estimated Jaccard
+# similarity and whether the two share an email address or phone number.
+Match = namedtuple(
+    "Match", ["candidate_id", "duplicate_of", "similarity", "same_identity"]
+)
+
+
+def normalize_phone(value):
+    digits = re.sub(r"\D", "", str(value or ""))
+    return digits[-PHONE_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else ""
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Returns the set of case-folded word n-grams of a text, so reordered
+    sections and small edits change only a few of them.
+    """
+    words = _WORD.findall(str(text or "").casefold())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def candidate_tokens(text, personal_info):
+    """
+    Returns the tokens hashed into a candidate's signature: the shingles of
+    its extracted text plus its normalized email and phone number.
+    """
+    info = personal_info if isinstance(personal_info, dict) else {}
+    tokens = shingles(text)
+    email = normalize_email(info.get("email"))
+    phone = normalize_phone(info.get("phone"))
+    if email:
+        tokens.add(f"email:{email}")
+    if phone:
+        tokens.add(f"phone:{phone}")
+    return tokens
+
+
+def minhash(tokens):
+    """
+    Returns the NUM_PERM MinHash values of a set of strings as a uint32
+    array. An empty set gives all-max values, which match nothing.
+    """
+    if not tokens:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest())
+            for token in tokens
+        ),
+        dtype=np.uint64,
+        count=len(tokens),
+    )
+    # a * x + b stays below 2**64 because a, x and b are all below 2**32.
+    values = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (values & 0xFFFFFFFF).min(axis=0).astype(np.uint32)
+
+
+def similarity(signature, other):
+    """Estimates the Jaccard similarity of two MinHash signatures."""
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+
+def band_buckets(signature):
+    """
+    Returns the LSH bucket of each band of a signature as a signed 64-bit
+    integer. The band number is hashed in, so one indexed column holds the
+    buckets of every band. Empty signatures get no buckets.
+    """
+    if (signature == _MAX_HASH).all():
+        return []
+    rows = signature.reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                struct.pack("<H", band) + rows[band].tobytes(), digest_size=8
+            ).digest(),
+            signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def to_bytes(signature):
+    return signature.astype("<u4").tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype="<u4")
+
+
+def is_duplicate(score, same_identity):
+    """
+    Whether an estimated similarity makes two candidates duplicates: above
+    settings.DEDUP_THRESHOLD, or above the lower DEDUP_IDENTITY_THRESHOLD
+    when they share an email address or phone number.
+    """
+    if score >= settings.DEDUP_THRESHOLD:
+        return True
+    return same_identity and score >= settings.DEDUP_IDENTITY_THRESHOLD
+
+
+def compute_signature(candidate, text):
+    """
+    Returns the (signature, normalized phone) of a candidate given its
+    extracted text.
+    """
+    info = candidate.personal_info if isinstance(candidate.personal_info, dict) else {}
+    signature = minhash(candidate_tokens(text, info))
+    return signature, normalize_phone(info.get("phone"))
+
+
+def store_signatures(rows):
+    """
+    Saves (candidate, signature, phone) rows and replaces their LSH buckets.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    signatures = [
+        CandidateSignature(candidate=candidate, signature=to_bytes(sig), phone=phone)
+        for candidate, sig, phone in rows
+    ]
+    buckets = [
+        CandidateBucket(candidate=candidate, bucket=bucket)
+        for candidate, sig, _ in rows
+        for bucket in band_buckets(sig)
+    ]
+    with transaction.atomic():
+        CandidateBucket.objects.filter(
+            candidate__in=[candidate for candidate, _, _ in rows]
+        ).delete()
+        CandidateSignature.objects.bulk_create(
+            signatures,
+            update_conflicts=True,
+            unique_fields=["candidate"],
+            update_fields=["signature", "phone"],
+        )
+        CandidateBucket.objects.bulk_create(buckets)
+
+
+def sign_candidates(candidates_and_texts):
+    """
+    Computes and stores the signatures of (candidate, extracted text) pairs.
+    """
+    store_signatures(
+        (candidate, *compute_signature(candidate, text))
+        for candidate, text in candidates_and_texts
+    )
+
+
+def find_duplicates(candidate, signature, phone):
+    """
+    Returns the Matches of a signature among the other stored candidates,
+    most similar first.
+
+    Only candidates sharing at least one LSH bucket are loaded and compared,
+    so the cost depends on the number of likely duplicates, not on the size
+    of the table.
+    """
+    buckets = band_buckets(signature)
+    if not buckets:
+        return []
+    email = candidate.email
+    rows = CandidateSignature.objects.filter(
+        candidate__in=CandidateBucket.objects.filter(bucket__in=buckets)
+        .exclude(candidate=candidate.pk)
+        .values("candidate")
+    ).values_list(
+        "candidate", "candidate__duplicate_of", "signature", "phone", "candidate__email"
+    )
+    matches = []
+    for pk, duplicate_of, data, other_phone, other_email in rows:
+        score = similarity(signature, from_bytes(data))
+        same_identity = bool(email and email == other_email) or bool(
+            phone and phone == other_phone
+        )
+        if is_duplicate(score, same_identity):
+            matches.append(Match(pk, duplicate_of, score, same_identity))
+    return sorted(matches, key=lambda match: -match.similarity)
+
+
+def flag_duplicates(keeper, duplicate_ids):
+    """
+    Marks candidates (and anything already flagged as their duplicate) as
+    duplicates of keeper. Returns the number of rows flagged.
+    """
+    return (
+        Candidate.objects.filter(
+            Q(pk__in=duplicate_ids) | Q(duplicate_of__in=duplicate_ids)
+        )
+        .exclude(pk=keeper.pk)
+        .exclude(duplicate_of=keeper)
+        .update(duplicate_of=keeper)
+    )
+
+
+def merge_duplicates(keeper, duplicate_ids):
+    """
+    Folds the parsed data of candidates (and anything already flagged as
+    their duplicate) into keeper, whose values win on conflicts and which
+    keeps the union of the list fields, then deletes them. Returns the number
+    of candidates deleted.
+    """
+    duplicates = list(
+        Candidate.objects.filter(
+            Q(pk__in=duplicate_ids) | Q(duplicate_of__in=duplicate_ids)
+        )
+        .exclude(pk=keeper.pk)
+        .order_by("-created_at", "-pk")
+    )
+    if not duplicates:
+        return 0
+    merged = merge_parsed_sections(
+        [
+            {field: getattr(candidate, field) for field in JSON_FIELDS}
+            for candidate in [keeper, *duplicates]
+        ]
+    )
+    for field in JSON_FIELDS:
+        setattr(keeper, field, merged[field])
+    with transaction.atomic():
+        keeper.save()
+        for duplicate in duplicates:
+            # One at a time so post_delete drops each one's vectors.
+            duplicate.delete()
+    index_candidate_embeddings([keeper])
+    return len(duplicates)
+
+
+def check_candidate(candidate, text):
+    """
+    Stores the signature of a freshly ingested candidate and handles its
+    near-duplicates according to settings.DEDUP_ACTION:
+
+      - "flag": older duplicates get duplicate_of set to this candidate,
+      - "merge": they are merged into this candidate and deleted,
+      - "off": nothing is stored or checked.
+
+    The newest upload is always the one kept, as it is the most up to date
+    CV. Returns the Matches found.
+    """
+    action = settings.DEDUP_ACTION
+    if action == "off":
+        return []
+    signature, phone = compute_signature(candidate, text)
+    matches = find_duplicates(candidate, signature, phone)
+    store_signatures([(candidate, signature, phone)])
+    if matches:
+        duplicate_ids = {match.duplicate_of or match.candidate_id for match in matches}
+        if action == "merge":
+            merge_duplicates(candidate, duplicate_ids)
+        else:
+            flag_duplicates(candidate, duplicate_ids)
+    return matches
@@ -0,0 +1,236 @@
+import re
+import unicodedata
+from datetime import date
+
+# Values of end_date meaning the job has not ended.
+CURRENT_WORDS = {"present", "current", "now", "ongoing", "today", "till date"}
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [
+            ("jan", "january"),
+            ("feb", "february"),
+            ("mar", "march"),
+            ("apr", "april"),
+            ("may",),
+            ("jun", "june"),
+            ("jul", "july"),
+            ("aug", "august"),
+            ("sep", "sept", "september"),
+            ("oct", "october"),
+            ("nov", "november"),
+            ("dec", "december"),
+        ],
+        start=1,
+    )
+    for name in names
+}
+
+_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+_NUMERIC_MONTH = re.compile(
+    r"\b(19|20)\d{2}[-/.](\d{1,2})\b|\b(\d{1,2})[-/.](19|20)\d{2}\b"
+)
+_WORD = re.compile(r"[a-z]+")
+
+MAX_NAME_LENGTH = 255
+MAX_EMAIL_LENGTH = 254
+MAX_TITLE_LENGTH = 255
+
+
+def normalize_name(value):
+    """
+    Case-folds a name, strips accents and collapses whitespace, so the same
+    person parsed from two CVs gets the same key.
+    """
+    value = unicodedata.normalize("NFKD", str(value or ""))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(value.casefold().split())[:MAX_NAME_LENGTH]
+
+
+def normalize_email(value):
+    return str(value or "").strip().lower()[:MAX_EMAIL_LENGTH]
+
+
+def parse_month(value, today=None):
+    """
+    Parses a CV date such as "Jan 2020", "2020-01", "01/2020", "2020" or
+    "Present" into a (year, month) tuple, or None if there is no year in it.
+    A bare year counts as January.
+    """
+    text = str(value or "").strip().lower()
+    if text in CURRENT_WORDS:
+        today = today or date.today()
+        return today.year, today.month
+    year = _YEAR.search(text)
+    if year is None:
+        return None
+    month = 1
+    numeric = _NUMERIC_MONTH.search(text)
+    if numeric:
+        month = int(numeric.group(2) or numeric.group(3))
+    else:
+        for word in _WORD.findall(text):
+            if word in MONTHS:
+                month = MONTHS[word]
+                break
+    if not 1 <= month <= 12:
+        month = 1
+    return int(year.group()), month
+
+
+def _month_index(year_month):
+    year, month = year_month
+    return year * 12 + month - 1
+
+
+def _jobs(work_experience):
+    return [job for job in work_experience or [] if isinstance(job, dict)]
+
+
+def _job_span(job, today):
+    start = parse_month(job.get("start_date"), today)
+    if start is None:
+        return None
+    # A missing end date is read as a job that is still going on.
+    end = parse_month(job.get("end_date") or "present", today)
+    if end is None or _month_index(end) < _month_index(start):
+        return None
+    return _month_index(start), _month_index(end) + 1
+
+
+def experience_months(work_experience, today=None):
+    """
+    Returns the total months of work experience, counting overlapping jobs
+    once, or None when no job has a parseable start date.
+    """
+    spans = sorted(
+        span
+        for span in (_job_span(job, today) for job in _jobs(work_experience))
+        if span
+    )
+    if not spans:
+        return None
+    total = 0
+    current_start, current_end = spans[0]
+    for start, end in spans[1:]:
+        if start > current_end:
+            total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    return total + current_end - current_start
+
+
+def latest_title(work_experience, today=None):
+    """
+    Returns the job title of the most recent job (latest end, then latest
+    start), falling back to the first listed job when no dates parse.
+    """
+    jobs = [job for job in _jobs(work_experience) if job.get("job_title")]
+    if not jobs:
+        return ""
+    dated = [(_job_span(job, today), job) for job in jobs]
+    dated = [(span, job) for span, job in dated if span]
+    if dated:
+        job = max(dated, key=lambda item: (item[0][1], item[0][0]))[1]
+    else:
+        job = jobs[0]
+    return str(job["job_title"]).strip()[:MAX_TITLE_LENGTH]
+
+
+def _texts(entries, *keys):
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            for key in keys:
+                value = entry.get(key)
+                if isinstance(value, list):
+                    yield from (str(item) for item in value if item)
+                elif value:
+                    yield str(value)
+        elif entry:
+            yield str(entry)
+
+
+def search_document(
+    personal_info, education, work_experience, skills, projects, certificates
+):
+    """
+    Returns a lower-cased, whitespace-collapsed document of the searchable
+    parts of a Candidate (name, email, titles, companies, skills, degrees,
+    institutions, projects and certificates).
+    """
+    personal_info = personal_info or {}
+    parts = [personal_info.get("name") or "", personal_info.get("email") or ""]
+    parts += _texts(work_experience, "job_title", "company")
+    parts += _texts(skills)
+    parts += _texts(education, "degree", "institution")
+    parts += _texts(projects, "project_name", "technologies")
+    parts += _texts(certificates, "certificate_name", "issued_by")
+    return " ".join(" ".join(parts).lower().split())
+
+
+def derived_columns(
+    personal_info,
+    education,
+    work_experience,
+    skills,
+    projects,
+    certificates,
+    today=None,
+):
+    """
+    Computes the typed, indexed columns of a Candidate from its JSON fields.
+    """
+    personal_info = personal_info if isinstance(personal_info, dict) else {}
+    return {
+        "normalized_name": normalize_name(personal_info.get("name")),
+        "email": normalize_email(personal_info.get("email")),
+        "experience_months": experience_months(work_experience, today),
+        "latest_title": latest_title(work_experience, today),
+        "skill_count": len([skill for skill in skills or [] if skill]),
+    }
+
+
+DERIVED_FIELDS = tuple(derived_columns(None, None, None, None, None, None))
+JSON_FIELDS = (
+    "personal_info",
+    "education",
+    "work_experience",
+    "skills",
+    "projects",
+    "certificates",
+)
+
+
+def candidate_search_document(candidate):
+    return search_document(*(getattr(candidate, field) for field in JSON_FIELDS))
+
+
+def candidate_derived_columns(candidate, today=None):
+    return derived_columns(
+        *(getattr(candidate, field) for field in JSON_FIELDS), today=today
+    )
+
+
+def backfill_derived_columns(model, batch_size=1000, today=None):
+    """
+    Recomputes the derived columns of every row of `model` (the Candidate
+    model) in batches, and returns the number of rows updated.
+    """
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model.objects.filter(pk__gt=last_pk)
+            .only("pk", *JSON_FIELDS)
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            return updated
+        for row in batch:
+            for name, value in candidate_derived_columns(row, today).items():
+                setattr(row, name, value)
+        model.objects.bulk_update(batch, DERIVED_FIELDS)
+        updated += len(batch)
+        last_pk = batch[-1].pk
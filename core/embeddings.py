@@ -0,0 +1,310 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+from filelock import FileLock
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+INITIAL_CAPACITY = 1024
+
+
+class HashingEmbedder:
+    """
+    Deterministic, offline text embedder based on the hashing trick.
+
+    Word unigrams and bigrams are hashed (CRC32) into `dim` signed buckets,
+    term counts are damped with log1p and each vector is L2-normalized, so
+    cosine similarity is a plain dot product. Any class with the same
+    `dim` / `embed(texts)` interface can be plugged in through
+    settings.EMBEDDING_BACKEND.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class VectorIndex:
+    """
+    One float32 row per Candidate, memory-mapped from disk.
+
+    Files in `directory`:
+        vectors.f32: row-major float32 matrix with `capacity` rows.
+        ids.i64: Candidate id of each row, -1 for deleted rows.
+        meta.json: {"dim", "count", "capacity"}.
+
+    Writers serialize on a file lock, so several worker processes can update
+    the index; readers only re-read meta.json and reuse their mapping until
+    its capacity or generation (bumped by rebuild) changes.
+    Capacity doubles when full, so appends are amortized O(1).
+    """
+
+    def __init__(self, directory, dim):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.vectors_path = self.directory / "vectors.f32"
+        self.ids_path = self.directory / "ids.i64"
+        self.meta_path = self.directory / "meta.json"
+        self._lock_path = self.directory / "index.lock"
+        self._read_maps = None
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta["dim"] != self.dim:
+            raise ValueError(
+                f"Vector index at {self.directory} has dim {meta['dim']}, "
+                f"expected {self.dim}. Rebuild it with rebuild_vector_index."
+            )
+        return meta
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _map(self, capacity, mode):
+        vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim)
+        )
+        ids = np.memmap(self.ids_path, dtype=np.int64, mode=mode, shape=(capacity,))
+        return vectors, ids
+
+    def _resize(self, meta, capacity):
+        for path, row_bytes in ((self.vectors_path, self.dim * 4), (self.ids_path, 8)):
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        _, ids = self._map(capacity, "r+")
+        ids[meta["capacity"] :] = -1
+        ids.flush()
+        meta["capacity"] = capacity
+
+    def _lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return FileLock(str(self._lock_path))
+
+    def upsert(self, candidate_ids, vectors):
+        """
+        Inserts or replaces the rows for the given Candidate ids.
+        """
+        candidate_ids, first = np.unique(
+            np.asarray(candidate_ids, dtype=np.int64), return_index=True
+        )
+        if not len(candidate_ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)[first]
+        with self._lock():
+            meta = self._read_meta()
+            if meta is None:
+                meta = {"dim": self.dim, "count": 0, "capacity": 0}
+                self._resize(meta, INITIAL_CAPACITY)
+
+            count = meta["count"]
+            _, ids = self._map(meta["capacity"], "r")
+            present = np.array(ids[:count])
+            del ids
+            known = np.isin(candidate_ids, present)
+            rows = np.empty(len(candidate_ids), dtype=np.int64)
+            if known.any():
+                order = np.argsort(present)
+                positions = np.searchsorted(present, candidate_ids[known], sorter=order)
+                rows[known] = order[positions]
+            new = ~known
+            rows[new] = np.arange(count, count + new.sum())
+
+            needed = count + int(new.sum())
+            if needed > meta["capacity"]:
+                self._resize(meta, max(needed, 2 * meta["capacity"]))
+
+            matrix, ids = self._map(meta["capacity"], "r+")
+            matrix[rows] = vectors
+            ids[rows] = candidate_ids
+            matrix.flush()
+            ids.flush()
+            meta["count"] = needed
+            self._write_meta(meta)
+
+    def remove(self, candidate_ids):
+        """
+        Marks the rows of the given Candidate ids as deleted.
+        """
+        if not self.meta_path.exists():
+            return
+        with self._lock():
+            meta = self._read_meta()
+            if meta is None:
+                return
+            matrix, ids = self._map(meta["capacity"], "r+")
+            rows = np.nonzero(np.isin(ids[: meta["count"]], candidate_ids))[0]
+            ids[rows] = -1
+            matrix[rows] = 0
+            matrix.flush()
+            ids.flush()
+
+    def rebuild(self, batches):
+        """
+        Replaces the whole index with the given (candidate_ids, vectors)
+        batches and returns the number of rows.
+
+        The new index is built in a temporary directory next to this one
+        while this index's lock is held, so writers wait for it and readers
+        keep searching the old files. The new files are then moved in and
+        meta.json, written last, points readers at them.
+        """
+        with self._lock():
+            build_dir = tempfile.mkdtemp(
+                prefix=f"{self.directory.name}.rebuild-", dir=self.directory.parent
+            )
+            try:
+                new = VectorIndex(build_dir, self.dim)
+                meta = {"dim": self.dim, "count": 0, "capacity": 0}
+                new._resize(meta, INITIAL_CAPACITY)
+                new._write_meta(meta)
+                for candidate_ids, vectors in batches:
+                    new.upsert(candidate_ids, vectors)
+                meta = new._read_meta()
+                # Read without the dim check: a rebuild may change the dim.
+                try:
+                    with open(self.meta_path) as f:
+                        generation = json.load(f).get("generation", 0)
+                except FileNotFoundError:
+                    generation = 0
+                meta["generation"] = generation + 1
+                os.replace(new.vectors_path, self.vectors_path)
+                os.replace(new.ids_path, self.ids_path)
+                self._write_meta(meta)
+                return meta["count"]
+            finally:
+                shutil.rmtree(build_dir, ignore_errors=True)
+
+    def vector(self, candidate_id):
+        """
+        Returns the stored vector of a Candidate, or None if it is not indexed.
+        """
+        matrix, ids, count = self._reader()
+        rows = np.nonzero(ids[:count] == candidate_id)[0]
+        return np.array(matrix[rows[0]]) if len(rows) else None
+
+    def _reader(self):
+        meta = self._read_meta()
+        if meta is None:
+            return np.zeros((0, self.dim), np.float32), np.zeros(0, np.int64), 0
+        version = (meta["capacity"], meta.get("generation", 0))
+        if self._read_maps is None or self._read_maps[0] != version:
+            self._read_maps = (version, *self._map(meta["capacity"], "r"))
+        _, matrix, ids = self._read_maps
+        return matrix, ids, meta["count"]
+
+    def search(self, query, k=10, exclude=()):
+        """
+        Returns up to k (candidate_id, cosine_score) pairs, best first.
+
+        query (ndarray): L2-normalized vector of length `dim`.
+        exclude (iterable): Candidate ids to leave out of the results.
+        """
+        matrix, ids, count = self._reader()
+        if not count or k <= 0:
+            return []
+        ids = ids[:count]
+        scores = matrix[:count] @ np.asarray(query, dtype=np.float32)
+        invalid = ids < 0
+        if exclude:
+            invalid |= np.isin(ids, list(exclude))
+        scores[invalid] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+_vector_indexes = {}
+
+
+def get_embedder():
+    return import_string(settings.EMBEDDING_BACKEND)(dim=settings.EMBEDDING_DIM)
+
+
+def get_vector_index():
+    """
+    Returns the VectorIndex configured in settings, reusing its read mapping
+    across calls in the same process.
+    """
+    key = (str(settings.EMBEDDING_INDEX_DIR), settings.EMBEDDING_DIM)
+    if key not in _vector_indexes:
+        _vector_indexes[key] = VectorIndex(*key)
+    return _vector_indexes[key]
+
+
+def candidate_document(candidate):
+    """
+    Flattens the parsed CV fields that describe what a candidate does into a
+    single text for embedding. Personal details are left out on purpose.
+    """
+    parts = list(candidate.skills or [])
+    for job in candidate.work_experience or []:
+        parts += [job.get("job_title"), job.get("company"), job.get("responsibilities")]
+    for edu in candidate.education or []:
+        parts += [edu.get("degree"), edu.get("institution")]
+    for project in candidate.projects or []:
+        parts += [
+            project.get("project_name"),
+            project.get("description"),
+            project.get("technologies"),
+        ]
+    for cert in candidate.certificates or []:
+        parts += [cert.get("certificate_name"), cert.get("issued_by")]
+    return "\n".join(str(part) for part in parts if part)
+
+
+def index_candidate_embeddings(candidates):
+    """
+    Embeds the given Candidates and upserts them into the vector index.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return
+    vectors = get_embedder().embed([candidate_document(c) for c in candidates])
+    get_vector_index().upsert([c.pk for c in candidates], vectors)
+
+
+def search_candidates(text=None, like=None, k=10):
+    """
+    Semantic top-k search over candidates.
+
+    text (str): Free-text query, e.g. "backend engineer with Django and AWS".
+    like (int): Candidate id to find similar candidates to; the candidate
+        itself is excluded from the results.
+
+    Returns a list of (candidate_id, score) pairs.
+    """
+    index = get_vector_index()
+    if like is not None:
+        query = index.vector(like)
+        if query is None:
+            return []
+        return index.search(query, k, exclude=[like])
+    return index.search(get_embedder().embed([text or ""])[0], k)
@@ -0,0 +1,94 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .metrics import observe_stage, record_cache_lookup
+from .ocr import extract_text_from_file
+
+# Bump when the extractor output changes so stale entries are ignored.
+EXTRACTION_CACHE_VERSION = 2
+
+HITS_KEY = "extraction_cache:hits"
+MISSES_KEY = "extraction_cache:misses"
+
+
+def file_sha256(chunks):
+    """
+    Computes the SHA-256 hex digest of a file from an iterable of byte chunks,
+    e.g. UploadedFile.chunks(), without holding the whole file in memory.
+    """
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_sha256(file_path, chunk_size=64 * 1024):
+    """
+    Computes the SHA-256 hex digest of a file on disk, reading it in chunks.
+    """
+    with open(file_path, "rb") as f:
+        return file_sha256(iter(lambda: f.read(chunk_size), b""))
+
+
+def _extraction_cache():
+    return caches[settings.EXTRACTION_CACHE_ALIAS]
+
+
+def _cache_key(file_hash):
+    return f"extraction:{file_hash}"
+
+
+def _incr(key):
+    # Counters live in the shared default cache so every worker reports the
+    # same numbers and they are never culled along with extraction entries.
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def extract_text_cached(file_path, file_hash=None, ocr_workers=None):
+    """
+    Returns the extracted text for a file, running OCR/extraction only when
+    the content has not been seen before.
+
+    Entries are keyed by the SHA-256 of the file content, so a re-upload of
+    the same CV under any name is served from the cache. Eviction is handled
+    by the configured cache backend (MAX_ENTRIES / TIMEOUT on the
+    settings.EXTRACTION_CACHE_ALIAS cache).
+
+    file_path (str): Path to the stored PDF or DOCX file.
+    file_hash (str): Precomputed SHA-256 of the content. Computed from
+        file_path when omitted.
+    ocr_workers (int): Passed on to extract_text_from_file.
+    """
+    if file_hash is None:
+        file_hash = path_sha256(file_path)
+
+    store = _extraction_cache()
+    key = _cache_key(file_hash)
+    text = store.get(key, version=EXTRACTION_CACHE_VERSION)
+    record_cache_lookup("extraction", text is not None)
+    if text is not None:
+        _incr(HITS_KEY)
+        return text
+
+    _incr(MISSES_KEY)
+    with observe_stage("extraction"):
+        text = extract_text_from_file(file_path, ocr_workers=ocr_workers)
+    store.set(key, text, version=EXTRACTION_CACHE_VERSION)
+    return text
+
+
+def extraction_cache_stats():
+    """
+    Returns the hit/miss counters of the extraction cache.
+    """
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        "hits": counts.get(HITS_KEY, 0),
+        "misses": counts.get(MISSES_KEY, 0),
+    }
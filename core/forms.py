@@ -3,6 +3,7 @@ import os
 from django import forms
 
 from .models import Candidate
+from .uploads import UNSUPPORTED_FILE_MESSAGE, max_upload_size, too_large_message
 
 
 class CandidateForm(forms.ModelForm):
@@ -11,8 +12,10 @@ class CandidateForm(forms.ModelForm):
 
     This form enforces:
       - File extension must be either .pdf or .docx.
-      - File size must be under 5MB.
-    If these checks fail, a ValidationError is raised.
+      - File size must be under settings.CV_UPLOAD_MAX_MB (5MB by default).
+    If these checks fail, a ValidationError is raised. Files already rejected
+    by CVUploadHandler while the request was read are passed in through
+    upload_errors and reported the same way.
 
     Fields:
         uploaded_file (FileField): The CV file to be uploaded.
@@ -22,18 +25,22 @@ class CandidateForm(forms.ModelForm):
         model = Candidate
         fields = ["uploaded_file"]
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
     def clean_uploaded_file(self):
+        if "uploaded_file" in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors["uploaded_file"])
+
         file = self.cleaned_data["uploaded_file"]
         if file:
             extension = os.path.splitext(file.name)[1].lower()
             if extension not in [".pdf", ".docx"]:
-                raise forms.ValidationError("Only PDF and DOCX files are supported.")
+                raise forms.ValidationError(UNSUPPORTED_FILE_MESSAGE)
 
-            max_size = 5
-            if file.size > max_size * 1024 * 1024:
-                raise forms.ValidationError(
-                    f"File size should be less than {max_size} MB."
-                )
+            if file.size > max_upload_size():
+                raise forms.ValidationError(too_large_message())
 
         return file
 
@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+from django.db import DatabaseError, connection, transaction
+
+from .models import CandidateText
+
+SNIPPET_START = "["
+SNIPPET_END = "]"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 12
+
+# One search hit: the Candidate id, its relevance (higher is better) and a
+# snippet of the raw text with the matches wrapped in SNIPPET_START/END.
+TextMatch = namedtuple("TextMatch", ["candidate_id", "score", "snippet"])
+
+# rank is the FTS5 BM25 score, lower is better, so it is negated for callers.
+SQLITE_SEARCH = f"""
+    SELECT rowid, -rank,
+           snippet(core_candidatetext_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}',
+                   '{SNIPPET_ELLIPSIS}', {SNIPPET_TOKENS})
+    FROM core_candidatetext_fts
+    WHERE core_candidatetext_fts MATCH %s
+    ORDER BY rank
+    LIMIT %s
+"""
+
+POSTGRESQL_SEARCH = f"""
+    SELECT candidate_id, ts_rank_cd(raw_text_tsv, query),
+           ts_headline('english', raw_text, query,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, '
+                       'MaxWords={SNIPPET_TOKENS}, MinWords=3, '
+                       'FragmentDelimiter={SNIPPET_ELLIPSIS}, MaxFragments=2')
+    FROM core_candidatetext, websearch_to_tsquery('english', %s) AS query
+    WHERE raw_text_tsv @@ query
+    ORDER BY 2 DESC
+    LIMIT %s
+"""
+
+
+class InvalidSearchQuery(ValueError):
+    """Raised when the database rejects the query syntax."""
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no full-text index (not SQLite or PostgreSQL)."""
+
+
+def store_raw_text(candidates_and_texts):
+    """
+    Saves the extracted text of each (candidate, text) pair. The full-text
+    index follows through database triggers (SQLite) or a generated column
+    (PostgreSQL).
+    """
+    rows = [
+        CandidateText(candidate=candidate, raw_text=text or "")
+        for candidate, text in candidates_and_texts
+    ]
+    CandidateText.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["candidate"],
+        update_fields=["raw_text"],
+    )
+
+
+def search_text(query, limit=20):
+    """
+    Runs a keyword search over the stored CV text and returns up to `limit`
+    TextMatch tuples, best first.
+
+    On SQLite the query uses FTS5 syntax (AND, OR, NOT, "phrases",
+    prefix*, NEAR) and is ranked with BM25. On PostgreSQL it is parsed by
+    websearch_to_tsquery ("phrases", or, -negation) and ranked with
+    ts_rank_cd. Malformed queries raise InvalidSearchQuery; other databases
+    raise SearchUnavailable.
+    """
+    if connection.vendor == "sqlite":
+        sql = SQLITE_SEARCH
+    elif connection.vendor == "postgresql":
+        sql = POSTGRESQL_SEARCH
+    else:
+        raise SearchUnavailable(
+            f"Full-text search is not available on {connection.vendor}."
+        )
+    try:
+        # The savepoint keeps a rejected query from breaking an enclosing
+        # transaction on PostgreSQL.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [query, limit])
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        raise InvalidSearchQuery(f"Invalid search query: {e}") from None
+    return [TextMatch(pk, float(score), snippet) for pk, score, snippet in rows]
@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .dedupe import check_candidate
+from .embeddings import index_candidate_embeddings
+from .extraction_cache import extract_text_cached
+from .fulltext import store_raw_text
+from .metrics import observe_stage
+from .models import Candidate
+from .openai_services import parse_resume_with_llm
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_FIELDS = [
+    "personal_info",
+    "education",
+    "work_experience",
+    "skills",
+    "projects",
+    "certificates",
+]
+
+PARSE_ERROR_MESSAGE = "We encountered an issue parsing your CV. Please try again."
+
+_ingestion_executor = None
+
+
+def _get_ingestion_executor():
+    """
+    Returns the in-process thread pool that runs background ingestion jobs,
+    creating it on first use. Bounded by settings.INGESTION_MAX_WORKERS.
+    """
+    global _ingestion_executor
+    if _ingestion_executor is None:
+        _ingestion_executor = ThreadPoolExecutor(
+            max_workers=settings.INGESTION_MAX_WORKERS,
+            thread_name_prefix="cv-ingestion",
+        )
+    return _ingestion_executor
+
+
+def apply_parsed_data(candidate, candidate_data):
+    for field in CANDIDATE_FIELDS:
+        setattr(candidate, field, candidate_data[field])
+
+
+def process_candidate(candidate_id, file_hash=None):
+    """
+    Runs extraction and LLM parsing for a pending Candidate.
+
+    The candidate is claimed with a conditional UPDATE, so a row is only ever
+    processed once even if it is queued twice (e.g. by the executor and by
+    the `ingest_pending` command). Per-stage durations are stored in
+    `Candidate.timings`; any error marks the candidate as failed instead of
+    propagating. A candidate deleted while it is being processed is logged
+    and left deleted, since there is no row to mark. The extracted text is
+    kept in CandidateText for keyword search, even when parsing fails.
+    Parsed candidates are then checked for near-duplicates (see
+    core.dedupe.check_candidate).
+
+    candidate_id (int): Primary key of the Candidate to process.
+    file_hash (str): SHA-256 of the uploaded file, if already known.
+    """
+    now = timezone.now()
+    claimed = Candidate.objects.filter(
+        pk=candidate_id, status=Candidate.Status.PENDING
+    ).update(
+        status=Candidate.Status.PROCESSING, processing_started_at=now, updated_at=now
+    )
+    if not claimed:
+        return
+
+    try:
+        candidate = Candidate.objects.get(pk=candidate_id)
+    except Candidate.DoesNotExist:
+        logger.warning("Candidate %s was deleted before ingestion.", candidate_id)
+        return
+    timings = {}
+    extracted_text = None
+    try:
+        start = time.perf_counter()
+        extracted_text = extract_text_cached(candidate.uploaded_file.path, file_hash)
+        timings["extraction_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate_data = json.loads(parse_resume_with_llm(extracted_text))
+        timings["parse_seconds"] = time.perf_counter() - start
+
+        apply_parsed_data(candidate, candidate_data)
+        candidate.status = Candidate.Status.DONE
+    except json.JSONDecodeError:
+        candidate.status = Candidate.Status.FAILED
+        candidate.error_message = PARSE_ERROR_MESSAGE
+    except Exception as e:
+        candidate.status = Candidate.Status.FAILED
+        candidate.error_message = f"An unexpected error occurred: {str(e)}"
+
+    candidate.timings = timings
+    candidate.processing_finished_at = timezone.now()
+    with observe_stage("db_save"):
+        try:
+            # A plain save() would insert the row again if it was deleted;
+            # the savepoint keeps a failed update from breaking an
+            # enclosing transaction.
+            with transaction.atomic():
+                candidate.save(force_update=True)
+        except DatabaseError:
+            if Candidate.objects.filter(pk=candidate_id).exists():
+                raise
+            logger.warning("Candidate %s was deleted during ingestion.", candidate_id)
+            return
+        if extracted_text is not None:
+            store_raw_text([(candidate, extracted_text)])
+    if candidate.status == Candidate.Status.DONE:
+        check_candidate(candidate, extracted_text)
+        index_candidate_embeddings([candidate])
+
+
+def _run_job(candidate_id, file_hash):
+    close_old_connections()
+    try:
+        process_candidate(candidate_id, file_hash)
+    finally:
+        connection.close()
+
+
+def enqueue_candidate(candidate_id, file_hash=None):
+    """
+    Schedules background ingestion of a pending Candidate.
+
+    With settings.INGESTION_EAGER enabled the job runs synchronously in the
+    calling thread, which is what the test suite uses.
+    """
+    if settings.INGESTION_EAGER:
+        process_candidate(candidate_id, file_hash)
+    else:
+        _get_ingestion_executor().submit(_run_job, candidate_id, file_hash)
+
+
+def ingestion_status(candidate):
+    """
+    Returns a JSON-serializable status report for a Candidate.
+    """
+
+    def isoformat(value):
+        return value.isoformat() if value else None
+
+    return {
+        "id": candidate.pk,
+        "status": candidate.status,
+        "error": candidate.error_message,
+        "queued_at": isoformat(candidate.created_at),
+        "started_at": isoformat(candidate.processing_started_at),
+        "finished_at": isoformat(candidate.processing_finished_at),
+        "timings": candidate.timings,
+    }
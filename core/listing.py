@@ -0,0 +1,200 @@
+import base64
+import binascii
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db.models import Exists, OuterRef
+from django.db.models.fields.json import KT
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .derived import normalize_email, normalize_name
+from .models import Candidate, CandidateTerm
+from .retrieval import normalize_term
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Columns a list page needs; the JSON columns are never loaded.
+LIST_COLUMNS = (
+    "id",
+    "status",
+    "latest_title",
+    "experience_months",
+    "skill_count",
+    "created_at",
+    "updated_at",
+)
+
+
+class InvalidQuery(ValueError):
+    """Raised for malformed filters or cursors."""
+
+
+@dataclass
+class CandidateFilters:
+    """
+    Filters for the candidate list. Term filters are matched exactly against
+    the normalized CandidateTerm index; every given value must match.
+    """
+
+    skills: list = field(default_factory=list)
+    companies: list = field(default_factory=list)
+    degrees: list = field(default_factory=list)
+    created_from: datetime = None
+    created_to: datetime = None
+    status: str = None
+    name: str = None
+    email: str = None
+    min_experience_months: int = None
+    max_experience_months: int = None
+    min_skill_count: int = None
+
+    @classmethod
+    def from_query(cls, params):
+        """
+        Builds filters from a QueryDict, e.g. ?skill=python&skill=django
+        &company=acme&degree=bsc&created_from=2025-01-01&created_to=2025-02-01.
+        Dates are inclusive and may also be full ISO datetimes. name and email
+        match the normalized Candidate columns exactly; the experience and
+        skill count bounds are inclusive.
+        """
+        status = params.get("status") or None
+        if status is not None and status not in Candidate.Status.values:
+            raise InvalidQuery(f"Unknown status: {status}.")
+        return cls(
+            skills=_terms(params.getlist("skill")),
+            companies=_terms(params.getlist("company")),
+            degrees=_terms(params.getlist("degree")),
+            created_from=_parse_bound(params.get("created_from"), end=False),
+            created_to=_parse_bound(params.get("created_to"), end=True),
+            status=status,
+            name=normalize_name(params.get("name")) or None,
+            email=normalize_email(params.get("email")) or None,
+            min_experience_months=_parse_int(params, "min_experience_months"),
+            max_experience_months=_parse_int(params, "max_experience_months"),
+            min_skill_count=_parse_int(params, "min_skill_count"),
+        )
+
+    def term_filters(self):
+        Kind = CandidateTerm.Kind
+        for kind, values in (
+            (Kind.SKILL, self.skills),
+            (Kind.COMPANY, self.companies),
+            (Kind.DEGREE, self.degrees),
+        ):
+            for value in values:
+                yield kind, value
+
+
+def _terms(values):
+    return [term for term in (normalize_term(value) for value in values) if term]
+
+
+def _parse_int(params, key):
+    value = params.get(key)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise InvalidQuery(f"{key} must be an integer.") from None
+
+
+def _parse_bound(value, end):
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(
+            day, datetime.max.time() if end else datetime.min.time()
+        )
+    if moment is None:
+        raise InvalidQuery(f"Invalid date: {value}.")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def encode_cursor(candidate):
+    """
+    Encodes the (created_at, id) position of the last row of a page.
+    """
+    raw = f"{candidate.created_at.isoformat()}|{candidate.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidQuery("Invalid cursor.") from None
+    if created_at is None:
+        raise InvalidQuery("Invalid cursor.")
+    return created_at, pk
+
+
+def filter_candidates(filters):
+    """
+    Returns a queryset of the Candidates matching the filters, newest first,
+    loading only LIST_COLUMNS plus the candidate's name.
+    """
+    queryset = Candidate.objects.only(*LIST_COLUMNS).annotate(
+        name=KT("personal_info__name")
+    )
+    for kind, value in filters.term_filters():
+        queryset = queryset.filter(
+            Exists(
+                CandidateTerm.objects.filter(
+                    candidate=OuterRef("pk"), kind=kind, value=value
+                )
+            )
+        )
+    if filters.created_from is not None:
+        queryset = queryset.filter(created_at__gte=filters.created_from)
+    if filters.created_to is not None:
+        queryset = queryset.filter(created_at__lte=filters.created_to)
+    if filters.status is not None:
+        queryset = queryset.filter(status=filters.status)
+    if filters.name is not None:
+        queryset = queryset.filter(normalized_name=filters.name)
+    if filters.email is not None:
+        queryset = queryset.filter(email=filters.email)
+    if filters.min_experience_months is not None:
+        queryset = queryset.filter(experience_months__gte=filters.min_experience_months)
+    if filters.max_experience_months is not None:
+        queryset = queryset.filter(experience_months__lte=filters.max_experience_months)
+    if filters.min_skill_count is not None:
+        queryset = queryset.filter(skill_count__gte=filters.min_skill_count)
+    return queryset.order_by("-created_at", "-id")
+
+
+def list_candidates(filters, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Returns (candidates, next_cursor) for one page of the candidate list.
+
+    Pages are addressed by keyset rather than OFFSET: the cursor holds the
+    (created_at, id) of the previous page's last row and the next page starts
+    strictly after it. Combined with the (created_at, id) index, every page
+    costs the same index seek, however deep into the list it is.
+    next_cursor is None on the last page.
+    """
+    queryset = filter_candidates(filters)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        # Equivalent to (created_at, id) < (cursor), written so the
+        # created_at range can be read straight off the index.
+        queryset = queryset.filter(created_at__lte=created_at).exclude(
+            created_at=created_at, id__gte=pk
+        )
+    rows = list(queryset[: page_size + 1])
+    if len(rows) > page_size:
+        return rows[:page_size], encode_cursor(rows[page_size - 1])
+    return rows, None
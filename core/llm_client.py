@@ -0,0 +1,687 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+import httpx
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .metrics import LLM_COALESCED, LLM_GOVERNOR_WAIT, LLM_RETRIES
+from .prompts import FrozenDict, canonical_json, thaw
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors.
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Rough size of a token, used to estimate a request's cost before sending it.
+CHARS_PER_TOKEN = 4
+
+# How often an async caller re-checks the governor while waiting; threads are
+# woken as soon as a slot is released.
+ASYNC_POLL_SECONDS = 0.01
+
+
+class LLMGovernor:
+    """
+    Process-wide limits on LLM calls, shared by threads and event loops.
+
+    At most max_concurrency requests are in flight at once, and, when set,
+    tokens_per_minute and requests_per_minute budgets (the limits of the
+    OpenAI account tier) are refilled continuously like a token bucket.
+    Token costs are estimated up front and settled against the reported
+    usage. A 429 pauses every caller until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency,
+        tokens_per_minute=0,
+        requests_per_minute=0,
+        clock=time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._tokens = float(tokens_per_minute)
+        self._requests = float(requests_per_minute)
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute / 60,
+            )
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute / 60,
+            )
+
+    def try_acquire(self, tokens):
+        """
+        Takes a slot and the budget for a request of about `tokens` tokens.
+        Returns 0 on success, otherwise the seconds to wait before retrying.
+        """
+        with self._condition:
+            now = self.clock()
+            self._refill(now)
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= self.max_concurrency:
+                return ASYNC_POLL_SECONDS
+            waits = []
+            if self.tokens_per_minute:
+                # A request larger than the whole budget waits for a full bucket.
+                tokens = min(tokens, self.tokens_per_minute)
+                if self._tokens < tokens:
+                    waits.append((tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if self.requests_per_minute and self._requests < 1:
+                waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+            if waits:
+                return max(waits)
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            if self.requests_per_minute:
+                self._requests -= 1
+            self._in_flight += 1
+            return 0
+
+    def acquire(self, tokens):
+        """
+        Blocks the calling thread until try_acquire() succeeds.
+        """
+        started = time.monotonic()
+        with self._condition:
+            while wait := self.try_acquire(tokens):
+                self._condition.wait(wait)
+        LLM_GOVERNOR_WAIT.observe(time.monotonic() - started)
+
+    async def acquire_async(self, tokens):
+        """
+        Waits without blocking the event loop until try_acquire() succeeds.
+        """
+        started = time.monotonic()
+        while wait := self.try_acquire(tokens):
+            await asyncio.sleep(min(wait, ASYNC_POLL_SECONDS))
+        LLM_GOVERNOR_WAIT.observe(time.monotonic() - started)
+
+    def release(self, estimated_tokens=0, used_tokens=None):
+        """
+        Frees a slot. When the actual usage is known, the difference from
+        the estimate is returned to (or taken from) the token budget.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if self.tokens_per_minute and used_tokens is not None:
+                estimated = min(estimated_tokens, self.tokens_per_minute)
+                self._tokens = min(
+                    self.tokens_per_minute, self._tokens + estimated - used_tokens
+                )
+            self._condition.notify_all()
+
+    def pause(self, seconds):
+        with self._condition:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+
+def estimate_tokens(request):
+    """
+    Estimates the tokens a chat completion request will use: its messages
+    and response format, plus max_tokens or the expected completion size.
+    """
+    chars = sum(len(str(m.get("content") or "")) for m in request.get("messages", []))
+    if request.get("response_format"):
+        chars += len(canonical_json(request["response_format"]))
+    completion = (
+        request.get("max_completion_tokens")
+        or request.get("max_tokens")
+        or settings.LLM_EXPECTED_COMPLETION_TOKENS
+    )
+    return chars // CHARS_PER_TOKEN + completion
+
+
+def _used_tokens(usage):
+    if usage is None:
+        return None
+    return (getattr(usage, "prompt_tokens", 0) or 0) + (
+        getattr(usage, "completion_tokens", 0) or 0
+    )
+
+
+def retry_after_seconds(error):
+    """
+    Returns the delay requested by the server in a Retry-After (seconds or
+    HTTP date) or retry-after-ms header of a failed response, or None.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """
+    Returns the seconds to wait before retry number `attempt` (from 0): the
+    server's Retry-After when it gave one, otherwise a random delay between 0
+    and min(cap, base * 2 ** attempt) ("full jitter"), so clients that failed
+    together do not retry together.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def _retry_reason(error):
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code in RETRY_STATUSES:
+            return str(error.status_code)
+    return None
+
+
+def _request_key(request):
+    response_format = request.get("response_format")
+    if isinstance(response_format, FrozenDict):
+        # Precompiled schemas (see core.prompts) stand in by their digest.
+        request = {**request, "response_format": response_format.digest()}
+    encoded = json.dumps(request, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _wire_request(request):
+    """
+    Returns the arguments to pass to the OpenAI SDK for a request. A
+    precompiled response format (see core.prompts) is handed over as a plain
+    dict, so the SDK validates and serializes it like any other; the frozen
+    template stays the shared source.
+    """
+    response_format = request.get("response_format")
+    if not isinstance(response_format, FrozenDict):
+        return request
+    return {**request, "response_format": thaw(response_format)}
+
+
+class _InFlightRequests:
+    """
+    Registry of in-flight requests, so identical ones share one call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def join(self, key):
+        """
+        Returns (future, leader): the caller that created the future must
+        make the call and finish() it; the others wait on the future.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+class _GovernedStream:
+    """
+    Iterates a streamed completion and frees its governor slot once the
+    stream is exhausted, fails or is closed.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._iterator = iter(stream)
+        self._release = release
+        self._used = None
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self._used = _used_tokens(usage)
+        return chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._stream, "close"):
+                self._stream.close()
+        finally:
+            self._release(self._used)
+
+    def __del__(self):
+        self.close()
+
+
+class _AsyncGovernedStream:
+    """
+    Async counterpart of _GovernedStream.
+    """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._release = release
+        self._used = None
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._iterator.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self._used = _used_tokens(usage)
+        return chunk
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._stream, "close"):
+                await self._stream.close()
+        finally:
+            self._release(self._used)
+
+    def __del__(self):
+        # An abandoned stream still gives its slot back; the connection is
+        # closed by the garbage collector.
+        if not self._closed:
+            self._closed = True
+            self._release(self._used)
+
+
+class _BaseLLMClient:
+    def __init__(
+        self,
+        client,
+        governor,
+        max_retries,
+        backoff_base,
+        backoff_max,
+        coalesce=True,
+        in_flight=None,
+    ):
+        self._client = client
+        self.governor = governor
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.coalesce = coalesce
+        self._in_flight = in_flight or _InFlightRequests()
+        # Same call shape as openai.OpenAI, so either can be passed around.
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _retry_delay(self, error, attempt):
+        """
+        Returns the seconds to wait before retrying after `error`, or None
+        when it should be raised.
+        """
+        reason = _retry_reason(error)
+        if reason is None or attempt >= self.max_retries:
+            return None
+        retry_after = retry_after_seconds(error)
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+        if reason == "429":
+            # The limit is shared by every caller in the process.
+            self.governor.pause(delay)
+        LLM_RETRIES.labels(reason).inc()
+        logger.warning(
+            "LLM call failed (%s), retry %d in %.2fs", reason, attempt + 1, delay
+        )
+        return delay
+
+
+class LLMClient(_BaseLLMClient):
+    """
+    Synchronous OpenAI chat client shared by the whole process.
+
+    client.chat.completions.create(**kwargs) behaves like the OpenAI SDK
+    call, but every request goes through the LLMGovernor, retryable
+    failures (timeouts, connection errors, 408/409/429/5xx) are retried up
+    to max_retries times with jittered exponential backoff that respects
+    Retry-After, and identical non-streaming requests already in flight are
+    answered by the same call. Streaming requests hold their slot until the
+    stream is consumed or closed.
+    """
+
+    def create(self, **request):
+        if request.get("stream"):
+            return self._open_stream(request)
+        if not self.coalesce:
+            return self._call(request)
+        key = _request_key(request)
+        future, leader = self._in_flight.join(key)
+        if not leader:
+            LLM_COALESCED.inc()
+            return future.result()
+        try:
+            response = self._call(request)
+        except BaseException as e:
+            self._in_flight.finish(key, error=e)
+            raise
+        self._in_flight.finish(key, response)
+        return response
+
+    def _call(self, request):
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            self.governor.acquire(tokens)
+            used = None
+            try:
+                response = self._client.chat.completions.create(
+                    **_wire_request(request)
+                )
+                used = _used_tokens(getattr(response, "usage", None))
+                return response
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.governor.release(tokens, used)
+            time.sleep(delay)
+            attempt += 1
+
+    def _open_stream(self, request):
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            self.governor.acquire(tokens)
+            try:
+                stream = self._client.chat.completions.create(**_wire_request(request))
+            except Exception as e:
+                self.governor.release(tokens)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            return _GovernedStream(
+                stream, lambda used: self.governor.release(tokens, used)
+            )
+
+
+class AsyncLLMClient(_BaseLLMClient):
+    """
+    Asynchronous counterpart of LLMClient, bound to one event loop (see
+    async_llm_client). It shares the process-wide governor and in-flight
+    registry with the synchronous client.
+    """
+
+    async def aclose(self):
+        await self._client.close()
+
+    async def create(self, **request):
+        if request.get("stream"):
+            return await self._open_stream(request)
+        if not self.coalesce:
+            return await self._call(request)
+        key = _request_key(request)
+        future, leader = self._in_flight.join(key)
+        if not leader:
+            LLM_COALESCED.inc()
+            return await asyncio.wrap_future(future)
+        try:
+            response = await self._call(request)
+        except BaseException as e:
+            self._in_flight.finish(key, error=e)
+            raise
+        self._in_flight.finish(key, response)
+        return response
+
+    async def _call(self, request):
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            await self.governor.acquire_async(tokens)
+            used = None
+            try:
+                response = await self._client.chat.completions.create(
+                    **_wire_request(request)
+                )
+                used = _used_tokens(getattr(response, "usage", None))
+                return response
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.governor.release(tokens, used)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _open_stream(self, request):
+        tokens = estimate_tokens(request)
+        attempt = 0
+        while True:
+            await self.governor.acquire_async(tokens)
+            try:
+                stream = await self._client.chat.completions.create(
+                    **_wire_request(request)
+                )
+            except Exception as e:
+                self.governor.release(tokens)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            return _AsyncGovernedStream(
+                stream, lambda used: self.governor.release(tokens, used)
+            )
+
+
+_lock = threading.Lock()
+_governor = None
+_in_flight = _InFlightRequests()
+_sync_client = None
+# httpx.AsyncClient connections belong to the event loop that opened them,
+# so each loop gets its own pooled client, closed when the loop shuts down.
+_async_clients = weakref.WeakKeyDictionary()
+_async_closers = weakref.WeakKeyDictionary()
+# The long-lived loop run_async() submits to.
+_loop = None
+
+
+def _timeout():
+    return httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+    )
+
+
+def _client_options():
+    # Retries are done here, under the governor, rather than by the SDK.
+    return {
+        "api_key": settings.OPENAI_KEY,
+        "base_url": settings.OPENAI_BASE_URL or None,
+        "max_retries": 0,
+        "timeout": _timeout(),
+    }
+
+
+def _wrapper_options():
+    return {
+        "governor": llm_governor(),
+        "max_retries": settings.LLM_MAX_RETRIES,
+        "backoff_base": settings.LLM_BACKOFF_BASE,
+        "backoff_max": settings.LLM_BACKOFF_MAX,
+        "coalesce": settings.LLM_COALESCE,
+        "in_flight": _in_flight,
+    }
+
+
+def llm_governor():
+    """
+    Returns the process-wide LLMGovernor built from the LLM_* settings.
+    """
+    global _governor
+    with _lock:
+        if _governor is None:
+            _governor = LLMGovernor(
+                settings.LLM_MAX_CONCURRENCY,
+                settings.LLM_TOKENS_PER_MINUTE,
+                settings.LLM_REQUESTS_PER_MINUTE,
+            )
+        return _governor
+
+
+def llm_client():
+    """
+    Returns the process-wide LLMClient, backed by one pooled httpx.Client.
+    """
+    global _sync_client
+    if _sync_client is None:
+        options = _wrapper_options()
+        with _lock:
+            if _sync_client is None:
+                http_client = httpx.Client(limits=_limits(), timeout=_timeout())
+                client = openai.OpenAI(http_client=http_client, **_client_options())
+                _sync_client = LLMClient(client, **options)
+    return _sync_client
+
+
+def async_llm_client():
+    """
+    Returns the AsyncLLMClient of the running event loop, backed by a pooled
+    httpx.AsyncClient that is reused by every call made on that loop and
+    closed when the loop shuts down.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+        client = AsyncLLMClient(
+            openai.AsyncOpenAI(http_client=http_client, **_client_options()),
+            **_wrapper_options(),
+        )
+        _async_clients[loop] = client
+        _async_closers[loop] = _close_on_shutdown(client)
+    return client
+
+
+def _close_on_shutdown(client):
+    """
+    Starts an async generator on the running loop that closes `client` when
+    it is finalized. asyncio.run() and asgiref's async_to_sync finalize a
+    loop's async generators (shutdown_asyncgens) before closing it, and a
+    generator that is garbage collected is finalized on its loop too.
+    """
+
+    async def closer():
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    generator = closer()
+    asyncio.ensure_future(generator.__anext__())
+    return generator
+
+
+def run_async(coroutine):
+    """
+    Runs a coroutine from synchronous code on a process-wide event loop
+    (started in a daemon thread on first use) and returns its result. Sync
+    callers that fan out async LLM calls thus share that loop's
+    async_llm_client() and its connection pool, instead of opening a
+    client per asyncio.run().
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="llm-event-loop", daemon=True
+            ).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop).result()
+
+
+def reset_llm_clients():
+    """
+    Drops the shared governor and clients so they are rebuilt from the
+    current settings on next use.
+    """
+    global _governor, _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client._client.close()
+        _governor = None
+        _sync_client = None
+        _async_clients.clear()
+        # Dropping a closer closes its client on its loop.
+        _async_closers.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith("LLM_") or setting.startswith("OPENAI_"):
+        reset_llm_clients()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.derived import backfill_derived_columns
+from core.models import Candidate
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the typed Candidate columns (normalized name, email, "
+        "experience months, latest title, skill count) from the JSON fields."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = backfill_derived_columns(Candidate, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Updated {total} candidate(s)."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from core.extraction_cache import extract_text_cached
+from core.fulltext import store_raw_text
+from core.models import Candidate
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the extracted text of candidates that have an uploaded file "
+        "but no CandidateText yet, so they show up in full-text search. Text "
+        "already in the extraction cache is reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        candidates = (
+            Candidate.objects.filter(text__isnull=True)
+            .exclude(uploaded_file="")
+            .exclude(uploaded_file__isnull=True)
+            .only("pk", "uploaded_file", "file_hash")
+        )
+        batch = []
+        stored = failed = 0
+        for candidate in candidates.iterator(chunk_size=batch_size):
+            try:
+                text = extract_text_cached(
+                    candidate.uploaded_file.path, candidate.file_hash or None
+                )
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to extract candidate {candidate.pk}: {e}")
+                continue
+            batch.append((candidate, text))
+            if len(batch) >= batch_size:
+                store_raw_text(batch)
+                stored += len(batch)
+                batch = []
+        store_raw_text(batch)
+        stored += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored text for {stored} candidate(s), {failed} failed."
+            )
+        )
@@ -0,0 +1,206 @@
+import time
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.dedupe import (
+    compute_signature,
+    flag_duplicates,
+    from_bytes,
+    is_duplicate,
+    merge_duplicates,
+    store_signatures,
+)
+from core.derived import JSON_FIELDS, candidate_search_document
+from core.models import Candidate, CandidateBucket, CandidateSignature
+
+# Buckets shared by more candidates than this are skipped when pairing, as
+# they are boilerplate (templates, placeholder text) rather than people.
+MAX_BUCKET_SIZE = 200
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds else 0.0
+
+
+class _Clusters:
+    """Union-find over candidate ids."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = self.parent.setdefault(item, item)
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def groups(self):
+        groups = defaultdict(list)
+        for item in self.parent:
+            groups[self.find(item)].append(item)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds near-duplicate candidates with MinHash/LSH across the whole "
+        "table: signs candidates that have no signature yet, pairs up the "
+        "candidates sharing an LSH bucket, verifies the pairs and flags (or "
+        "with --merge, merges) each cluster into its newest candidate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--merge",
+            action="store_true",
+            help="Merge duplicates into the newest candidate instead of flagging.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report clusters only."
+        )
+        parser.add_argument(
+            "--resign",
+            action="store_true",
+            help="Recompute the signatures of all candidates.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        signed, sign_seconds = self._sign(options["batch_size"], options["resign"])
+        self.stdout.write(
+            f"Signed {signed} candidate(s) in {sign_seconds:.2f}s "
+            f"({_rate(signed, sign_seconds):.0f}/s)."
+        )
+
+        start = time.perf_counter()
+        pairs = self._candidate_pairs()
+        clusters, confirmed = self._verify(pairs)
+        match_seconds = time.perf_counter() - start
+        total = CandidateSignature.objects.count()
+        self.stdout.write(
+            f"Matched {total} signature(s) in {match_seconds:.2f}s "
+            f"({_rate(total, match_seconds):.0f}/s): {len(pairs)} bucket pair(s), "
+            f"{confirmed} confirmed, {len(clusters)} cluster(s)."
+        )
+
+        handled = 0
+        if not options["dry_run"]:
+            handle = merge_duplicates if options["merge"] else flag_duplicates
+            newest = dict(
+                Candidate.objects.filter(
+                    pk__in=[pk for cluster in clusters for pk in cluster]
+                ).values_list("pk", "created_at")
+            )
+            for cluster in clusters:
+                cluster = [pk for pk in cluster if pk in newest]
+                if len(cluster) < 2:
+                    continue
+                keeper_id = max(cluster, key=lambda pk: (newest[pk], pk))
+                # Earlier merges may have removed candidates of this cluster.
+                keeper = Candidate.objects.filter(pk=keeper_id).first()
+                if keeper is None:
+                    continue
+                handled += handle(keeper, [pk for pk in cluster if pk != keeper_id])
+        verb = "Merged" if options["merge"] else "Flagged"
+        if options["dry_run"]:
+            verb = "Would handle"
+            handled = sum(len(cluster) - 1 for cluster in clusters)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {handled} duplicate(s) in "
+                f"{time.perf_counter() - started:.2f}s total."
+            )
+        )
+
+    def _sign(self, batch_size, resign):
+        start = time.perf_counter()
+        candidates = Candidate.objects.filter(status=Candidate.Status.DONE)
+        if not resign:
+            candidates = candidates.filter(signature__isnull=True)
+        candidates = candidates.select_related("text").only(
+            "pk", *JSON_FIELDS, "text__raw_text"
+        )
+        signed = 0
+        batch = []
+        for candidate in candidates.iterator(chunk_size=batch_size):
+            text = getattr(getattr(candidate, "text", None), "raw_text", "")
+            signature, phone = compute_signature(
+                candidate, text or candidate_search_document(candidate)
+            )
+            batch.append((candidate, signature, phone))
+            if len(batch) >= batch_size:
+                store_signatures(batch)
+                signed += len(batch)
+                batch = []
+        store_signatures(batch)
+        signed += len(batch)
+        return signed, time.perf_counter() - start
+
+    def _candidate_pairs(self):
+        """
+        Returns the set of (smaller id, larger id) pairs sharing a bucket.
+        """
+        pairs = set()
+        rows = (
+            CandidateBucket.objects.order_by("bucket", "candidate")
+            .values_list("bucket", "candidate")
+            .iterator(chunk_size=10000)
+        )
+        current, members = None, []
+        for bucket, candidate_id in rows:
+            if bucket != current:
+                if 1 < len(members) <= MAX_BUCKET_SIZE:
+                    pairs.update(combinations(members, 2))
+                current, members = bucket, []
+            members.append(candidate_id)
+        if 1 < len(members) <= MAX_BUCKET_SIZE:
+            pairs.update(combinations(members, 2))
+        return pairs
+
+    def _verify(self, pairs):
+        """
+        Compares the signatures of each pair in one vectorized pass and
+        clusters the confirmed duplicates. Returns the clusters (lists of
+        candidate ids) and the number of confirmed pairs.
+        """
+        if not pairs:
+            return [], 0
+        ids = sorted({pk for pair in pairs for pk in pair})
+        position = {pk: i for i, pk in enumerate(ids)}
+        signatures, phones, emails = [], [], []
+        rows = CandidateSignature.objects.filter(candidate__in=ids).values_list(
+            "candidate", "signature", "phone", "candidate__email"
+        )
+        by_id = {pk: (data, phone, email) for pk, data, phone, email in rows}
+        for pk in ids:
+            data, phone, email = by_id[pk]
+            signatures.append(from_bytes(data))
+            phones.append(phone)
+            emails.append(email)
+        matrix = np.vstack(signatures)
+        pair_list = list(pairs)
+        left = np.array([position[a] for a, _ in pair_list])
+        right = np.array([position[b] for _, b in pair_list])
+        scores = (matrix[left] == matrix[right]).mean(axis=1)
+
+        clusters = _Clusters()
+        confirmed = 0
+        for (a, b), i, j, score in zip(pair_list, left, right, scores):
+            same_identity = bool(emails[i] and emails[i] == emails[j]) or bool(
+                phones[i] and phones[i] == phones[j]
+            )
+            if is_duplicate(float(score), same_identity):
+                clusters.union(a, b)
+                confirmed += 1
+        return clusters.groups(), confirmed
@@ -0,0 +1,252 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.dedupe import sign_candidates
+from core.embeddings import index_candidate_embeddings
+from core.extraction_cache import extract_text_cached, path_sha256
+from core.fulltext import store_raw_text
+from core.ingestion import apply_parsed_data
+from core.models import Candidate
+from core.openai_services import parse_resume_with_llm
+from core.retrieval import index_candidates
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+STAGES = ["hash", "extract", "parse", "save"]
+
+
+def _extract_in_worker(path, file_hash):
+    try:
+        # Files are already spread over the pool, so don't fan pages out again.
+        return extract_text_cached(path, file_hash, ocr_workers=1)
+    except Exception as e:
+        # Keep unpicklable exceptions from breaking the process pool.
+        raise RuntimeError(str(e)) from None
+
+
+def iter_source_files(source, workdir):
+    """
+    Yields (name, path) for every PDF/DOCX in a directory tree or zip archive.
+
+    Zip members are extracted one at a time into `workdir` as they are
+    reached, so the archive is never unpacked all at once.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield name, os.path.join(root, name)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                yield os.path.basename(info.filename), archive.extract(info, workdir)
+    else:
+        raise CommandError(f"{source} is neither a directory nor a zip archive.")
+
+
+def _summary(values):
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    return (
+        statistics.mean(values),
+        statistics.median(values),
+        statistics.quantiles(values, n=20)[18],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-imports CVs from a directory or zip archive. Extraction runs on a "
+        "process pool and LLM parsing on a thread pool; results are written "
+        "with bulk_create. Files already imported (by content hash) are "
+        "skipped, so an interrupted import can simply be re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Directory or .zip archive of CVs.")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--extract-workers",
+            type=int,
+            default=settings.OCR_MAX_WORKERS,
+            help="Extraction processes; 0 extracts inside the parse threads.",
+        )
+        parser.add_argument(
+            "--llm-workers",
+            type=int,
+            default=8,
+            help="Concurrent parse_resume_with_llm calls.",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.stage_timings = defaultdict(list)
+        self.imported = 0
+        self.failed = 0
+        skipped = 0
+
+        seen = set(
+            Candidate.objects.exclude(file_hash="").values_list("file_hash", flat=True)
+        )
+
+        extract_workers = options["extract_workers"]
+        llm_workers = max(1, options["llm_workers"])
+        self.extract_pool = (
+            ProcessPoolExecutor(extract_workers) if extract_workers > 0 else None
+        )
+        max_in_flight = 2 * llm_workers
+
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as workdir, ThreadPoolExecutor(
+            llm_workers
+        ) as pipeline:
+            self.workdir = workdir
+            in_flight = {}
+            batch = []
+            for name, path in iter_source_files(options["source"], workdir):
+                start = time.perf_counter()
+                file_hash = path_sha256(path)
+                self.stage_timings["hash"].append(time.perf_counter() - start)
+                if file_hash in seen:
+                    skipped += 1
+                    self._discard(path)
+                    continue
+                seen.add(file_hash)
+
+                future = pipeline.submit(self._ingest, path, file_hash)
+                in_flight[future] = (name, path, file_hash)
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, in_flight, batch)
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                self._collect(done, in_flight, batch)
+            self._flush(batch)
+
+        if self.extract_pool:
+            self.extract_pool.shutdown()
+
+        self._report(time.perf_counter() - started, skipped)
+
+    def _ingest(self, path, file_hash):
+        """Runs on a pipeline thread: extraction, then the LLM call."""
+        start = time.perf_counter()
+        if self.extract_pool:
+            text = self.extract_pool.submit(
+                _extract_in_worker, path, file_hash
+            ).result()
+        else:
+            text = extract_text_cached(path, file_hash)
+        extraction_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate_data = json.loads(parse_resume_with_llm(text))
+        parse_seconds = time.perf_counter() - start
+
+        return (
+            candidate_data,
+            text,
+            {
+                "extraction_seconds": extraction_seconds,
+                "parse_seconds": parse_seconds,
+            },
+        )
+
+    def _collect(self, done, in_flight, batch):
+        for future in done:
+            name, path, file_hash = in_flight.pop(future)
+            try:
+                candidate_data, text, timings = future.result()
+            except Exception as e:
+                self.failed += 1
+                self.stderr.write(f"Failed to import {name}: {e}")
+                self._discard(path)
+                continue
+            self.stage_timings["extract"].append(timings["extraction_seconds"])
+            self.stage_timings["parse"].append(timings["parse_seconds"])
+            batch.append((name, path, file_hash, candidate_data, text, timings))
+        if len(batch) >= self.batch_size:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        now = timezone.now()
+        candidates = []
+        texts = []
+        for name, path, file_hash, candidate_data, text, timings in batch:
+            candidate = Candidate(
+                file_hash=file_hash,
+                status=Candidate.Status.DONE,
+                timings=timings,
+                processing_finished_at=now,
+            )
+            apply_parsed_data(candidate, candidate_data)
+            candidate.refresh_derived_fields()
+            with open(path, "rb") as f:
+                candidate.uploaded_file.save(name, File(f), save=False)
+            candidates.append(candidate)
+            texts.append(text)
+
+        with transaction.atomic():
+            Candidate.objects.bulk_create(candidates)
+            # bulk_create skips post_save, so index the new rows explicitly.
+            index_candidates(candidates)
+            store_raw_text(zip(candidates, texts))
+            # Duplicates are only handled by `dedupe_candidates`, so a bulk
+            # import stays one pass; the signatures are stored here for it.
+            sign_candidates(zip(candidates, texts))
+        index_candidate_embeddings(candidates)
+
+        per_candidate = (time.perf_counter() - start) / len(batch)
+        self.stage_timings["save"].extend([per_candidate] * len(batch))
+        self.imported += len(batch)
+        for _, path, *_ in batch:
+            self._discard(path)
+        batch.clear()
+        self.stdout.write(f"Imported {self.imported} CV(s)...")
+
+    def _discard(self, path):
+        """Removes zip members extracted into the work directory."""
+        if path.startswith(self.workdir):
+            os.remove(path)
+
+    def _report(self, elapsed, skipped):
+        rate = self.imported / elapsed * 60 if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} CV(s) in {elapsed:.1f}s "
+                f"({rate:.1f} CVs/min); skipped {skipped} already imported, "
+                f"{self.failed} failed."
+            )
+        )
+        self.stdout.write(f"{'stage':<10}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}")
+        for stage in STAGES:
+            mean, p50, p95 = _summary(self.stage_timings[stage])
+            self.stdout.write(
+                f"{stage:<10}{mean * 1000:>12.1f}{p50 * 1000:>12.1f}{p95 * 1000:>12.1f}"
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.ingestion import process_candidate
+from core.models import Candidate
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes every Candidate still waiting for ingestion, e.g. uploads "
+        "that were queued in a web worker that has since restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-stale",
+            action="store_true",
+            help="Also reset and re-run candidates stuck in 'processing'.",
+        )
+
+    def handle(self, *args, **options):
+        if options["include_stale"]:
+            # Bumping updated_at also moves their pages to a new cache key.
+            Candidate.objects.filter(status=Candidate.Status.PROCESSING).update(
+                status=Candidate.Status.PENDING, updated_at=timezone.now()
+            )
+
+        pending = list(
+            Candidate.objects.filter(status=Candidate.Status.PENDING).values_list(
+                "pk", flat=True
+            )
+        )
+        for candidate_id in pending:
+            process_candidate(candidate_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(pending)} candidate(s)."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Candidate
+from core.retrieval import index_candidates
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the CandidateTerm search index from the Candidate JSON fields."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        batch = []
+        total = 0
+        for candidate in Candidate.objects.iterator(chunk_size=batch_size):
+            batch.append(candidate)
+            if len(batch) >= batch_size:
+                index_candidates(batch)
+                total += len(batch)
+                batch = []
+        index_candidates(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} candidate(s)."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.embeddings import candidate_document, get_embedder, get_vector_index
+from core.models import Candidate
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the semantic search vector index from every parsed Candidate."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        candidates = Candidate.objects.filter(status=Candidate.Status.DONE).only(
+            "pk", "work_experience", "education", "skills", "projects", "certificates"
+        )
+        embedder = get_embedder()
+
+        def batches():
+            batch = []
+            for candidate in candidates.iterator(chunk_size=batch_size):
+                batch.append(candidate)
+                if len(batch) >= batch_size:
+                    yield embed(batch)
+                    batch = []
+            if batch:
+                yield embed(batch)
+
+        def embed(batch):
+            vectors = embedder.embed([candidate_document(c) for c in batch])
+            return [c.pk for c in batch], vectors
+
+        # The index stays searchable with its old rows until the swap.
+        total = get_vector_index().rebuild(batches())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} candidate(s)."))
@@ -0,0 +1,164 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Stage latencies range from sub-millisecond cache lookups to multi-second
+# OCR passes and LLM calls.
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Chat prompts and histories, from a single short turn up to a large
+# context window.
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+# Serialized chat history stored in the session.
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+STAGE_SECONDS = Histogram(
+    "cv_stage_seconds",
+    "Time spent in each CV ingestion stage.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "cv_http_request_seconds",
+    "Time spent handling HTTP requests, by URL name.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+OCR_PAGES = Counter(
+    "cv_ocr_pages",
+    "PDF pages read with Tesseract, by the DPI they were read at.",
+    ["dpi"],
+)
+CACHE_REQUESTS = Counter(
+    "cv_cache_requests",
+    "Extraction and LLM parse cache lookups.",
+    ["cache", "result"],
+)
+LLM_TOKENS = Counter(
+    "cv_llm_tokens",
+    "Tokens sent to (in) and received from (out) the LLM.",
+    ["purpose", "direction"],
+)
+LLM_RETRIES = Counter(
+    "cv_llm_retries",
+    "LLM calls retried, by reason (HTTP status, timeout or connection).",
+    ["reason"],
+)
+LLM_COALESCED = Counter(
+    "cv_llm_coalesced_requests",
+    "LLM calls answered by an identical request already in flight.",
+)
+LLM_GOVERNOR_WAIT = Histogram(
+    "cv_llm_governor_wait_seconds",
+    "Time LLM calls waited for a concurrency slot and rate budget.",
+    buckets=LATENCY_BUCKETS,
+)
+CHAT_PROMPT_TOKENS = Histogram(
+    "cv_chat_prompt_tokens",
+    "Estimated tokens in the messages sent for each chat turn.",
+    buckets=TOKEN_BUCKETS,
+)
+CHAT_HISTORY_TOKENS = Histogram(
+    "cv_chat_history_tokens",
+    "Estimated tokens of chat history kept in the session after each turn.",
+    buckets=TOKEN_BUCKETS,
+)
+CHAT_SESSION_BYTES = Histogram(
+    "cv_chat_session_bytes",
+    "Size of the chat history stored in the session after each turn.",
+    buckets=SIZE_BUCKETS,
+)
+PREPARSE_RESULTS = Counter(
+    "cv_preparse",
+    "CVs by how many resume fields the rule-based pre-parser resolved: all "
+    "(no LLM call), some, or none.",
+    ["outcome"],
+)
+RATE_LIMITED = Counter(
+    "cv_rate_limited_requests",
+    "Requests rejected by the rate limiter, by URL name.",
+    ["route"],
+)
+
+
+def observe_stage(stage):
+    """
+    Returns a context manager/decorator that records its duration in
+    STAGE_SECONDS under the given stage label.
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+def record_llm_usage(purpose, usage):
+    """
+    Adds the prompt/completion token counts of an OpenAI `usage` object to
+    LLM_TOKENS. Responses without usage (e.g. from stub clients) are ignored.
+    """
+    if usage is None:
+        return
+    LLM_TOKENS.labels(purpose, "in").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels(purpose, "out").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_chat_turn(turn):
+    """
+    Records the prompt size, history size and session size of a chat turn
+    (see Conversation.metrics).
+    """
+    CHAT_PROMPT_TOKENS.observe(turn["prompt_tokens"])
+    CHAT_HISTORY_TOKENS.observe(turn["history_tokens"])
+    CHAT_SESSION_BYTES.observe(turn["session_bytes"])
+
+
+def record_preparse(resolved, total):
+    outcome = "all" if resolved == total else "some" if resolved else "none"
+    PREPARSE_RESULTS.labels(outcome).inc()
+
+
+def metrics_registry():
+    """
+    Returns the registry to export.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, every worker process writes its
+    samples to memory-mapped files in that directory and the registry
+    aggregates them, so /metrics reports the same totals whichever worker
+    serves it. Otherwise the in-process default registry is used.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """
+    Returns (body, content_type) for the Prometheus text exposition format.
+    """
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
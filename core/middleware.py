@@ -1,49 +1,112 @@
-import json
 import time
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.cache import cache
 from django.http import HttpResponse
+from django.urls import Resolver404, resolve
 from django.utils.deprecation import MiddlewareMixin
 
+from .metrics import RATE_LIMITED, REQUEST_SECONDS
+from .ratelimit import get_rate_limiter, retry_after, rule_for
+
 
 class RateLimitMiddleware(MiddlewareMixin):
     """
     A custom Django middleware that limits requests from the same IP address
     based on configured settings.
 
-    This middleware uses a cache (e.g., Redis, LocMemCache) to track request
-    timestamps for each IP. If an IP has sent too many requests within the window,
-    further requests get an HTTP 429 (Too Many Requests).
+    Counting is delegated to core.ratelimit: atomic O(1) Lua scripts when the
+    cache is Redis, an in-process limiter otherwise. If an IP has used up its
+    budget, further requests get an HTTP 429 (Too Many Requests) with a
+    Retry-After header.
 
     Settings:
-      - RATE_LIMIT_PER_MINUTE: Maximum number of requests per minute (default: 10)
-      - RATE_LIMIT_WINDOW_SECONDS: Time window in seconds (default: 60)
+      - RATE_LIMIT_PER_MINUTE: Maximum number of requests per window (default: 20)
+      - RATE_LIMIT_WINDOW_SECONDS: Time window in seconds (default: 3600)
+      - RATE_LIMIT_ALGORITHM: fixed_window, sliding_window or token_bucket
+      - RATE_LIMIT_ROUTES: Per-URL-name budgets, or None to exempt a route
+      - RATE_LIMIT_CACHE_ALIAS: Cache whose Redis server holds the counters
     """
 
     def process_request(self, request):
+        check = self._check(request)
+        if check is None or self._hit(*check[1:]):
+            return None
+        return self._rejection(*check[:2])
+
+    async def __acall__(self, request):
+        """
+        Async path under ASGI: the limiter (a Redis round trip, or an
+        in-process lock) runs on the shared executor, and the request then
+        continues on the event loop instead of holding a thread.
+        """
+        check = self._check(request)
+        if check is not None:
+            allowed = await sync_to_async(self._hit, thread_sensitive=False)(*check[1:])
+            if not allowed:
+                return self._rejection(*check[:2])
+        return await self.get_response(request)
+
+    def _check(self, request):
+        """
+        Returns the (url_name, rule, key) the request counts against, or None
+        when it is not rate limited.
+        """
         ip_address = request.META.get("REMOTE_ADDR")
-        if ip_address:
-            key = f"rate_limit:{ip_address}"
-            rate_limit = cache.get(key)
-            if rate_limit is not None:
-                timestamps = json.loads(rate_limit)
-            else:
-                timestamps = []
-
-            now = time.time()
-            window_start = now - settings.RATE_LIMIT_WINDOW_SECONDS
-            updated_timestamps = [ts for ts in timestamps if ts > window_start]
-
-            if len(updated_timestamps) >= settings.RATE_LIMIT_PER_MINUTE:
-                return HttpResponse(
-                    f"Rate limit exceeded. Max {settings.RATE_LIMIT_PER_MINUTE} requests per {settings.RATE_LIMIT_WINDOW_SECONDS} seconds.",
-                    status=429,
-                )
-
-            updated_timestamps.append(now)
-            cache.set(
-                key, json.dumps(updated_timestamps), settings.RATE_LIMIT_WINDOW_SECONDS
-            )
+        if not ip_address:
+            return None
+
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            url_name = None
+        rule = rule_for(url_name)
+        if rule is None:
+            return None
+        return url_name, rule, f"{rule.scope}:{ip_address}"
+
+    def _hit(self, rule, key):
+        return get_rate_limiter().hit(
+            settings.RATE_LIMIT_ALGORITHM, key, rule.limit, rule.window
+        )
+
+    def _rejection(self, url_name, rule):
+        RATE_LIMITED.labels(url_name or "unmatched").inc()
+
+        response = HttpResponse(
+            f"Rate limit exceeded. Max {rule.limit} requests per {rule.window} seconds.",
+            status=429,
+        )
+        response["Retry-After"] = str(retry_after(settings.RATE_LIMIT_ALGORITHM, rule))
+        return response
+
 
-        return None
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """
+    Records how long each request took in core.metrics.REQUEST_SECONDS,
+    labelled by URL name and method.
+
+    Placed first in MIDDLEWARE so the time includes the other middleware
+    (rate limiting, sessions). For streamed responses this is the time until
+    the response starts; the LLM stream itself is timed as the llm_chat
+    stage.
+    """
+
+    def process_request(self, request):
+        request._metrics_start = time.perf_counter()
+
+    async def __acall__(self, request):
+        # Both hooks only touch memory, so under ASGI they run on the event
+        # loop rather than through sync_to_async.
+        self.process_request(request)
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        start = getattr(request, "_metrics_start", None)
+        if start is not None:
+            match = getattr(request, "resolver_match", None)
+            route = match.url_name if match and match.url_name else "unmatched"
+            REQUEST_SECONDS.labels(route, request.method).observe(
+                time.perf_counter() - start
+            )
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="error_message",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="processing_finished_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="processing_started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                default="done",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="timings",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_candidate_ingestion_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="file_hash",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=64
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_candidate_file_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("name", "Name"),
+                            ("skill", "Skill"),
+                            ("company", "Company"),
+                            ("job_title", "Job title"),
+                            ("institution", "Institution"),
+                            ("certificate", "Certificate"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("value", models.CharField(max_length=255)),
+                (
+                    "candidate",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="terms",
+                        to="core.candidate",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["value", "kind"], name="core_candid_value_0a7d21_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("candidate", "kind", "value"),
+                        name="unique_candidate_term",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_candidate_term"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="candidateterm",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("name", "Name"),
+                    ("skill", "Skill"),
+                    ("company", "Company"),
+                    ("job_title", "Job title"),
+                    ("institution", "Institution"),
+                    ("certificate", "Certificate"),
+                    ("degree", "Degree"),
+                ],
+                max_length=16,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="candidate",
+            index=models.Index(
+                fields=["created_at", "id"], name="candidate_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# SQLite: an external-content FTS5 table over core_candidatetext.raw_text,
+# kept in sync by triggers. The table is keyed by candidate_id, which is also
+# the FTS rowid.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE core_candidatetext_fts USING fts5(
+        raw_text,
+        content='core_candidatetext',
+        content_rowid='candidate_id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER core_candidatetext_fts_insert AFTER INSERT ON core_candidatetext
+    BEGIN
+        INSERT INTO core_candidatetext_fts(rowid, raw_text)
+        VALUES (new.candidate_id, new.raw_text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_candidatetext_fts_delete AFTER DELETE ON core_candidatetext
+    BEGIN
+        INSERT INTO core_candidatetext_fts(core_candidatetext_fts, rowid, raw_text)
+        VALUES ('delete', old.candidate_id, old.raw_text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_candidatetext_fts_update AFTER UPDATE ON core_candidatetext
+    WHEN old.raw_text IS NOT new.raw_text
+    BEGIN
+        INSERT INTO core_candidatetext_fts(core_candidatetext_fts, rowid, raw_text)
+        VALUES ('delete', old.candidate_id, old.raw_text);
+        INSERT INTO core_candidatetext_fts(rowid, raw_text)
+        VALUES (new.candidate_id, new.raw_text);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_candidatetext_fts_update",
+    "DROP TRIGGER IF EXISTS core_candidatetext_fts_delete",
+    "DROP TRIGGER IF EXISTS core_candidatetext_fts_insert",
+    "DROP TABLE IF EXISTS core_candidatetext_fts",
+]
+
+# PostgreSQL: a stored generated tsvector column with a GIN index.
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE core_candidatetext ADD COLUMN raw_text_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', raw_text)) STORED
+    """,
+    """
+    CREATE INDEX core_candidatetext_tsv_idx ON core_candidatetext
+    USING GIN (raw_text_tsv)
+    """,
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS core_candidatetext_tsv_idx",
+    "ALTER TABLE core_candidatetext DROP COLUMN IF EXISTS raw_text_tsv",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRESQL_BACKWARD})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_candidate_derived_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateText",
+            fields=[
+                (
+                    "candidate",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="text",
+                        serialize=False,
+                        to="core.candidate",
+                    ),
+                ),
+                ("raw_text", models.TextField(blank=True, default="")),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_candidate_text_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateSignature",
+            fields=[
+                (
+                    "candidate",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="core.candidate",
+                    ),
+                ),
+                ("signature", models.BinaryField()),
+                (
+                    "phone",
+                    models.CharField(
+                        blank=True, db_index=True, default="", max_length=32
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="duplicate_of",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="duplicates",
+                to="core.candidate",
+            ),
+        ),
+        migrations.CreateModel(
+            name="CandidateBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField(db_index=True)),
+                (
+                    "candidate",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="buckets",
+                        to="core.candidate",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_candidate_dedupe"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="candidate",
+            name="search_text",
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.1.6 on 2026-10-18 04:40
+
+import re
+
+from django.db import migrations
+
+# Frozen copies of the term rules in core.retrieval as of this migration, so
+# later changes there cannot alter what it writes.
+MAX_TERM_LENGTH = 255
+STOP_WORDS = {
+    "a",
+    "an",
+    "and",
+    "any",
+    "are",
+    "at",
+    "by",
+    "did",
+    "do",
+    "does",
+    "for",
+    "from",
+    "has",
+    "have",
+    "in",
+    "is",
+    "know",
+    "knows",
+    "of",
+    "on",
+    "or",
+    "the",
+    "to",
+    "was",
+    "what",
+    "which",
+    "who",
+    "with",
+    "worked",
+}
+EDGE_PUNCTUATION = re.compile(r"^[^\w+#.]+|[^\w+#]+$")
+ENTRY_TERMS = (
+    ("company", "work_experience", "company"),
+    ("job_title", "work_experience", "job_title"),
+    ("institution", "education", "institution"),
+    ("degree", "education", "degree"),
+    ("certificate", "certificates", "certificate_name"),
+)
+
+
+def normalize_term(value):
+    value = " ".join(str(value).lower().split())
+    return EDGE_PUNCTUATION.sub("", value)[:MAX_TERM_LENGTH]
+
+
+def candidate_terms(candidate):
+    name = (candidate.personal_info or {}).get("name") or ""
+    raw_terms = [("name", name), *(("name", part) for part in name.split())]
+    raw_terms += [("skill", skill) for skill in candidate.skills or [] if skill]
+    for kind, field, key in ENTRY_TERMS:
+        raw_terms += [
+            (kind, entry[key])
+            for entry in getattr(candidate, field) or []
+            if isinstance(entry, dict) and entry.get(key)
+        ]
+    terms = set()
+    for kind, value in raw_terms:
+        value = normalize_term(value)
+        if value and value not in STOP_WORDS:
+            terms.add((kind, value))
+    return terms
+
+
+def backfill(apps, schema_editor, batch_size=500):
+    """
+    Rebuilds the CandidateTerm rows of every candidate, so candidates saved
+    before the index (0004) or before degree terms (0005) can be filtered on.
+    """
+    Candidate = apps.get_model("core", "Candidate")
+    CandidateTerm = apps.get_model("core", "CandidateTerm")
+    fields = ("personal_info", "skills", "work_experience", "education", "certificates")
+    last_pk = 0
+    while True:
+        batch = list(
+            Candidate.objects.filter(pk__gt=last_pk)
+            .only("pk", *fields)
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            return
+        CandidateTerm.objects.filter(candidate__in=batch).delete()
+        CandidateTerm.objects.bulk_create(
+            CandidateTerm(candidate=candidate, kind=kind, value=value)
+            for candidate in batch
+            for kind, value in candidate_terms(candidate)
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_remove_candidate_search_text"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
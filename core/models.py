@@ -1,5 +1,7 @@
 from django.db import models
 
+from .derived import DERIVED_FIELDS, JSON_FIELDS, candidate_derived_columns
+
 
 # Create your models here.
 class Candidate(models.Model):
@@ -8,7 +10,9 @@ class Candidate(models.Model):
 
     This model stores structured data extracted from uploaded CVs/resumes,
     including personal information, education history, work experience,
-    skills, and other relevant details.
+    skills, and other relevant details. Uploads are parsed in the background,
+    so a Candidate starts out "pending" and moves through "processing" to
+    "done" or "failed".
 
     Attributes:
         personal_info (JSONField): Stores basic candidate information like name,
@@ -21,6 +25,20 @@ class Candidate(models.Model):
         projects (JSONField): List of projects with names, descriptions, and technologies.
         certificates (JSONField): List of certifications with names and issuing organizations.
         uploaded_file (FileField): The original CV file that was uploaded.
+        file_hash (CharField): SHA-256 of the uploaded file's content.
+        status (CharField): Ingestion state (pending, processing, done, failed).
+        error_message (TextField): Why ingestion failed, if it did.
+        processing_started_at (DateTimeField): When a worker picked up the upload.
+        processing_finished_at (DateTimeField): When ingestion finished or failed.
+        timings (JSONField): Seconds spent in each ingestion stage.
+        normalized_name (CharField): Case-folded, accent-free name.
+        email (CharField): Lower-cased email address.
+        experience_months (PositiveIntegerField): Total months of work
+            experience, overlapping jobs counted once.
+        latest_title (CharField): Job title of the most recent job.
+        skill_count (PositiveSmallIntegerField): Number of listed skills.
+        duplicate_of (ForeignKey): The newer Candidate this one was found to be
+            a near-duplicate of (see core.dedupe), or null.
         created_at (DateTimeField): Timestamp of when the record was created.
         updated_at (DateTimeField): Timestamp of when the record was last updated.
     """
@@ -33,11 +51,181 @@ class Candidate(models.Model):
     certificates = models.JSONField(blank=True, null=True)
 
     uploaded_file = models.FileField(upload_to="uploads/", blank=True, null=True)
+    file_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.DONE, db_index=True
+    )
+    error_message = models.TextField(blank=True, default="")
+    processing_started_at = models.DateTimeField(blank=True, null=True)
+    processing_finished_at = models.DateTimeField(blank=True, null=True)
+    timings = models.JSONField(blank=True, default=dict)
+
+    # Typed copies of values inside the JSON fields, recomputed on every
+    # save (see core.derived) so they can be indexed and filtered on.
+    normalized_name = models.CharField(
+        max_length=255, blank=True, default="", db_index=True
+    )
+    email = models.CharField(max_length=254, blank=True, default="", db_index=True)
+    experience_months = models.PositiveIntegerField(
+        blank=True, null=True, db_index=True
+    )
+    latest_title = models.CharField(
+        max_length=255, blank=True, default="", db_index=True
+    )
+    skill_count = models.PositiveSmallIntegerField(default=0, db_index=True)
+
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="duplicates",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Keyset pagination of the candidate list (see core.listing).
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="candidate_created_id_idx")
+        ]
+
+    def refresh_derived_fields(self, today=None):
+        """
+        Recomputes the typed columns from the JSON fields. Called by save();
+        call it directly before bulk_create()/bulk_update(), which skip save().
+        """
+        for name, value in candidate_derived_columns(self, today).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(JSON_FIELDS):
+            kwargs["update_fields"] = {*update_fields, *DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.personal_info and "name" in self.personal_info:
             return f"Candidate: {self.personal_info['name']}"
         return f"Candidate: {self.id}"
+
+
+class CandidateTerm(models.Model):
+    """
+    A normalized search term taken from a Candidate's JSON fields.
+
+    One row per (candidate, kind, value); the table is rebuilt for a candidate
+    every time it is saved and lets the chat endpoint find the candidates
+    relevant to a question with an indexed lookup instead of sending the whole
+    Candidate table to the LLM.
+
+    Attributes:
+        candidate (ForeignKey): The Candidate the term belongs to.
+        kind (CharField): Which field the term came from (skill, company, ...).
+        value (CharField): Lower-cased, whitespace-collapsed term.
+    """
+
+    class Kind(models.TextChoices):
+        NAME = "name", "Name"
+        SKILL = "skill", "Skill"
+        COMPANY = "company", "Company"
+        JOB_TITLE = "job_title", "Job title"
+        INSTITUTION = "institution", "Institution"
+        CERTIFICATE = "certificate", "Certificate"
+        DEGREE = "degree", "Degree"
+
+    candidate = models.ForeignKey(
+        Candidate, on_delete=models.CASCADE, related_name="terms"
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [models.Index(fields=["value", "kind"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["candidate", "kind", "value"], name="unique_candidate_term"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.value}"
+
+
+class CandidateText(models.Model):
+    """
+    The raw text extracted from a Candidate's CV, kept for keyword search.
+
+    Stored apart from Candidate so list and detail queries never carry it,
+    and so the full-text index built on this table (an FTS5 table kept in
+    sync by triggers on SQLite, a generated tsvector column on PostgreSQL;
+    see migration 0007 and core.fulltext) is not affected when the
+    Candidate table is rebuilt by later migrations.
+
+    Attributes:
+        candidate (OneToOneField): The Candidate, also the primary key.
+        raw_text (TextField): Text returned by the extractor.
+    """
+
+    candidate = models.OneToOneField(
+        Candidate, on_delete=models.CASCADE, primary_key=True, related_name="text"
+    )
+    raw_text = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"Text of candidate {self.candidate_id}"
+
+
+class CandidateSignature(models.Model):
+    """
+    The MinHash signature of a Candidate, used to find near-duplicate CVs.
+
+    The signature covers the word shingles of the extracted text plus the
+    normalized email and phone number (see core.dedupe); its LSH band hashes
+    are stored in CandidateBucket.
+
+    Attributes:
+        candidate (OneToOneField): The Candidate, also the primary key.
+        signature (BinaryField): The MinHash values as little-endian uint32.
+        phone (CharField): Normalized phone number (last digits only).
+    """
+
+    candidate = models.OneToOneField(
+        Candidate, on_delete=models.CASCADE, primary_key=True, related_name="signature"
+    )
+    signature = models.BinaryField()
+    phone = models.CharField(max_length=32, blank=True, default="", db_index=True)
+
+    def __str__(self):
+        return f"Signature of candidate {self.candidate_id}"
+
+
+class CandidateBucket(models.Model):
+    """
+    One LSH band hash of a Candidate's MinHash signature.
+
+    Candidates sharing a bucket agree on every row of that band, so looking
+    up the buckets of a new signature returns only the likely near-duplicates
+    instead of scanning every candidate.
+
+    Attributes:
+        candidate (ForeignKey): The Candidate the bucket belongs to.
+        bucket (BigIntegerField): Hash of the band number and its rows.
+    """
+
+    candidate = models.ForeignKey(
+        Candidate, on_delete=models.CASCADE, related_name="buckets"
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Bucket {self.bucket} of candidate {self.candidate_id}"
@@ -1,25 +1,275 @@
+import hashlib
+import logging
 import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
 
 import pdfplumber
 import pytesseract
 from django.conf import settings
+from django.core.cache import caches
 from docx import Document
+from docx.oxml.table import CT_Tbl
+from docx.oxml.text.paragraph import CT_P
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from pdfminer.pdftypes import PDFStream, resolve1
+
+from .metrics import OCR_PAGES, STAGE_SECONDS, observe_stage, record_cache_lookup
+from .uploads import open_mapped
 
 pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
 
+OCR_RESOLUTION = 400
+OCR_LANG = "eng"
+OCR_CONFIG = "--psm 4 --oem 3"
+
+# Grayscale values below this count as ink when looking for blank regions.
+INK_THRESHOLD = 200
+# Pages with less ink than this fraction of their area are treated as blank.
+BLANK_INK_RATIO = 0.0005
+# Pixels of white space kept around the inked region when cropping.
+CROP_MARGIN = 16
+
+# Outcome of OCR on one page: the text, the DPI it was read at, the mean
+# Tesseract word confidence (None when not measured) and the seconds spent.
+OCRPageResult = namedtuple("OCRPageResult", ["text", "dpi", "confidence", "seconds"])
+
+# Kinds of extracted blocks.
+PAGE = "page"
+PARAGRAPH = "paragraph"
+LIST_ITEM = "list_item"
+TABLE_CELL = "table_cell"
+
+# A unit of extracted text: its kind, text and location (page number for
+# PAGE, paragraph index for PARAGRAPH/LIST_ITEM, (table, row, column) for
+# TABLE_CELL).
+Block = namedtuple("Block", ["kind", "text", "location"])
+
+logger = logging.getLogger(__name__)
+
+_ocr_executor = None
 
-def extract_text_from_pdf(pdf_path):
+
+def _init_ocr_worker(tesseract_cmd):
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _get_ocr_executor():
     """
-    Extracts text from a PDF file using a combination of pdfplumber and OCR.
+    Returns the process pool used for page-level OCR, creating it on first use.
 
-    This function first attempts to extract text directly using pdfplumber.
-    If no text is found on a page, it falls back to OCR using pytesseract.
+    The pool is shared by every extraction in the process and is bounded by
+    settings.OCR_MAX_WORKERS.
+    """
+    global _ocr_executor
+    if _ocr_executor is None:
+        _ocr_executor = ProcessPoolExecutor(
+            max_workers=settings.OCR_MAX_WORKERS,
+            initializer=_init_ocr_worker,
+            initargs=(settings.TESSERACT_CMD,),
+        )
+    return _ocr_executor
 
-    pdf_path (str): Path to the PDF file to be processed.
+
+def _ink_bbox(image):
+    """
+    Returns the bounding box of the inked region of a grayscale image and the
+    fraction of its pixels that are ink.
+    """
+    mask = image.point(lambda p: 255 if p < INK_THRESHOLD else 0)
+    ink_pixels = mask.histogram()[255]
+    return mask.getbbox(), ink_pixels / (image.width * image.height)
+
+
+def _crop_to_ink(image):
+    """
+    Crops blank margins off a page image. Returns None for a blank or
+    near-blank page, which then skips OCR entirely.
+    """
+    bbox, ink_ratio = _ink_bbox(image)
+    if bbox is None or ink_ratio < BLANK_INK_RATIO:
+        return None
+    left, top, right, bottom = bbox
+    return image.crop(
+        (
+            max(0, left - CROP_MARGIN),
+            max(0, top - CROP_MARGIN),
+            min(image.width, right + CROP_MARGIN),
+            min(image.height, bottom + CROP_MARGIN),
+        )
+    )
+
+
+def _image_to_text_with_confidence(image):
+    """
+    Runs Tesseract once and returns the recognized text (one line per
+    Tesseract line) and the mean word confidence (0-100).
+    """
+    data = pytesseract.image_to_data(
+        image, lang=OCR_LANG, config=OCR_CONFIG, output_type=pytesseract.Output.DICT
+    )
+    lines = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line, []).append(word)
+        confidences.append(confidence)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, confidence
+
+
+def _ocr_page(page):
+    """
+    OCRs a pdfplumber page and returns an OCRPageResult.
+
+    With settings.OCR_ADAPTIVE, the page is rendered at each resolution in
+    settings.OCR_DPI_STEPS in turn, blank margins are cropped off, and the
+    first result whose mean confidence reaches
+    settings.OCR_CONFIDENCE_THRESHOLD is kept (otherwise the most confident
+    one). Blank pages are skipped after the first, cheapest render. Without
+    it, the page is rendered once at OCR_RESOLUTION.
+    """
+    start = time.perf_counter()
+    if not settings.OCR_ADAPTIVE:
+        pil_image = page.to_image(resolution=OCR_RESOLUTION).original.convert("L")
+        text = pytesseract.image_to_string(pil_image, lang=OCR_LANG, config=OCR_CONFIG)
+        return OCRPageResult(text, OCR_RESOLUTION, None, time.perf_counter() - start)
+
+    best = None
+    for dpi in settings.OCR_DPI_STEPS:
+        pil_image = _crop_to_ink(page.to_image(resolution=dpi).original.convert("L"))
+        if pil_image is None:
+            return OCRPageResult("", dpi, None, time.perf_counter() - start)
+        text, confidence = _image_to_text_with_confidence(pil_image)
+        if best is None or confidence > best[2]:
+            best = (text, dpi, confidence)
+        if confidence >= settings.OCR_CONFIDENCE_THRESHOLD:
+            break
+    return OCRPageResult(*best, time.perf_counter() - start)
+
+
+def ocr_pdf_page(pdf_path, page_number):
+    """
+    Rasterizes a single PDF page and runs Tesseract on it, returning an
+    OCRPageResult.
+
+    Runs inside an OCR worker process, so it opens the PDF itself instead of
+    receiving a rendered image over the process boundary.
+
+    pdf_path (str): Path to the PDF file.
+    page_number (int): Zero-based index of the page to OCR.
+    """
+    try:
+        with open_mapped(pdf_path) as f, pdfplumber.open(
+            f, pages=[page_number + 1]
+        ) as pdf:
+            return _ocr_page(pdf.pages[0])
+    except Exception as e:
+        # Some pytesseract errors cannot be unpickled in the parent, which
+        # would break the whole pool; hand back a plain error instead.
+        raise RuntimeError(f"OCR failed on page {page_number + 1}: {e}") from None
+
+
+def _content_fingerprint(digest, obj, depth=0):
+    obj = resolve1(obj)
+    if isinstance(obj, list):
+        for item in obj:
+            _content_fingerprint(digest, item, depth)
+    elif isinstance(obj, PDFStream):
+        digest.update(obj.get_rawdata() or b"")
+        # Follow form XObjects one level down to reach their images.
+        if depth < 1:
+            _xobject_fingerprint(digest, obj.get("Resources"), depth + 1)
+
+
+def _xobject_fingerprint(digest, resources, depth=0):
+    xobjects = resolve1((resolve1(resources) or {}).get("XObject")) or {}
+    for name in sorted(xobjects, key=str):
+        digest.update(str(name).encode())
+        _content_fingerprint(digest, xobjects[name], depth)
 
 
-    Extracted text from all pages of the PDF, with each page's
-    content separated by newlines.
+def page_fingerprint(page):
+    """
+    Returns a SHA-256 of what a pdfplumber page draws: its content streams,
+    the XObjects (scanned images, forms) it references, its size and
+    rotation. Unchanged pages of an edited PDF keep their fingerprint, so
+    their OCR result can be reused without rendering them.
+    """
+    page_obj = page.page_obj
+    digest = hashlib.sha256()
+    digest.update(repr((page_obj.mediabox, page.rotation)).encode())
+    _content_fingerprint(digest, page_obj.attrs.get("Contents"))
+    _xobject_fingerprint(digest, page_obj.resources)
+    return digest.hexdigest()
+
+
+def _ocr_cache_key(fingerprint):
+    # OCR output depends on the settings as well as the page.
+    options = (
+        settings.OCR_ADAPTIVE,
+        tuple(settings.OCR_DPI_STEPS),
+        settings.OCR_CONFIDENCE_THRESHOLD,
+        OCR_RESOLUTION,
+        OCR_LANG,
+        OCR_CONFIG,
+    )
+    options_hash = hashlib.sha256(repr(options).encode()).hexdigest()[:12]
+    return f"ocr-page:{fingerprint}:{options_hash}"
+
+
+def _ocr_cache():
+    return caches[settings.EXTRACTION_CACHE_ALIAS]
+
+
+def _cached_ocr_result(key):
+    cached = _ocr_cache().get(key)
+    record_cache_lookup("ocr_page", cached is not None)
+    return None if cached is None else OCRPageResult(*cached)
+
+
+def _record_ocr_result(pdf_path, page_number, key, result):
+    _ocr_cache().set(key, tuple(result))
+    OCR_PAGES.labels(result.dpi).inc()
+    STAGE_SECONDS.labels("ocr_page").observe(result.seconds)
+    logger.info(
+        "OCR %s page %d: dpi=%d confidence=%s seconds=%.2f",
+        pdf_path,
+        page_number + 1,
+        result.dpi,
+        "n/a" if result.confidence is None else f"{result.confidence:.1f}",
+        result.seconds,
+    )
+
+
+def extract_blocks_from_pdf(pdf_path, page_stats=None, ocr_workers=None):
+    """
+    Yields one PAGE block per page of a PDF, in page order, as soon as each
+    page is ready.
+
+    This function first attempts to extract text directly using pdfplumber,
+    reading the file through a memory map rather than a private copy.
+    Pages without a text layer are OCR'd with pytesseract (see _ocr_page for
+    the adaptive resolution); for multi-page PDFs they are sent to a process
+    pool of settings.OCR_MAX_WORKERS workers while the following pages are
+    read, so a page with a text layer is yielded without waiting for the OCR
+    of later pages. OCR results are cached by page_fingerprint(), so
+    re-processing an edited PDF only OCRs the pages that changed.
+
+    pdf_path (str): Path to the PDF file to be processed.
+    page_stats (list): Optional list that receives one dict per OCR'd page
+        with its page number, DPI, confidence, seconds and whether it came
+        from the cache, as the page is yielded.
+    ocr_workers (int): Defaults to settings.OCR_MAX_WORKERS. With 1, pages
+        are OCR'd inline, e.g. by callers that already run one extraction
+        per process; more than 1 uses the shared pool, which the setting
+        sizes.
 
     Note:
         The function uses Tesseract OCR with specific configuration:
@@ -28,63 +278,218 @@ def extract_text_from_pdf(pdf_path):
         - OEM Mode: 3
     """
 
-    text_data = set()
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text and text.strip():
-                text_data.add(text)
-            else:
-                page_img = page.to_image(resolution=400)
-                pil_image = page_img.original.convert("L")
-                ocr_text = pytesseract.image_to_string(
-                    pil_image, lang="eng", config="--psm 4 --oem 3"
-                )
-                text_data.add(ocr_text)
+    def finish(page_number, key, pending):
+        # Returns the block for a page, waiting on its OCR if needed.
+        if isinstance(pending, str):
+            return Block(PAGE, pending, page_number + 1)
+        cached = isinstance(pending, OCRPageResult)
+        if cached:
+            result = pending
+        elif isinstance(pending, Future):
+            result = pending.result()
+        else:
+            result = _ocr_page(pending)
+        if not cached:
+            _record_ocr_result(pdf_path, page_number, key, result)
+        if page_stats is not None:
+            stats = {"page": page_number + 1, **result._asdict()}
+            del stats["text"]
+            stats["cached"] = cached
+            page_stats.append(stats)
+        return Block(PAGE, result.text, page_number + 1)
 
-    return "\n".join(text for text in text_data)
+    def ready(pending):
+        # Anything but a running OCR future can be finished right away.
+        return not isinstance(pending, Future) or pending.done()
 
+    with open_mapped(pdf_path) as f, pdfplumber.open(f) as pdf:
+        if ocr_workers is None:
+            ocr_workers = settings.OCR_MAX_WORKERS
+        executor = None
+        if len(pdf.pages) > 1 and ocr_workers > 1:
+            executor = _get_ocr_executor()
 
-def extract_text_from_docx(docx_path):
-    """
-     Extracts text from a .docx (Word) file using python-docx.
+        # Pages read but not yet yielded, in page order, as (page number,
+        # cache key, pending) where pending is the page text, a cached
+        # OCRPageResult, an OCR future, or the page itself to OCR inline.
+        queue = deque()
+        try:
+            for page_number, page in enumerate(pdf.pages):
+                with observe_stage("text_layer"):
+                    text = page.extract_text()
+                if text and text.strip():
+                    queue.append((page_number, None, text))
+                else:
+                    key = _ocr_cache_key(page_fingerprint(page))
+                    pending = _cached_ocr_result(key)
+                    if pending is None:
+                        if executor is not None:
+                            pending = executor.submit(
+                                ocr_pdf_page, pdf_path, page_number
+                            )
+                        else:
+                            pending = page
+                    queue.append((page_number, key, pending))
 
-    This function reads each paragraph in the `.docx` document.
-    It also adds a hyphen prefix ("- ") to paragraphs that are
-    identified as bullet, list, or numbered styles.
+                while queue and ready(queue[0][2]):
+                    yield finish(*queue.popleft())
 
-    docx_path (str): Path to the .docx file to be processed.
+            while queue:
+                yield finish(*queue.popleft())
+        finally:
+            # A caller that stops reading early should not leave OCR queued.
+            for _, _, pending in queue:
+                if isinstance(pending, Future):
+                    pending.cancel()
 
-    str: A combined string of all paragraphs in the document,
-        separated by newlines. Bulleted or numbered items
-        are prefixed with "- ".
+
+def _is_list_paragraph(paragraph):
+    style_name = paragraph.style.name if paragraph.style else ""
+    return "List" in style_name or "Bullet" in style_name or "Number" in style_name
+
+
+def _docx_body_items(doc):
     """
-    doc = Document(docx_path)
-    text_data = set()
-    for paragraph in doc.paragraphs:
-        style_name = paragraph.style.name if paragraph.style else ""
-        if "List" in style_name or "Bullet" in style_name or "Number" in style_name:
-            line = f"- {paragraph.text}"
-        else:
-            line = paragraph.text
-        text_data.add(line)
+    Yields the paragraphs and tables of a document body in document order.
+    """
+    for child in doc.element.body.iterchildren():
+        if isinstance(child, CT_P):
+            yield Paragraph(child, doc)
+        elif isinstance(child, CT_Tbl):
+            yield Table(child, doc)
+
 
-    return "\n".join(text for text in text_data)
+def _docx_blocks(doc):
+    paragraph_index = 0
+    table_index = 0
+    for item in _docx_body_items(doc):
+        if isinstance(item, Paragraph):
+            text = item.text.strip()
+            if text:
+                kind = LIST_ITEM if _is_list_paragraph(item) else PARAGRAPH
+                yield Block(kind, text, paragraph_index)
+            paragraph_index += 1
+            continue
 
+        seen_cells = set()
+        for row_index, row in enumerate(item.rows):
+            for column_index, cell in enumerate(row.cells):
+                # Merged cells are returned once per grid column they span.
+                # The elements themselves are kept, since lxml proxies (and
+                # their ids) are recycled once nothing refers to them.
+                if cell._tc in seen_cells:
+                    continue
+                seen_cells.add(cell._tc)
+                text = " ".join(cell.text.split())
+                if text:
+                    location = (table_index, row_index, column_index)
+                    yield Block(TABLE_CELL, text, location)
+        table_index += 1
 
-def extract_text_from_file(file_path):
+
+def extract_blocks_from_docx(docx_path):
     """
-    Determines the file type (PDF or .docx) and extracts its text.
+    Yields the blocks of a .docx (Word) file in document order.
+
+    Paragraphs become PARAGRAPH blocks, or LIST_ITEM blocks when their style
+    is a bullet, list or numbered style. Tables are read cell by cell into
+    TABLE_CELL blocks located by (table, row, column); merged cells are read
+    once. Empty paragraphs and cells are skipped. Repeated text is kept.
+
+    docx_path (str): Path to the .docx file to be processed.
+    """
+    # python-docx reads the whole package on open, so the file can be
+    # closed before the blocks are walked.
+    with observe_stage("docx"), open_mapped(docx_path) as f:
+        doc = Document(f)
+    yield from _docx_blocks(doc)
+
 
-    This function inspects the file extension:
-      - If it ends with `.pdf`, it calls `extract_text_from_pdf()`.
-      - If it ends with `.docx`, it calls `extract_text_from_docx()`.
-      - Otherwise, raises a ValueError for unsupported formats.
+def extract_blocks(file_path, ocr_workers=None):
+    """
+    Yields the typed blocks of a PDF or .docx file in document order.
+    Raises a ValueError for other formats. ocr_workers is passed on to
+    extract_blocks_from_pdf.
     """
     extension = os.path.splitext(file_path)[1].lower()
     if extension == ".pdf":
-        return extract_text_from_pdf(file_path)
+        return extract_blocks_from_pdf(file_path, ocr_workers=ocr_workers)
     elif extension == ".docx":
-        return extract_text_from_docx(file_path)
+        return extract_blocks_from_docx(file_path)
     else:
         raise ValueError("Unsupported file format")
+
+
+def text_chunks(blocks):
+    """
+    Yields the lines of text handed to the LLM, one per block, as the blocks
+    arrive: list items are prefixed with "- " and the cells of a table row
+    are joined into one line with " | " (yielded once the row is complete).
+    """
+    row = None
+    row_cells = []
+    for block in blocks:
+        if block.kind == TABLE_CELL and block.location[:2] == row:
+            row_cells.append(block.text)
+            continue
+        if row_cells:
+            yield " | ".join(row_cells)
+            row, row_cells = None, []
+        if block.kind == TABLE_CELL:
+            row, row_cells = block.location[:2], [block.text]
+        elif block.kind == LIST_ITEM:
+            yield f"- {block.text}"
+        else:
+            yield block.text
+    if row_cells:
+        yield " | ".join(row_cells)
+
+
+def blocks_to_text(blocks):
+    """
+    Joins blocks into the text handed to the LLM, one line per text_chunks()
+    chunk.
+    """
+    return "\n".join(text_chunks(blocks))
+
+
+def extract_text_from_pdf(pdf_path, page_stats=None):
+    """
+    Extracts text from a PDF file (see extract_blocks_from_pdf), returning
+    the text of all pages in page order, separated by newlines.
+    """
+    return blocks_to_text(extract_blocks_from_pdf(pdf_path, page_stats))
+
+
+def extract_text_from_docx(docx_path):
+    """
+    Extracts text from a .docx (Word) file using python-docx.
+
+    Returns the document's paragraphs, list items and table rows in
+    document order (see extract_blocks_from_docx and blocks_to_text), one
+    per line. Bulleted or numbered items are prefixed with "- ".
+    """
+    return blocks_to_text(extract_blocks_from_docx(docx_path))
+
+
+def stream_text_from_file(file_path, ocr_workers=None):
+    """
+    Yields the text of a PDF or .docx file chunk by chunk (a page of a PDF, a
+    paragraph, list item or table row of a .docx) as soon as each chunk is
+    extracted, so callers can hash, index or parse the start of a CV while
+    later pages are still being OCR'd. Joining the chunks with newlines gives
+    the text returned by extract_text_from_file().
+
+    Raises a ValueError for unsupported formats before anything is read.
+    """
+    return text_chunks(extract_blocks(file_path, ocr_workers))
+
+
+def extract_text_from_file(file_path, ocr_workers=None):
+    """
+    Determines the file type (PDF or .docx) and extracts its text.
+
+    This is stream_text_from_file() with the chunks joined by newlines.
+    Raises a ValueError for unsupported formats.
+    """
+    return "\n".join(stream_text_from_file(file_path, ocr_workers))
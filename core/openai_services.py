@@ -1,18 +1,262 @@
-import openai
+import asyncio
+import hashlib
+import json
+import re
+import unicodedata
+
 from django.conf import settings
+from django.core.cache import caches
+
+from .llm_client import async_llm_client, llm_client, run_async
+from .metrics import (
+    observe_stage,
+    record_cache_lookup,
+    record_llm_usage,
+    record_preparse,
+)
+from .preparse import PREPARSE_VERSION, preparse
+from .prompts import RESUME_PROMPT, RESUME_SCHEMA, schema_hash, section_prompt
+from .sections import HEADER, OTHER, chunk_text, split_sections
+
+PARSE_MODEL = "gpt-4o-2024-08-06"
+CHAT_MODEL = "gpt-4o-2024-08-06"
+
+RESUME_KEYS = tuple(RESUME_SCHEMA["json_schema"]["schema"]["required"])
+LIST_KEYS = tuple(key for key in RESUME_KEYS if key != "personal_info")
+
+# Fields asked for in the header section (before the first heading) and in
+# summary/contact sections, which hold the contact details and often a
+# skills summary.
+HEADER_KEYS = ("personal_info", "skills")
+
+# Changes whenever a prompt or schema changes, which invalidates every
+# memoized parse produced under the previous version.
+SCHEMA_VERSION = schema_hash([RESUME_PROMPT.key, section_prompt(RESUME_KEYS).key])
+
+
+def normalize_text(raw_text: str):
+    """
+    Normalizes extracted text so that cosmetic differences (unicode forms,
+    whitespace, line wrapping) do not produce different fingerprints.
+    """
+    text = unicodedata.normalize("NFKC", raw_text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_fingerprint(raw_text: str):
+    """
+    Returns the SHA-256 hex digest of the normalized text.
+    """
+    return hashlib.sha256(normalize_text(raw_text).encode("utf-8")).hexdigest()
+
+
+def _parse_cache_key(raw_text: str, model: str, sectioned=False, preparsed=False):
+    mode = ":sections" if sectioned else ""
+    if preparsed:
+        mode += f":preparse{PREPARSE_VERSION}"
+    return f"llm_parse:{model}:{SCHEMA_VERSION}{mode}:{text_fingerprint(raw_text)}"
+
+
+def section_requests(raw_text: str, max_chars: int, only=RESUME_KEYS, sections=None):
+    """
+    Splits CV text into (keys, text) parse requests: one per section found
+    by split_sections(), asking only for the resume fields that section
+    holds, with sections longer than max_chars split between lines (each
+    piece keeps the section heading). The first request always asks for
+    personal_info.
+
+    only: Resume fields to ask for; sections holding none of them are left
+        out (used for the fields the pre-parser could not resolve).
+    sections: Precomputed split_sections() of raw_text.
+    """
+    requests = []
+    if sections is None:
+        sections = split_sections(raw_text)
+    for section in sections:
+        keys = HEADER_KEYS if section.key in (HEADER, OTHER) else (section.key,)
+        keys = tuple(key for key in keys if key in only)
+        if not keys:
+            continue
+        for i, chunk in enumerate(chunk_text(section.text, max_chars)):
+            if i and section.heading:
+                chunk = f"{section.heading}\n{chunk}"
+            requests.append((keys, chunk))
+    if "personal_info" in only and requests and "personal_info" not in requests[0][0]:
+        keys, text = requests[0]
+        requests[0] = (("personal_info", *keys), text)
+    return requests
+
+
+def _dedupe_key(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _dedupe_key(v)) for k, v in value.items()))
+    return " ".join(str(value).casefold().split())
+
+
+def _is_blank(value):
+    if isinstance(value, dict):
+        return all(_is_blank(v) for v in value.values())
+    return not str(value).strip()
+
+
+def merge_parsed_sections(parts):
+    """
+    Merges per-section parse results into the six-key resume shape. Each
+    personal_info field takes the first non-empty value; list entries are
+    concatenated in section order, dropping blank entries and entries equal
+    to an earlier one up to case and whitespace.
+    """
+    info_fields = RESUME_SCHEMA["json_schema"]["schema"]["properties"]["personal_info"][
+        "properties"
+    ]
+    merged = {"personal_info": {field: "" for field in info_fields}}
+    merged.update({key: [] for key in LIST_KEYS})
+    seen = {key: set() for key in LIST_KEYS}
+    for part in parts:
+        for field, value in (part.get("personal_info") or {}).items():
+            if value and not merged["personal_info"].get(field):
+                merged["personal_info"][field] = value
+        for key in LIST_KEYS:
+            for item in part.get(key) or []:
+                marker = _dedupe_key(item)
+                if _is_blank(item) or marker in seen[key]:
+                    continue
+                seen[key].add(marker)
+                merged[key].append(item)
+    return merged
 
-openai.api_key = settings.OPENAI_KEY
 
+def _section_cache_key(prompt, text: str):
+    return f"llm_section:{PARSE_MODEL}:{prompt.key}:{text_fingerprint(text)}"
 
-def parse_resume_with_llm(raw_text: str):
+
+async def _parse_section(client, semaphore, keys, text):
+    # Sections are memoized on their own, so re-parsing an edited CV only
+    # sends the sections whose text changed.
+    prompt = section_prompt(keys)
+    store = caches[settings.LLM_PARSE_CACHE_ALIAS]
+    key = _section_cache_key(prompt, text)
+    parsed = await store.aget(key)
+    record_cache_lookup("llm_section", parsed is not None)
+    if parsed is not None:
+        return parsed
+    async with semaphore:
+        response = await client.chat.completions.create(
+            model=PARSE_MODEL,
+            messages=prompt.messages(text),
+            response_format=prompt.response_format,
+        )
+    record_llm_usage("parse_section", getattr(response, "usage", None))
+    parsed = json.loads(response.choices[0].message.content)
+    await store.aset(key, parsed, settings.LLM_PARSE_CACHE_TIMEOUT)
+    return parsed
+
+
+async def parse_resume_sections(raw_text: str, client=None, requests=None):
+    """
+    Parses a CV section by section and returns the merged resume dict.
+
+    The sections (see section_requests) are sent as separate, smaller
+    schema calls run concurrently, at most settings.LLM_PARSE_CONCURRENCY
+    at a time, and the results are combined by merge_parsed_sections().
+    Each section's result is memoized by its fields and normalized text, so
+    only the sections that changed since an earlier version of the CV are
+    sent again.
+
+    client: Object exposing an awaitable `chat.completions.create`
+        (defaults to the shared async_llm_client() of the running loop).
+    requests: Precomputed section_requests() of raw_text.
+    """
+    if requests is None:
+        requests = section_requests(raw_text, settings.LLM_SECTION_MAX_CHARS)
+    client = client or async_llm_client()
+    semaphore = asyncio.Semaphore(settings.LLM_PARSE_CONCURRENCY)
+    parts = await asyncio.gather(
+        *(_parse_section(client, semaphore, keys, text) for keys, text in requests)
+    )
+    return merge_parsed_sections(parts)
+
+
+def pending_requests(raw_text: str, pre):
+    """
+    Returns the (keys, text) parse requests for the fields a PreParse left
+    pending: only the sections holding them when the layout was recognized
+    and each of them has a section, the whole text otherwise.
+    """
+    if not pre.pending:
+        return []
+    found = {section.key for section in pre.sections or ()}
+    if pre.sections is not None and all(
+        key in found or key == "personal_info" for key in pre.pending
+    ):
+        requests = section_requests(
+            raw_text, settings.LLM_SECTION_MAX_CHARS, pre.pending, pre.sections
+        )
+        if requests:
+            return requests
+    return [(pre.pending, raw_text)]
+
+
+def pending_calls(raw_text: str, requests):
+    """
+    Groups pre-parse requests into the LLM calls made for them: one per
+    request for long CVs (as in parse_resume_with_llm), otherwise a single
+    call asking for all their fields over the concatenated section texts.
+    """
+    if (
+        len(requests) > 1
+        and settings.LLM_SECTION_PARSE
+        and len(raw_text) >= settings.LLM_SECTION_PARSE_MIN_CHARS
+    ):
+        return requests
+    wanted = {key for keys, _ in requests for key in keys}
+    keys = tuple(key for key in RESUME_KEYS if key in wanted)
+    return [(keys, "\n\n".join(dict.fromkeys(text for _, text in requests)))]
+
+
+def _parse_pending(raw_text, requests, client, async_client):
+    calls = pending_calls(raw_text, requests)
+    if len(calls) > 1:
+        return [run_async(parse_resume_sections(raw_text, async_client, calls))]
+    ((keys, text),) = calls
+    client = client or llm_client()
+    prompt = section_prompt(keys)
+    response = client.chat.completions.create(
+        model=PARSE_MODEL,
+        messages=prompt.messages(text),
+        response_format=prompt.response_format,
+    )
+    record_llm_usage("parse", getattr(response, "usage", None))
+    return [json.loads(response.choices[0].message.content)]
+
+
+def parse_resume_with_llm(raw_text: str, client=None, async_client=None):
     """
     Parse resume text.
 
     This function takes raw text extracted from a resume and uses OpenAI's GPT model
     to structure it into predefined categories according to a specific schema.
 
+    Results are memoized in the settings.LLM_PARSE_CACHE_ALIAS cache, keyed by
+    the fingerprint of the normalized text, the model name and SCHEMA_VERSION,
+    so a CV that was already parsed is returned without calling the API.
+
+    Long CVs (at least settings.LLM_SECTION_PARSE_MIN_CHARS characters, split
+    into more than one section) are parsed section by section with
+    concurrent calls instead (see parse_resume_sections), when
+    settings.LLM_SECTION_PARSE is on.
+
+    With settings.LLM_PREPARSE on, the rule-based pre-parser (core.preparse)
+    runs first. The fields it resolves are not asked for, only the sections
+    holding the other ones are sent, and the LLM is not called at all when
+    every field was resolved locally.
+
 
     raw_text: The raw text extracted from the resume document.
+    client: Object exposing `chat.completions.create` (defaults to the
+        shared llm_client()); lets tests substitute a stub client.
+    async_client: Object exposing an awaitable `chat.completions.create`,
+        used for the section-wise parse (see parse_resume_sections).
 
 
     A JSON string containing structured resume data with the following sections:
@@ -24,189 +268,68 @@ def parse_resume_with_llm(raw_text: str):
         - certificates: List of certifications
 
     Raises:
-        openai.error.OpenAIError: If there's an issue with the OpenAI API call
+        openai.OpenAIError: If the OpenAI API call fails after retries
         json.JSONDecodeError: If the response cannot be parsed as valid JSON
     """
 
-    system_message = {
-        "role": "system",
-        "content": (
-            "You are a CV/Resume parser. You will receive the text from a CV and your task "
-            "is to extract the following information:"
-            "1. Personal Info"
-            "2. Education"
-            "3. Work Experience"
-            "4. Skills"
-            "5. Projects"
-            "6. Certifications"
-            "You must return only valid JSON with these exact top-level keys:"
-            "personal_info, education, work_experience, skills, projects, certificates."
-            "Do not include any additional commentary. Output must be valid JSON only."
-        ),
-    }
-
-    user_message = {"role": "user", "content": raw_text}
-
-    schema = {
-        "type": "json_schema",
-        "json_schema": {
-            "name": "cv_resume_parser",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "personal_info": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "Full name of the individual",
-                            },
-                            "email": {
-                                "type": "string",
-                                "description": "Email address of the individual",
-                            },
-                            "phone": {
-                                "type": "string",
-                                "description": "Phone number of the individual",
-                            },
-                            "address": {
-                                "type": "string",
-                                "description": "Postal address of the individual",
-                            },
-                        },
-                        "required": ["name", "email", "phone", "address"],
-                        "additionalProperties": False,
-                    },
-                    "education": {
-                        "type": "array",
-                        "description": "List of educational qualifications",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "degree": {
-                                    "type": "string",
-                                    "description": "Degree obtained",
-                                },
-                                "institution": {
-                                    "type": "string",
-                                    "description": "Name of the educational institution",
-                                },
-                                "year": {
-                                    "type": "string",
-                                    "description": "Year of graduation",
-                                },
-                            },
-                            "required": ["degree", "institution", "year"],
-                            "additionalProperties": False,
-                        },
-                    },
-                    "work_experience": {
-                        "type": "array",
-                        "description": "List of work experiences",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "job_title": {
-                                    "type": "string",
-                                    "description": "Title of the job held",
-                                },
-                                "company": {
-                                    "type": "string",
-                                    "description": "Company where the job was held",
-                                },
-                                "start_date": {
-                                    "type": "string",
-                                    "description": "Start date of employment",
-                                },
-                                "end_date": {
-                                    "type": "string",
-                                    "description": "End date of employment",
-                                },
-                                "responsibilities": {
-                                    "type": "string",
-                                    "description": "Key responsibilities held during the job",
-                                },
-                            },
-                            "required": [
-                                "job_title",
-                                "company",
-                                "start_date",
-                                "end_date",
-                                "responsibilities",
-                            ],
-                            "additionalProperties": False,
-                        },
-                    },
-                    "skills": {
-                        "type": "array",
-                        "description": "List of skills possessed by the individual",
-                        "items": {"type": "string"},
-                    },
-                    "projects": {
-                        "type": "array",
-                        "description": "List of projects undertaken by the individual",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "project_name": {
-                                    "type": "string",
-                                    "description": "Name of the project",
-                                },
-                                "description": {
-                                    "type": "string",
-                                    "description": "Brief description of the project",
-                                },
-                                "technologies": {
-                                    "type": "string",
-                                    "description": "Technologies used in the project",
-                                },
-                            },
-                            "required": ["project_name", "description", "technologies"],
-                            "additionalProperties": False,
-                        },
-                    },
-                    "certificates": {
-                        "type": "array",
-                        "description": "List of certifications acquired by the individual",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "certificate_name": {
-                                    "type": "string",
-                                    "description": "Name of the certification",
-                                },
-                                "issued_by": {
-                                    "type": "string",
-                                    "description": "Name of the organization that issued the certification",
-                                },
-                                "year": {
-                                    "type": "string",
-                                    "description": "Year the certification was obtained",
-                                },
-                            },
-                            "required": ["certificate_name", "issued_by", "year"],
-                            "additionalProperties": False,
-                        },
-                    },
-                },
-                "required": [
-                    "personal_info",
-                    "education",
-                    "work_experience",
-                    "skills",
-                    "projects",
-                    "certificates",
-                ],
-                "additionalProperties": False,
-            },
-            "strict": True,
-        },
-    }
-
-    response = openai.chat.completions.create(
-        model="gpt-4o-2024-08-06",
-        messages=[system_message, user_message],
-        response_format=schema,
+    pre = None
+    if settings.LLM_PREPARSE:
+        with observe_stage("preparse"):
+            pre = preparse(raw_text)
+        record_preparse(len(pre.parsed), len(RESUME_KEYS))
+        if not pre.parsed:
+            pre = None
+        elif not pre.pending:
+            return json.dumps(merge_parsed_sections([pre.parsed]))
+
+    requests = None
+    if pre is not None:
+        requests = pending_requests(raw_text, pre)
+    elif (
+        settings.LLM_SECTION_PARSE
+        and len(raw_text) >= settings.LLM_SECTION_PARSE_MIN_CHARS
+    ):
+        requests = section_requests(raw_text, settings.LLM_SECTION_MAX_CHARS)
+        if len(requests) < 2:
+            requests = None
+
+    store = caches[settings.LLM_PARSE_CACHE_ALIAS]
+    key = _parse_cache_key(
+        raw_text,
+        PARSE_MODEL,
+        sectioned=requests is not None and pre is None,
+        preparsed=pre is not None,
     )
+    content = store.get(key)
+    record_cache_lookup("llm_parse", content is not None)
+    if content is not None:
+        return content
+
+    if pre is not None:
+        with observe_stage("llm_parse"):
+            parts = _parse_pending(raw_text, requests, client, async_client)
+        content = json.dumps(merge_parsed_sections([pre.parsed, *parts]))
+        store.set(key, content, settings.LLM_PARSE_CACHE_TIMEOUT)
+        return content
+
+    if requests is not None:
+        with observe_stage("llm_parse"):
+            parsed = run_async(parse_resume_sections(raw_text, async_client, requests))
+        content = json.dumps(parsed)
+        store.set(key, content, settings.LLM_PARSE_CACHE_TIMEOUT)
+        return content
+
+    client = client or llm_client()
+    with observe_stage("llm_parse"):
+        response = client.chat.completions.create(
+            model=PARSE_MODEL,
+            messages=RESUME_PROMPT.messages(raw_text),
+            response_format=RESUME_PROMPT.response_format,
+        )
+    record_llm_usage("parse", getattr(response, "usage", None))
 
-    return response.choices[0].message.content
+    content = response.choices[0].message.content
+    # Only memoize well-formed output so a bad completion can be retried.
+    json.loads(content)
+    store.set(key, content, settings.LLM_PARSE_CACHE_TIMEOUT)
+    return content
@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+
+from .derived import JSON_FIELDS
+from .metrics import observe_stage, record_cache_lookup
+from .models import Candidate
+
+# Bump when templates/core/candidate.html changes so stale pages are ignored.
+CANDIDATE_PAGE_VERSION = 1
+
+# The columns templates/core/candidate.html reads.
+CANDIDATE_PAGE_FIELDS = ("status", "error_message", "updated_at", *JSON_FIELDS)
+
+
+def _page_cache():
+    return caches[settings.CANDIDATE_PAGE_CACHE_ALIAS]
+
+
+def _cache_key(pk, updated_at):
+    return f"candidate_page:v{CANDIDATE_PAGE_VERSION}:{pk}:{updated_at.isoformat()}"
+
+
+def candidate_page(pk):
+    """
+    Returns the (html, etag, updated_at) of a candidate's page. Only the
+    candidate's updated_at is read (an index lookup, or Http404); the page
+    cached under (pk, updated_at) is returned as is, otherwise the
+    candidate is loaded (only the columns the template reads) and rendered.
+
+    Any write that bumps updated_at (save(), and the queryset updates that
+    change a candidate's status) moves the candidate to a new key, so no
+    invalidation is needed and superseded entries simply expire after
+    CANDIDATE_PAGE_CACHE_TIMEOUT. The ETag hashes the HTML and updated_at,
+    so it changes whenever either does, including after a template change.
+    """
+    updated_at = (
+        Candidate.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+    )
+    if updated_at is None:
+        raise Http404("No Candidate matches the given query.")
+    store = _page_cache()
+    key = _cache_key(pk, updated_at)
+    entry = store.get(key)
+    record_cache_lookup("candidate_page", entry is not None)
+    if entry is not None:
+        return entry
+
+    candidate = get_object_or_404(Candidate.objects.only(*CANDIDATE_PAGE_FIELDS), pk=pk)
+    with observe_stage("candidate_render"):
+        html = render_to_string("core/candidate.html", {"candidate": candidate})
+    digest = hashlib.sha256(html.encode())
+    digest.update(candidate.updated_at.isoformat().encode())
+    etag = f'"{digest.hexdigest()[:32]}"'
+    entry = (html, etag, candidate.updated_at)
+    store.set(
+        _cache_key(pk, candidate.updated_at),
+        entry,
+        settings.CANDIDATE_PAGE_CACHE_TIMEOUT,
+    )
+    return entry
@@ -0,0 +1,459 @@
+import re
+from collections import namedtuple
+
+from .sections import HEADER, OTHER, SECTION_HEADINGS, heading_key, split_sections
+
+# Resume fields in schema order: personal_info, then the section fields.
+RESUME_KEYS = ("personal_info", *SECTION_HEADINGS)
+
+# Part of the LLM parse cache key; bump it when the rules below change so
+# results merged from an older pre-parse are not reused.
+PREPARSE_VERSION = 1
+
+# Fields whose sections are always left to the LLM: project entries have no
+# layout regular enough to split into name, description and technologies.
+LLM_ONLY_KEYS = ("projects",)
+
+# With fewer recognized field sections than this, the CV's layout is not
+# understood well enough to conclude that a missing section is empty.
+MIN_SECTIONS = 2
+
+MAX_NAME_WORDS = 4
+MAX_SKILL_WORDS = 6
+MAX_ADDRESS_WORDS = 14
+MAX_PLACE_WORDS = 5
+MAX_HEADER_WORDS = 8
+MAX_LOCATION_WORDS = 6
+
+# Lines standing in for a hyperlink in the contact details.
+LINK_LABELS = {"linkedin", "github", "gitlab", "portfolio", "website", "blog"}
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL = re.compile(
+    r"\b(?:https?://|www\.)\S+|\b(?:linkedin|github|gitlab)\.com/\S+", re.IGNORECASE
+)
+PHONE = re.compile(r"(?<![\w+])\+?\(?\d[\d \t().-]{5,}\d(?!\w)")
+ZIP_CODE = re.compile(r"^\d{5}-\d{4}$")
+MIN_PHONE_DIGITS = 7
+MAX_PHONE_DIGITS = 15
+
+_MONTH = (
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+    r"|(?:0?[1-9]|1[0-2])[/.-]"
+)
+_DATE = rf"(?:(?:{_MONTH})\s*)?(?:19|20)\d{{2}}|present|current|now|ongoing|today"
+DATE = re.compile(rf"\b(?:{_DATE})\b", re.IGNORECASE)
+DATE_RANGE = re.compile(
+    rf"\b(?P<start>{_DATE})\s*(?:-|–|—|to|until)\s*(?P<end>{_DATE})\b",
+    re.IGNORECASE,
+)
+YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+YEAR_RANGE = re.compile(r"^(?:19|20)\d{2}\s*[-–—]\s*(?:19|20)\d{2}$")
+
+DEGREE = re.compile(
+    r"\b(?:bachelor|master|doctor|doctorate|ph\.?\s?d|mba|diploma|associate|"
+    r"b\.?\s?sc|m\.?\s?sc|b\.?\s?a|m\.?\s?a|b\.?\s?eng|m\.?\s?eng|b\.?\s?tech|"
+    r"m\.?\s?tech|b\.?\s?s|m\.?\s?s|high school|baccalaureate)\b",
+    re.IGNORECASE,
+)
+INSTITUTION = re.compile(
+    r"\b(?:university|college|institute|school|academy|polytechnic|"
+    r"universit[äé]t?|école)\b",
+    re.IGNORECASE,
+)
+
+# Separators between a job title and the company, tried in order.
+TITLE_SEPARATORS = (" at ", " @ ", " | ", " — ", " – ", " - ", ", ")
+ITEM_SEPARATORS = re.compile(r"\s*[,;|•·]\s*")
+_BULLET = re.compile(r"^\s*(?:[-*•·●▪◦‣]|\d+[.)])\s*")
+
+# The outcome of pre-parsing a CV: the resume fields resolved locally, the
+# fields left for the LLM, and the CV's split_sections(), or None when its
+# layout was not recognized.
+PreParse = namedtuple("PreParse", ["parsed", "pending", "sections"])
+
+
+def _lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _body(section):
+    """The lines of a section below its heading."""
+    lines = _lines(section.text)
+    return lines[1:] if section.heading else lines
+
+
+def _strip_bullet(line):
+    return _BULLET.sub("", line).strip()
+
+
+def find_emails(text):
+    return EMAIL.findall(text)
+
+
+def find_phones(text):
+    """
+    Returns the phone numbers in a text: runs of 7-15 digits with the usual
+    separators, excluding year ranges such as "2017 - 2021", ZIP+4 codes and
+    digits inside email addresses and URLs.
+    """
+    phones = []
+    text = URL.sub(" ", EMAIL.sub(" ", text))
+    for match in PHONE.finditer(text):
+        value = match.group().strip()
+        digits = re.sub(r"\D", "", value)
+        if not MIN_PHONE_DIGITS <= len(digits) <= MAX_PHONE_DIGITS:
+            continue
+        if YEAR_RANGE.match(value) or ZIP_CODE.match(value):
+            continue
+        phones.append(value)
+    return phones
+
+
+def _is_contact(line):
+    return bool(EMAIL.search(line) or URL.search(line) or find_phones(line))
+
+
+def _looks_like_name(line):
+    words = line.split()
+    if not 2 <= len(words) <= MAX_NAME_WORDS or heading_key(line):
+        return False
+    return all(re.fullmatch(r"[^\W\d_][\w.'’-]*", word) for word in words) and all(
+        word[0].isupper() for word in words
+    )
+
+
+def _looks_like_place(line):
+    """ "Detroit, MI" or "Chicago, Illinois, US": short capitalized parts."""
+    parts = [part.split() for part in line.split(",")]
+    return len(line.split()) <= MAX_PLACE_WORDS and all(
+        0 < len(words) <= 3 and words[0][0].isupper() for words in parts
+    )
+
+
+def _find_address(lines, skip):
+    """
+    Returns the first line that looks like a postal address (it has a comma
+    and either a digit or only short capitalized parts, and is not contact
+    details), joined with a wrapped continuation line when its last part is
+    a single word ("..., New" / "Jersey").
+    """
+    for i, line in enumerate(lines):
+        if line in skip or _is_contact(line) or heading_key(line):
+            continue
+        if "," not in line or len(line.split()) > MAX_ADDRESS_WORDS:
+            continue
+        if DATE_RANGE.search(line):
+            continue
+        if not re.search(r"\d", line) and not _looks_like_place(line):
+            continue
+        last = line.rsplit(",", 1)[1].split()
+        following = lines[i + 1] if i + 1 < len(lines) else ""
+        if (
+            len(last) == 1
+            and not last[0].isupper()
+            and following
+            and len(following.split()) <= 2
+            and not re.search(r"[\d@]", following)
+            and not heading_key(following)
+            and following.casefold() not in LINK_LABELS
+        ):
+            line = f"{line} {following}"
+        return line
+    return ""
+
+
+def parse_personal_info(text):
+    """
+    Returns the personal_info found in the header/contact text of a CV, and
+    whether it is complete enough (name, email and phone) to skip the LLM.
+    The name is the first line of two to four capitalized words; the
+    address is best effort and may be empty.
+    """
+    lines = [_strip_bullet(line) for line in _lines(text)]
+    emails = find_emails(text)
+    phones = find_phones(text)
+    name = next((line for line in lines if _looks_like_name(line)), "")
+    info = {
+        "name": name,
+        "email": emails[0] if emails else "",
+        "phone": phones[0] if phones else "",
+        "address": _find_address(lines, {name}),
+    }
+    return info, bool(info["name"] and info["email"] and info["phone"])
+
+
+def _split_items(line):
+    """Splits a line at ITEM_SEPARATORS outside parentheses."""
+    items, depth, start = [], 0, 0
+    for match in re.finditer(r"[()]|" + ITEM_SEPARATORS.pattern, line):
+        if match.group() == "(":
+            depth += 1
+        elif match.group() == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            items.append(line[start : match.start()])
+            start = match.end()
+    items.append(line[start:])
+    return items
+
+
+def parse_skills(lines):
+    """
+    Splits the lines of a skills section into items. Returns the items and
+    whether they all look like skills rather than prose.
+    """
+    skills = []
+    seen = set()
+    for line in lines:
+        for item in _split_items(_strip_bullet(line)):
+            item = item.strip(" .:")
+            if item and item.casefold() not in seen:
+                seen.add(item.casefold())
+                skills.append(item)
+    confident = bool(skills) and all(
+        len(item.split()) <= MAX_SKILL_WORDS and _has_letters(item, 1)
+        for item in skills
+    )
+    return skills, confident
+
+
+def _last_year(text):
+    years = YEAR.findall(text)
+    return years[-1] if years else ""
+
+
+def parse_education(lines):
+    """
+    Parses an education section into entries. Each entry starts at a line
+    naming a degree and runs up to the next one; its institution is the
+    first line naming a university, college or school, and its year the
+    last year mentioned. "Degree | Institution | Year" rows are also read.
+    Returns the entries and whether every line was accounted for and every
+    entry has a degree and an institution.
+    """
+    entries = []
+    current = None
+    for line in map(_strip_bullet, lines):
+        parts = [part.strip() for part in line.split(" | ")]
+        if len(parts) >= 3 and YEAR.search(parts[-1]):
+            entries.append(
+                {
+                    "degree": parts[0],
+                    "institution": parts[1],
+                    "year": _last_year(parts[-1]),
+                }
+            )
+            current = None
+            continue
+        if DEGREE.search(line) and not (current and not current["institution"]):
+            current = {"degree": line, "institution": "", "year": "", "lines": [line]}
+            entries.append(current)
+            continue
+        if current is None:
+            return entries, False
+        current["lines"].append(line)
+        name = DATE.sub("", line).strip(" ,/-–—|")
+        if not current["institution"] and INSTITUTION.search(line):
+            current["institution"] = name
+        elif not current["institution"] and name:
+            current["degree"] = f"{current['degree']} {line}"
+        elif name and current["lines"][-2].endswith(","):
+            # "University of California,\nBerkeley"
+            current["institution"] = f"{current['institution']}, {name}"
+    for entry in entries:
+        entry["year"] = entry["year"] or _last_year(" ".join(entry.pop("lines", [])))
+        entry.pop("lines", None)
+    confident = bool(entries) and all(
+        entry["degree"] and entry["institution"] for entry in entries
+    )
+    return entries, confident
+
+
+def split_title_company(text):
+    """Splits "Title, Company" style job headers at the first separator."""
+    for separator in TITLE_SEPARATORS:
+        if separator in text:
+            title, company = text.split(separator, 1)
+            return title.strip(), company.strip(" ,|-–—")
+    return text.strip(), ""
+
+
+def _is_header_line(line):
+    """Whether a line can be a job title or company name on its own."""
+    words = line.split()
+    return (
+        0 < len(words) <= MAX_HEADER_WORDS
+        and line[0].isupper()
+        and not line.endswith((".", ",", ";", ":"))
+        and not DATE.search(line)
+    )
+
+
+def _has_letters(text, count=3):
+    return len(re.findall(r"[^\W\d_]", text)) >= count
+
+
+def parse_work_experience(lines):
+    """
+    Parses an experience section into jobs, anchored on date-range lines
+    ("March 2023 - Present"). The title and company are read from the text
+    before the range, from the line above ("Title, Company") or from the two
+    lines above ("Title" then "Company") when they follow the end of the
+    previous job; the lines after the range, up to the next job, are the
+    responsibilities. Short text after the range is taken for a location
+    and dropped. Rows of "Title | Company | Start | End | Responsibilities"
+    are also read.
+
+    Returns the jobs and whether every line was accounted for and every job
+    has a title, a company and dates.
+    """
+    bulleted = [bool(_BULLET.match(line)) for line in lines]
+    lines = [_strip_bullet(line) for line in lines]
+    jobs = []
+
+    def starts_entry(index):
+        # The line follows the section heading, a finished sentence or the
+        # previous job's date line, so it is not a wrapped bullet.
+        return (
+            index == 0
+            or lines[index - 1].endswith(".")
+            or bool(jobs and jobs[-1]["body"] == index)
+        )
+
+    def header_line(index):
+        return (
+            index >= 0
+            and not bulleted[index]
+            and _is_header_line(lines[index])
+            and starts_entry(index)
+        )
+
+    for i, line in enumerate(lines):
+        parts = [part.strip() for part in line.split(" | ")]
+        if len(parts) >= 4 and DATE.search(parts[2]) and DATE.search(parts[3]):
+            jobs.append(
+                {
+                    "job_title": parts[0],
+                    "company": parts[1],
+                    "start_date": parts[2],
+                    "end_date": parts[3],
+                    "responsibilities": " | ".join(parts[4:]),
+                    "start": i,
+                    "body": i + 1,
+                }
+            )
+            continue
+        match = DATE_RANGE.search(line)
+        if match is None:
+            continue
+        prefix = line[: match.start()].strip(" ,|/-–—()")
+        suffix = line[match.end() :].strip(" ,|/-–—()")
+        start = i
+        if not _has_letters(prefix):
+            if header_line(i - 2) and _is_header_line(lines[i - 1]):
+                start, title, company = i - 2, lines[i - 2], lines[i - 1]
+            elif i and not bulleted[i - 1]:
+                start = i - 1
+                title, company = split_title_company(lines[i - 1])
+            else:
+                title = company = ""
+        elif header_line(i - 1) and not split_title_company(prefix)[1]:
+            # "Title" above "Company / Dates / Location".
+            start, title, company = i - 1, lines[i - 1], prefix
+        else:
+            title, company = split_title_company(prefix)
+        jobs.append(
+            {
+                "job_title": title,
+                "company": company,
+                "start_date": match.group("start"),
+                "end_date": match.group("end"),
+                "responsibilities": (
+                    suffix if len(suffix.split()) > MAX_LOCATION_WORDS else ""
+                ),
+                "start": start,
+                "body": i + 1,
+            }
+        )
+    if not jobs or jobs[0]["start"] != 0:
+        return [], False
+    for job, following in zip(jobs, jobs[1:] + [None]):
+        end = following["start"] if following else len(lines)
+        body = job.pop("body")
+        if end < body:
+            return [], False
+        job["responsibilities"] = " ".join(
+            filter(None, [job["responsibilities"], *lines[body:end]])
+        )
+        del job["start"]
+    confident = all(
+        job["job_title"] and job["company"] and job["start_date"] for job in jobs
+    )
+    return jobs, confident
+
+
+def parse_certificates(lines):
+    """
+    Parses a certificates section, one certificate per line: its name, the
+    issuer after a separator, and the year. Returns the certificates and
+    whether every one has an issuer.
+    """
+    certificates = []
+    for line in map(_strip_bullet, lines):
+        year = _last_year(line)
+        text = YEAR.sub("", line).strip(" ,|-–—()")
+        name, issuer = split_title_company(text.replace(" (", " - ").strip(")"))
+        certificates.append(
+            {"certificate_name": name, "issued_by": issuer.strip(), "year": year}
+        )
+    confident = bool(certificates) and all(
+        cert["certificate_name"] and cert["issued_by"] for cert in certificates
+    )
+    return certificates, confident
+
+
+SECTION_PARSERS = {
+    "education": parse_education,
+    "work_experience": parse_work_experience,
+    "skills": parse_skills,
+    "certificates": parse_certificates,
+}
+
+
+def preparse(raw_text):
+    """
+    Resolves what it can of a CV without the LLM, and returns a PreParse.
+
+    personal_info comes from the header and contact sections, the other
+    fields from their sections (see SECTION_PARSERS); a field is resolved
+    only when its parser is confident about the whole section. Fields with
+    no recognized section stay pending, since their entries may sit under a
+    heading that is not recognized. The sections are returned when the
+    layout is recognized (at least MIN_SECTIONS field sections).
+    """
+    sections = split_sections(raw_text)
+    by_key = {}
+    for section in sections:
+        by_key.setdefault(section.key, []).append(section)
+    field_sections = [key for key in by_key if key not in (HEADER, OTHER)]
+
+    parsed = {}
+    contact_text = "\n".join(
+        section.text for section in sections if section.key in (HEADER, OTHER)
+    )
+    info, confident = parse_personal_info(contact_text or raw_text)
+    if confident:
+        parsed["personal_info"] = info
+
+    structured = len(field_sections) >= MIN_SECTIONS
+    for key in RESUME_KEYS[1:]:
+        if key not in by_key or key in LLM_ONLY_KEYS:
+            continue
+        lines = [line for section in by_key[key] for line in _body(section)]
+        values, confident = SECTION_PARSERS[key](lines)
+        if confident:
+            parsed[key] = values
+
+    pending = tuple(key for key in RESUME_KEYS if key not in parsed)
+    return PreParse(parsed, pending, sections if structured else None)
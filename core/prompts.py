@@ -0,0 +1,378 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+
+_dumps = partial(json.dumps, sort_keys=True, separators=(",", ":"))
+
+
+class FrozenDict(dict):
+    """
+    A dict that cannot be changed once built, for the request fragments
+    shared by every LLM call. It is still a dict, so the OpenAI SDK, json and
+    equality checks treat it as one. Its canonical JSON and digest are
+    computed once.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def canonical_json(self):
+        try:
+            return self._json
+        except AttributeError:
+            self._json = _dumps(self)
+            return self._json
+
+    def digest(self):
+        try:
+            return self._digest
+        except AttributeError:
+            self._digest = hashlib.sha256(self.canonical_json().encode()).hexdigest()
+            return self._digest
+
+
+class FrozenList(list):
+    """List counterpart of FrozenDict."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value):
+    """
+    Returns a deep, immutable copy of a JSON-like value.
+    """
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    Returns a plain, mutable deep copy of a value built by freeze().
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+def canonical_json(value):
+    """
+    Serializes a JSON-like value with sorted keys and no whitespace, so equal
+    values always give the same string.
+    """
+    if isinstance(value, FrozenDict):
+        return value.canonical_json()
+    return _dumps(value)
+
+
+def schema_hash(value):
+    """
+    Returns a short, stable hash of a JSON-like value, usable in cache keys.
+    """
+    if isinstance(value, FrozenDict):
+        return value.digest()[:16]
+    return hashlib.sha256(canonical_json(value).encode()).hexdigest()[:16]
+
+
+RESUME_SYSTEM_PROMPT = (
+    "You are a CV/Resume parser. You will receive the text from a CV and your task "
+    "is to extract the following information:"
+    "1. Personal Info"
+    "2. Education"
+    "3. Work Experience"
+    "4. Skills"
+    "5. Projects"
+    "6. Certifications"
+    "You must return only valid JSON with these exact top-level keys:"
+    "personal_info, education, work_experience, skills, projects, certificates."
+    "Do not include any additional commentary. Output must be valid JSON only."
+)
+
+RESUME_SCHEMA = freeze(
+    {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "cv_resume_parser",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "personal_info": {
+                        "type": "object",
+                        "properties": {
+                            "name": {
+                                "type": "string",
+                                "description": "Full name of the individual",
+                            },
+                            "email": {
+                                "type": "string",
+                                "description": "Email address of the individual",
+                            },
+                            "phone": {
+                                "type": "string",
+                                "description": "Phone number of the individual",
+                            },
+                            "address": {
+                                "type": "string",
+                                "description": "Postal address of the individual",
+                            },
+                        },
+                        "required": ["name", "email", "phone", "address"],
+                        "additionalProperties": False,
+                    },
+                    "education": {
+                        "type": "array",
+                        "description": "List of educational qualifications",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "degree": {
+                                    "type": "string",
+                                    "description": "Degree obtained",
+                                },
+                                "institution": {
+                                    "type": "string",
+                                    "description": "Name of the educational institution",
+                                },
+                                "year": {
+                                    "type": "string",
+                                    "description": "Year of graduation",
+                                },
+                            },
+                            "required": ["degree", "institution", "year"],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "work_experience": {
+                        "type": "array",
+                        "description": "List of work experiences",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "job_title": {
+                                    "type": "string",
+                                    "description": "Title of the job held",
+                                },
+                                "company": {
+                                    "type": "string",
+                                    "description": "Company where the job was held",
+                                },
+                                "start_date": {
+                                    "type": "string",
+                                    "description": "Start date of employment",
+                                },
+                                "end_date": {
+                                    "type": "string",
+                                    "description": "End date of employment",
+                                },
+                                "responsibilities": {
+                                    "type": "string",
+                                    "description": "Key responsibilities held during the job",
+                                },
+                            },
+                            "required": [
+                                "job_title",
+                                "company",
+                                "start_date",
+                                "end_date",
+                                "responsibilities",
+                            ],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "skills": {
+                        "type": "array",
+                        "description": "List of skills possessed by the individual",
+                        "items": {"type": "string"},
+                    },
+                    "projects": {
+                        "type": "array",
+                        "description": "List of projects undertaken by the individual",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "project_name": {
+                                    "type": "string",
+                                    "description": "Name of the project",
+                                },
+                                "description": {
+                                    "type": "string",
+                                    "description": "Brief description of the project",
+                                },
+                                "technologies": {
+                                    "type": "string",
+                                    "description": "Technologies used in the project",
+                                },
+                            },
+                            "required": ["project_name", "description", "technologies"],
+                            "additionalProperties": False,
+                        },
+                    },
+                    "certificates": {
+                        "type": "array",
+                        "description": "List of certifications acquired by the individual",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "certificate_name": {
+                                    "type": "string",
+                                    "description": "Name of the certification",
+                                },
+                                "issued_by": {
+                                    "type": "string",
+                                    "description": "Name of the organization that issued the certification",
+                                },
+                                "year": {
+                                    "type": "string",
+                                    "description": "Year the certification was obtained",
+                                },
+                            },
+                            "required": ["certificate_name", "issued_by", "year"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": [
+                    "personal_info",
+                    "education",
+                    "work_experience",
+                    "skills",
+                    "projects",
+                    "certificates",
+                ],
+                "additionalProperties": False,
+            },
+            "strict": True,
+        },
+    }
+)
+
+SECTION_SYSTEM_PROMPT = (
+    "You are a CV/Resume parser. You will receive one section of a CV and your "
+    "task is to extract only the requested information from it. "
+    "You must return only valid JSON with exactly the requested top-level keys. "
+    "Use empty strings and empty lists for anything the section does not contain. "
+    "Do not include any additional commentary. Output must be valid JSON only. "
+    "Requested keys: {keys}."
+)
+
+CHAT_SYSTEM_PROMPT = (
+    "You answer questions about job candidates. Each question is followed by "
+    "the candidate resumes relevant to it, as a JSON list. Answer only using "
+    "that data, or say 'not found' if it is unavailable."
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """
+    A versioned LLM request template, compiled once.
+
+    The static part of a request, its system message and response format,
+    is frozen when the Prompt is built. messages() appends the variable
+    part (CV text, chat history, candidate data) after it, so every request
+    made from one Prompt starts with the same bytes and the provider's
+    prompt cache can reuse that prefix.
+
+    name: Identifies the template in cache keys and benchmarks.
+    version: Bumped by hand on wording changes; part of the hash.
+    system: The system prompt.
+    response_format: The structured output schema, if any.
+    """
+
+    name: str
+    version: int
+    system: str
+    response_format: dict = None
+    system_message: dict = field(init=False, repr=False, compare=False)
+    hash: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        set_field = partial(object.__setattr__, self)
+        set_field("response_format", freeze(self.response_format))
+        set_field("system_message", freeze({"role": "system", "content": self.system}))
+        set_field(
+            "hash",
+            schema_hash([self.name, self.version, self.system, self.response_format]),
+        )
+
+    @property
+    def key(self):
+        """Cache key fragment naming this exact template."""
+        return f"{self.name}.v{self.version}:{self.hash}"
+
+    @property
+    def prefix_chars(self):
+        """Size of the static prefix: the schema and the system prompt."""
+        schema = self.response_format
+        return len(self.system) + (len(canonical_json(schema)) if schema else 0)
+
+    def messages(self, content, history=()):
+        """
+        Returns the messages of a request: the system message, then the
+        history, then `content` as the new user message.
+        """
+        return [self.system_message, *history, {"role": "user", "content": content}]
+
+
+RESUME_PROMPT = Prompt("cv_resume_parser", 1, RESUME_SYSTEM_PROMPT, RESUME_SCHEMA)
+
+CHAT_PROMPT = Prompt("candidate_chat", 1, CHAT_SYSTEM_PROMPT)
+
+
+@lru_cache(maxsize=64)
+def section_prompt(keys):
+    """
+    Returns the Prompt asking for only the given top-level keys of
+    RESUME_SCHEMA, with a strict schema holding just those keys. Built once
+    per tuple of keys.
+    """
+    properties = RESUME_SCHEMA["json_schema"]["schema"]["properties"]
+    schema = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "cv_section_parser",
+            "schema": {
+                "type": "object",
+                "properties": {key: properties[key] for key in keys},
+                "required": list(keys),
+                "additionalProperties": False,
+            },
+            "strict": True,
+        },
+    }
+    return Prompt(
+        "cv_section_parser",
+        1,
+        SECTION_SYSTEM_PROMPT.format(keys=", ".join(keys)),
+        schema,
+    )
@@ -0,0 +1,211 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "rate_limit"
+
+FIXED_WINDOW = "fixed_window"
+SLIDING_WINDOW = "sliding_window"
+TOKEN_BUCKET = "token_bucket"
+ALGORITHMS = (FIXED_WINDOW, SLIDING_WINDOW, TOKEN_BUCKET)
+
+# Each script touches at most two keys and runs in O(1), atomically on the
+# Redis server, so concurrent workers can't race between read and write.
+FIXED_WINDOW_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+  redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return allowed
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    scope: str
+    limit: int
+    window: int
+
+
+def _window_position(now, window):
+    index = int(now // window)
+    return index, (now - index * window) / window
+
+
+def _token_rate(limit, window):
+    return limit / window
+
+
+class LocalRateLimiter:
+    """
+    In-process limiter with the same algorithms as RedisRateLimiter.
+
+    Used when the configured cache is not Redis (e.g. LocMemCache in
+    development) and as a fallback when Redis is unreachable. Limits are
+    per process, so they are only approximate with several workers.
+    """
+
+    SWEEP_EVERY = 10_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+        self._calls = 0
+
+    def _sweep(self, now):
+        self._state = {k: v for k, v in self._state.items() if v[-1] > now}
+
+    def hit(self, algorithm, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            return getattr(self, f"_{algorithm}")(key, limit, window, now)
+
+    def _fixed_window(self, key, limit, window, now):
+        index, _ = _window_position(now, window)
+        count, _ = self._state.get((key, index), (0, 0))
+        count += 1
+        self._state[(key, index)] = (count, (index + 1) * window)
+        return count <= limit
+
+    def _sliding_window(self, key, limit, window, now):
+        index, elapsed = _window_position(now, window)
+        current, _ = self._state.get((key, index), (0, 0))
+        previous, _ = self._state.get((key, index - 1), (0, 0))
+        if previous * (1 - elapsed) + current >= limit:
+            return False
+        self._state[(key, index)] = (current + 1, (index + 2) * window)
+        return True
+
+    def _token_bucket(self, key, limit, window, now):
+        tokens, ts, _ = self._state.get(key, (limit, now, 0))
+        tokens = min(limit, tokens + max(0, now - ts) * _token_rate(limit, window))
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._state[key] = (tokens, now, now + window)
+        return allowed
+
+
+class RedisRateLimiter:
+    """
+    Limiter backed by Lua scripts on the Redis server behind a django_redis
+    cache alias. Falls back to a LocalRateLimiter if Redis errors.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.scripts = {
+            FIXED_WINDOW: client.register_script(FIXED_WINDOW_LUA),
+            SLIDING_WINDOW: client.register_script(SLIDING_WINDOW_LUA),
+            TOKEN_BUCKET: client.register_script(TOKEN_BUCKET_LUA),
+        }
+        self.fallback = LocalRateLimiter()
+
+    def hit(self, algorithm, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        try:
+            return self._hit(algorithm, f"{KEY_PREFIX}:{key}", limit, window, now)
+        except Exception:
+            logger.warning("Redis rate limiter unavailable, using local fallback")
+            return self.fallback.hit(algorithm, key, limit, window, now)
+
+    def _hit(self, algorithm, key, limit, window, now):
+        script = self.scripts[algorithm]
+        if algorithm == FIXED_WINDOW:
+            index, _ = _window_position(now, window)
+            return script(keys=[f"{key}:{index}"], args=[window]) <= limit
+        if algorithm == SLIDING_WINDOW:
+            index, elapsed = _window_position(now, window)
+            keys = [f"{key}:{index}", f"{key}:{index - 1}"]
+            return bool(script(keys=keys, args=[limit, 1 - elapsed, 2 * window]))
+        rate = _token_rate(limit, window)
+        return bool(script(keys=[key], args=[limit, rate, now, window]))
+
+
+_limiters = {}
+
+
+def get_rate_limiter():
+    """
+    Returns the limiter for settings.RATE_LIMIT_CACHE_ALIAS: Redis-backed when
+    that cache is a django_redis cache, in-process otherwise.
+    """
+    alias = settings.RATE_LIMIT_CACHE_ALIAS
+    backend = settings.CACHES[alias]["BACKEND"]
+    key = (alias, backend)
+    if key not in _limiters:
+        if backend.startswith("django_redis."):
+            from django_redis import get_redis_connection
+
+            _limiters[key] = RedisRateLimiter(get_redis_connection(alias))
+        else:
+            _limiters[key] = LocalRateLimiter()
+    return _limiters[key]
+
+
+def rule_for(url_name):
+    """
+    Returns the RateLimitRule for a URL name, or None if the route is exempt.
+
+    Routes listed in settings.RATE_LIMIT_ROUTES get their own budget (a dict
+    with "limit" and "window") or are exempt (None); every other route shares
+    the default RATE_LIMIT_PER_MINUTE / RATE_LIMIT_WINDOW_SECONDS budget.
+    """
+    routes = settings.RATE_LIMIT_ROUTES
+    if url_name in routes:
+        route = routes[url_name]
+        if route is None:
+            return None
+        return RateLimitRule(url_name, route["limit"], route["window"])
+    return RateLimitRule(
+        "default", settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_WINDOW_SECONDS
+    )
+
+
+def retry_after(algorithm, rule, now=None):
+    """
+    Seconds a client should wait before retrying a rejected request.
+    """
+    now = time.time() if now is None else now
+    if algorithm == TOKEN_BUCKET:
+        return math.ceil(1 / _token_rate(rule.limit, rule.window))
+    _, elapsed = _window_position(now, rule.window)
+    return max(1, math.ceil((1 - elapsed) * rule.window))
@@ -0,0 +1,184 @@
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Candidate, CandidateTerm
+
+MAX_TERM_LENGTH = 255
+MAX_QUESTION_NGRAM = 4
+
+# Words that never identify a candidate on their own.
+STOP_WORDS = {
+    "a",
+    "an",
+    "and",
+    "any",
+    "are",
+    "at",
+    "by",
+    "did",
+    "do",
+    "does",
+    "for",
+    "from",
+    "has",
+    "have",
+    "in",
+    "is",
+    "know",
+    "knows",
+    "of",
+    "on",
+    "or",
+    "the",
+    "to",
+    "was",
+    "what",
+    "which",
+    "who",
+    "with",
+    "worked",
+}
+
+# Leading/trailing punctuation is dropped, but characters that are part of
+# skill names such as "c++", "c#" or ".net" are kept.
+_EDGE_PUNCTUATION = re.compile(r"^[^\w+#.]+|[^\w+#]+$")
+
+
+def normalize_term(value):
+    """
+    Lower-cases a term, collapses whitespace and trims surrounding punctuation.
+    """
+    value = " ".join(str(value).lower().split())
+    return _EDGE_PUNCTUATION.sub("", value)[:MAX_TERM_LENGTH]
+
+
+def _entries(candidate, field, key):
+    for entry in getattr(candidate, field) or []:
+        if isinstance(entry, dict) and entry.get(key):
+            yield entry[key]
+
+
+def candidate_terms(candidate):
+    """
+    Returns the set of (kind, value) terms for a Candidate.
+
+    The full name and each part of it are indexed so questions can refer to
+    a candidate by first or last name.
+    """
+    Kind = CandidateTerm.Kind
+    raw_terms = []
+
+    name = (candidate.personal_info or {}).get("name") or ""
+    raw_terms.append((Kind.NAME, name))
+    raw_terms.extend((Kind.NAME, part) for part in name.split())
+
+    raw_terms.extend((Kind.SKILL, skill) for skill in candidate.skills or [] if skill)
+    raw_terms.extend(
+        (Kind.COMPANY, v) for v in _entries(candidate, "work_experience", "company")
+    )
+    raw_terms.extend(
+        (Kind.JOB_TITLE, v) for v in _entries(candidate, "work_experience", "job_title")
+    )
+    raw_terms.extend(
+        (Kind.INSTITUTION, v) for v in _entries(candidate, "education", "institution")
+    )
+    raw_terms.extend(
+        (Kind.DEGREE, v) for v in _entries(candidate, "education", "degree")
+    )
+    raw_terms.extend(
+        (Kind.CERTIFICATE, v)
+        for v in _entries(candidate, "certificates", "certificate_name")
+    )
+
+    terms = set()
+    for kind, value in raw_terms:
+        value = normalize_term(value)
+        if value and value not in STOP_WORDS:
+            terms.add((kind, value))
+    return terms
+
+
+def index_candidates(candidates):
+    """
+    Rebuilds the CandidateTerm rows for the given (saved) Candidates.
+    """
+    candidates = list(candidates)
+    terms = [
+        CandidateTerm(candidate=candidate, kind=kind, value=value)
+        for candidate in candidates
+        for kind, value in candidate_terms(candidate)
+    ]
+    with transaction.atomic():
+        CandidateTerm.objects.filter(candidate__in=candidates).delete()
+        CandidateTerm.objects.bulk_create(terms)
+
+
+def question_ngrams(question):
+    """
+    Returns the normalized word n-grams (up to MAX_QUESTION_NGRAM words) of a
+    question, which are matched exactly against CandidateTerm.value.
+    """
+    words = [normalize_term(word) for word in question.split()]
+    words = [word for word in words if word]
+    ngrams = set()
+    for size in range(1, MAX_QUESTION_NGRAM + 1):
+        for start in range(len(words) - size + 1):
+            ngrams.add(" ".join(words[start : start + size]))
+    return ngrams - STOP_WORDS
+
+
+def _ranked_candidates(question, limit):
+    return (
+        CandidateTerm.objects.filter(
+            value__in=question_ngrams(question),
+            candidate__status=Candidate.Status.DONE,
+            candidate__duplicate_of__isnull=True,
+        )
+        .values("candidate")
+        .annotate(score=Count("id"))
+        .order_by("-score", "-candidate")[:limit]
+    )
+
+
+def _recent_candidates(limit):
+    return (
+        Candidate.objects.filter(
+            status=Candidate.Status.DONE, duplicate_of__isnull=True
+        )
+        .order_by("-created_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+
+
+def select_relevant_candidates(question, limit=None):
+    """
+    Picks the primary keys of the candidates most relevant to a question.
+
+    Candidates are ranked by how many distinct indexed terms the question
+    mentions. When nothing matches, the most recently added candidates are
+    returned instead, so the prompt is never empty but always bounded by
+    `limit` (settings.CHAT_MAX_CANDIDATES by default). Candidates that are
+    not fully parsed yet, or flagged as near-duplicates of a newer one, are
+    left out.
+    """
+    limit = limit or settings.CHAT_MAX_CANDIDATES
+    candidate_ids = [row["candidate"] for row in _ranked_candidates(question, limit)]
+    if candidate_ids:
+        return candidate_ids
+    return list(_recent_candidates(limit))
+
+
+async def aselect_relevant_candidates(question, limit=None):
+    """
+    Async version of select_relevant_candidates, for async views.
+    """
+    limit = limit or settings.CHAT_MAX_CANDIDATES
+    candidate_ids = [
+        row["candidate"] async for row in _ranked_candidates(question, limit)
+    ]
+    if candidate_ids:
+        return candidate_ids
+    return [pk async for pk in _recent_candidates(limit)]
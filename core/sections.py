@@ -0,0 +1,150 @@
+import re
+from collections import namedtuple
+
+# Text before the first recognized heading (name, contact details, summary).
+HEADER = "header"
+# Sections that hold none of the resume fields on their own (summary,
+# contact details, references); they are parsed like the header.
+OTHER = "other"
+
+# Headings recognized as the start of a section, keyed by the resume field
+# the section is parsed into. Matched case-insensitively against whole lines
+# with bullets, numbering and trailing colons removed.
+SECTION_HEADINGS = {
+    "education": [
+        "education",
+        "education and training",
+        "academic background",
+        "academic qualifications",
+        "qualifications",
+    ],
+    "work_experience": [
+        "experience",
+        "work experience",
+        "professional experience",
+        "employment",
+        "employment history",
+        "work history",
+        "career history",
+        "academic appointments",
+        "appointments",
+        "positions held",
+    ],
+    "skills": [
+        "skills",
+        "technical skills",
+        "key skills",
+        "core competencies",
+        "competencies",
+        "expertise",
+        "languages",
+        "tools and technologies",
+        "tools",
+        "technologies",
+    ],
+    "projects": [
+        "projects",
+        "selected projects",
+        "personal projects",
+        "research",
+        "research projects",
+        "publications",
+        "selected publications",
+    ],
+    "certificates": [
+        "certifications",
+        "certificates",
+        "licenses and certifications",
+        "courses",
+        "training",
+    ],
+}
+
+OTHER_HEADINGS = [
+    "summary",
+    "profile",
+    "professional summary",
+    "personal profile",
+    "about me",
+    "objective",
+    "career objective",
+    "contact",
+    "contact details",
+    "contact information",
+    "personal details",
+    "personal information",
+    "references",
+    "interests",
+    "hobbies",
+    "strengths",
+    "passions",
+]
+
+_HEADING_KEYS = {
+    heading: key for key, headings in SECTION_HEADINGS.items() for heading in headings
+}
+_HEADING_KEYS.update((heading, OTHER) for heading in OTHER_HEADINGS)
+_HEADING_DECORATION = re.compile(r"^[\s\-\u2022*#\d.)]+|[\s:\-\u2014]+$")
+MAX_HEADING_WORDS = 5
+
+# A run of CV text under one heading: the resume field it belongs to (or
+# HEADER), the heading line as written ("" for the header) and the text,
+# including the heading line.
+Section = namedtuple("Section", ["key", "heading", "text"])
+
+
+def heading_key(line):
+    """
+    Returns the resume field (or OTHER) a heading line starts, or None if
+    the line is not a recognized heading.
+    """
+    words = line.split()
+    if not words or len(words) > MAX_HEADING_WORDS:
+        return None
+    heading = _HEADING_DECORATION.sub("", " ".join(words).lower())
+    return _HEADING_KEYS.get(heading.replace("&", "and"))
+
+
+def split_sections(raw_text):
+    """
+    Splits CV text into Sections at recognized headings, in document order.
+    Lines before the first heading form the HEADER section. Repeated
+    headings give separate sections with the same key; sections without any
+    text under the heading are dropped.
+    """
+    sections = []
+    key, heading, body = HEADER, "", []
+
+    def close():
+        if any(line.strip() for line in body):
+            text = "\n".join([heading, *body] if heading else body).strip()
+            sections.append(Section(key, heading, text))
+
+    for line in raw_text.splitlines():
+        line_key = heading_key(line)
+        if line_key is None:
+            body.append(line)
+            continue
+        close()
+        key, heading, body = line_key, line.strip(), []
+    close()
+    return sections
+
+
+def chunk_text(text, max_chars):
+    """
+    Splits text into pieces of at most max_chars, breaking between lines
+    (a single longer line becomes its own piece).
+    """
+    chunks = []
+    current = []
+    size = 0
+    for line in text.splitlines():
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .embeddings import get_vector_index
+from .models import Candidate
+from .retrieval import index_candidates
+
+
+@receiver(post_save, sender=Candidate)
+def reindex_candidate_terms(sender, instance, raw=False, **kwargs):
+    """
+    Keeps the CandidateTerm side table in sync with the Candidate JSON fields.
+    """
+    if not raw:
+        index_candidates([instance])
+
+
+@receiver(post_delete, sender=Candidate)
+def remove_candidate_embedding(sender, instance, **kwargs):
+    """
+    Drops a deleted Candidate's row from the vector index.
+    """
+    get_vector_index().remove([instance.pk])
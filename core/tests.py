@@ -1,9 +1,64 @@
+import asyncio
+import copy
+import ctypes
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import filelock
+import numpy as np
+import openai
+import pdfplumber
+import pypdfium2 as pdfium
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from docx import Document as DocxDocument
+from PIL import Image, ImageDraw
+
+from benchmarks.fake_openai import FakeOpenAIServer
 
-from .models import Candidate
+from . import (
+    dedupe,
+    derived,
+    embeddings,
+    extraction_cache,
+    fulltext,
+    ingestion,
+    listing,
+    llm_client,
+    metrics,
+    ocr,
+    openai_services,
+    preparse,
+    prompts,
+    ratelimit,
+    uploads,
+    views,
+)
+from .conversation import Conversation
+from .management.commands import import_cvs
+from .models import Candidate, CandidateSignature, CandidateTerm, CandidateText
+from .prompts import CHAT_PROMPT, RESUME_PROMPT
+from .retrieval import aselect_relevant_candidates, select_relevant_candidates
+from .sections import split_sections
 
 # Remove rate limit middleware for testing
 TEST_MIDDLEWARE = [
@@ -16,7 +71,15 @@ TEST_MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Saving a Candidate drops its cached page; keep that off the Redis-backed
+# default cache.
+LOCMEM_CACHES = {
+    **settings.CACHES,
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
 
+
+@override_settings(CACHES=LOCMEM_CACHES)
 class CandidateModelTests(TestCase):
     def setUp(self):
         self.candidate = Candidate.objects.create(
@@ -45,7 +108,9 @@ class CandidateModelTests(TestCase):
         self.assertEqual(len(self.candidate.skills), 3)
 
 
-@override_settings(MIDDLEWARE=TEST_MIDDLEWARE)
+@override_settings(
+    CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE, INGESTION_EAGER=True
+)
 class FormTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -77,7 +142,7 @@ class FormTests(TestCase):
         )  # Should stay on same page with error
 
 
-@override_settings(MIDDLEWARE=TEST_MIDDLEWARE)
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
 class ViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -104,19 +169,432 @@ class ViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "core/candidate.html")
 
+    def test_candidate_view_missing(self):
+        """A missing candidate is a 404, not a server error"""
+        response = self.client.get(reverse("candidate_view", kwargs={"pk": 999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_upload_and_chat_views_are_async(self):
+        """Under ASGI they run on the event loop, not in a worker thread"""
+        self.assertTrue(asyncio.iscoroutinefunction(views.upload_cv))
+        self.assertTrue(asyncio.iscoroutinefunction(views.handle_response))
+
+    async def test_chat_awaits_async_client(self):
+        client = AsyncStubClient("Jane")
+        with mock.patch.object(views, "async_llm_client", return_value=client):
+            response = await self.async_client.post(
+                reverse("chat_prompt"), {"prompt": "Who is Jane Smith?"}
+            )
+            page = await self.async_client.get(reverse("chat_prompt"))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(
+            "jane@example.com", client.completions.calls[0]["messages"][-1]["content"]
+        )
+        self.assertEqual(page.context["final_response"], "Jane")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    MIDDLEWARE=TEST_MIDDLEWARE,
+)
+class CandidatePageTests(TestCase):
+    def setUp(self):
+        self.candidate = Candidate.objects.create(
+            personal_info={"name": "Jane Smith"}, skills=["Django"]
+        )
+        self.url = reverse("candidate_view", kwargs={"pk": self.candidate.pk})
+
+    def test_page_is_cached_until_updated(self):
+        first = self.client.get(self.url)
+        self.assertTemplateUsed(first, "core/candidate.html")
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertTemplateNotUsed(second, "core/candidate.html")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        self.candidate.skills = ["Django", "Kubernetes"]
+        self.candidate.save()
+        third = self.client.get(self.url)
+        self.assertContains(third, "Kubernetes")
+        self.assertNotEqual(third["ETag"], first["ETag"])
+
+    def test_writes_without_signals_refresh_the_page(self):
+        """A queryset update that bumps updated_at is not served stale"""
+        first = self.client.get(self.url)
+        Candidate.objects.filter(pk=self.candidate.pk).update(
+            skills=["Rust"], updated_at=timezone.now()
+        )
+        second = self.client.get(self.url)
+        self.assertContains(second, "Rust")
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+    def test_unknown_candidate_is_404(self):
+        self.assertEqual(
+            self.client.get(
+                reverse("candidate_view", kwargs={"pk": 999999})
+            ).status_code,
+            404,
+        )
+
+    def test_conditional_get(self):
+        """A matching ETag or Last-Modified gets an empty 304"""
+        response = self.client.get(self.url)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.candidate.skills = ["Flask"]
+        self.candidate.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_render_loads_only_page_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertIn("skills", sql)
+        self.assertNotIn("timings", sql)
+
+    def test_claiming_an_upload_refreshes_the_page(self):
+        """Status changes made with update() still change the page"""
+        self.candidate.status = Candidate.Status.PENDING
+        self.candidate.uploaded_file.name = "uploads/cv.pdf"
+        self.candidate.save()
+        self.assertContains(self.client.get(self.url), "Status: Pending")
+        pages = []
+
+        def extract(*args):
+            pages.append(self.client.get(self.url))
+            raise OSError("unreadable")
+
+        with mock.patch.object(ingestion, "extract_text_cached", side_effect=extract):
+            ingestion.process_candidate(self.candidate.pk)
+        self.assertContains(pages[0], "Status: Processing")
+        self.assertContains(self.client.get(self.url), "Status: Failed")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class CandidateListTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        self.candidates = [
+            Candidate.objects.create(
+                personal_info={"name": f"Candidate {i}"},
+                skills=["Python"] if i % 2 else ["Java"],
+                work_experience=[{"company": "Acme" if i < 3 else "Initech"}],
+                education=[{"degree": "BSc Computer Science"}],
+            )
+            for i in range(5)
+        ]
+        # Equal timestamps make the id tie-breaker part of every cursor.
+        Candidate.objects.update(created_at=timezone.now())
+
+    def get(self, **params):
+        response = self.client.get(reverse("candidate_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_keyset_pages_cover_every_candidate_once(self):
+        """Following next_cursor visits each candidate once, newest first"""
+        seen = []
+        page = self.get(page_size=2)
+        seen += [row["id"] for row in page["results"]]
+        while page["next_cursor"]:
+            page = self.get(page_size=2, cursor=page["next_cursor"])
+            seen += [row["id"] for row in page["results"]]
+
+        self.assertEqual(seen, [c.pk for c in reversed(self.candidates)])
+        self.assertIsNone(page["next"])
+
+    def test_filters_on_indexed_terms(self):
+        """skill, company and degree filters are combined with AND"""
+        page = self.get(skill="python", company="ACME", degree="bsc computer science")
+        self.assertEqual(
+            [row["id"] for row in page["results"]], [self.candidates[1].pk]
+        )
+        self.assertEqual(page["results"][0]["name"], "Candidate 1")
+
+    def test_term_backfill_migration_indexes_older_candidates(self):
+        """Candidates saved before the term index are backfilled by 0010"""
+        migration = importlib.import_module(
+            "core.migrations.0010_backfill_candidate_terms"
+        )
+        expected = set(CandidateTerm.objects.values_list("candidate", "kind", "value"))
+        CandidateTerm.objects.all().delete()
+        self.assertEqual(self.get(skill="python")["results"], [])
+
+        for _ in range(2):
+            migration.backfill(django_apps, None, batch_size=2)
+        self.assertEqual(
+            set(CandidateTerm.objects.values_list("candidate", "kind", "value")),
+            expected,
+        )
+        page = self.get(degree="bsc computer science", page_size=10)
+        self.assertEqual(len(page["results"]), 5)
+
+    def test_created_range_filter(self):
+        """Date bounds are inclusive and exclude candidates outside them"""
+        Candidate.objects.filter(pk=self.candidates[0].pk).update(
+            created_at=timezone.now() - timezone.timedelta(days=10)
+        )
+        day = (timezone.localdate() - timezone.timedelta(days=10)).isoformat()
+        page = self.get(created_from=day, created_to=day)
+        self.assertEqual(
+            [row["id"] for row in page["results"]], [self.candidates[0].pk]
+        )
+
+    def test_filters_on_derived_columns(self):
+        """name, email, experience and skill count use the typed columns"""
+        Candidate.objects.filter(pk=self.candidates[4].pk).update(
+            email="c4@example.com", experience_months=60, skill_count=3
+        )
+        page = self.get(email="C4@example.com", min_experience_months=48)
+        self.assertEqual(
+            [row["id"] for row in page["results"]], [self.candidates[4].pk]
+        )
+        page = self.get(name="candidate 2")
+        self.assertEqual(
+            [row["id"] for row in page["results"]], [self.candidates[2].pk]
+        )
+        self.assertEqual(self.get(min_skill_count=2)["results"][0]["skill_count"], 3)
+
+    def test_list_does_not_load_json_columns(self):
+        """List rows defer the JSON columns"""
+        rows, _ = listing.list_candidates(listing.CandidateFilters())
+        self.assertIn("skills", rows[0].get_deferred_fields())
+        self.assertIn("personal_info", rows[0].get_deferred_fields())
+
+    def test_invalid_query(self):
+        """Bad cursors, dates and page sizes are rejected with 400"""
+        for params in (
+            {"cursor": "not-a-cursor"},
+            {"created_from": "yesterday"},
+            {"page_size": "0"},
+            {"page_size": "x"},
+            {"status": "unknown"},
+        ):
+            response = self.client.get(reverse("candidate_list"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DerivedColumnsTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        self.work_experience = [
+            {
+                "job_title": "Junior Dev",
+                "start_date": "Jan 2018",
+                "end_date": "2019-12",
+            },
+            {"job_title": "Contractor", "start_date": "06/2019", "end_date": "2020"},
+            {
+                "job_title": "Lead Dev",
+                "start_date": "March 2021",
+                "end_date": "Present",
+            },
+        ]
+
+    def test_parse_month_formats(self):
+        """Common CV date formats are read as (year, month)"""
+        today = timezone.datetime(2024, 5, 1).date()
+        for value, expected in (
+            ("Jan 2020", (2020, 1)),
+            ("September, 2019", (2019, 9)),
+            ("2020-07", (2020, 7)),
+            ("07/2020", (2020, 7)),
+            ("2015", (2015, 1)),
+            ("Present", (2024, 5)),
+            ("unknown", None),
+        ):
+            self.assertEqual(derived.parse_month(value, today), expected, value)
+
+    def test_experience_counts_overlaps_once(self):
+        """Overlapping jobs are merged before months are summed"""
+        today = timezone.datetime(2024, 5, 1).date()
+        # Jan 2018 - Jan 2020 (25 months) and Mar 2021 - May 2024 (39 months).
+        self.assertEqual(derived.experience_months(self.work_experience, today), 64)
+        self.assertEqual(derived.latest_title(self.work_experience, today), "Lead Dev")
+        self.assertIsNone(derived.experience_months([{"job_title": "x"}], today))
+
+    def test_columns_follow_json_on_save(self):
+        """The typed columns are filled on create and kept in sync on save"""
+        candidate = Candidate.objects.create(
+            personal_info={"name": "  José  Álvarez ", "email": "Jose@Example.COM"},
+            skills=["Python", "SQL", ""],
+            work_experience=self.work_experience,
+        )
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.normalized_name, "jose alvarez")
+        self.assertEqual(candidate.email, "jose@example.com")
+        self.assertEqual(candidate.skill_count, 2)
+        self.assertEqual(candidate.latest_title, "Lead Dev")
+        self.assertGreaterEqual(candidate.experience_months, 64)
+
+        candidate.skills = ["Go"]
+        candidate.save(update_fields=["skills"])
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.skill_count, 1)
+
+    def test_long_values_fit_their_columns(self):
+        """Over-long emails are cut to the column's max_length"""
+        email = "a" * 300 + "@example.com"
+        self.assertEqual(derived.normalize_email(email), "a" * 254)
+
+    def test_backfill_command(self):
+        """backfill_candidate_columns repairs rows changed behind save()"""
+        candidate = Candidate.objects.create(personal_info={"name": "Ada"})
+        Candidate.objects.filter(pk=candidate.pk).update(
+            personal_info={"name": "Grace Hopper"}, skills=["COBOL"]
+        )
+        out = StringIO()
+        call_command("backfill_candidate_columns", stdout=out)
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.normalized_name, "grace hopper")
+        self.assertEqual(candidate.skill_count, 1)
+        self.assertIn("Updated 1 candidate(s).", out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        texts = {
+            "Ada": "Senior Python developer. Built Django services and data pipelines.",
+            "Grace": "Java and Python engineer with Kubernetes experience.",
+            "Linus": "C programmer, kernel maintainer, git author.",
+        }
+        self.candidates = {}
+        for name, text in texts.items():
+            candidate = Candidate.objects.create(personal_info={"name": name})
+            self.candidates[name] = candidate
+        fulltext.store_raw_text(
+            (self.candidates[name], text) for name, text in texts.items()
+        )
+
+    def ids(self, query):
+        return [match.candidate_id for match in fulltext.search_text(query)]
+
+    def test_boolean_queries(self):
+        """AND, NOT, phrases and prefixes are evaluated by the index"""
+        self.assertCountEqual(
+            self.ids("python"), [self.candidates["Ada"].pk, self.candidates["Grace"].pk]
+        )
+        self.assertEqual(self.ids("python AND django"), [self.candidates["Ada"].pk])
+        self.assertEqual(self.ids("python NOT java"), [self.candidates["Ada"].pk])
+        self.assertEqual(self.ids('"kernel maintainer"'), [self.candidates["Linus"].pk])
+        self.assertEqual(self.ids("kube*"), [self.candidates["Grace"].pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Triggers keep the FTS table in sync with CandidateText"""
+        fulltext.store_raw_text([(self.candidates["Linus"], "Rust and Python")])
+        self.assertIn(self.candidates["Linus"].pk, self.ids("python"))
+        self.assertEqual(self.ids("kernel"), [])
+
+        self.candidates["Grace"].delete()
+        self.assertEqual(self.ids("kubernetes"), [])
+
+    def test_search_view_returns_ranked_snippets(self):
+        """The view returns names, BM25 scores and highlighted snippets"""
+        response = self.client.get(reverse("search_text"), {"q": "django"})
+        self.assertEqual(response.status_code, 200)
+        [result] = response.json()["results"]
+        self.assertEqual(result["id"], self.candidates["Ada"].pk)
+        self.assertEqual(result["name"], "Ada")
+        self.assertIn("[Django]", result["snippet"])
+        self.assertGreater(result["score"], 0)
+
+    def test_invalid_query(self):
+        """Malformed or missing queries are rejected with 400"""
+        for params in ({"q": "python AND"}, {"q": ""}, {"q": "x", "limit": "y"}):
+            response = self.client.get(reverse("search_text"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_unsupported_database_is_503(self):
+        """Databases without a full-text index get a clear error, not a 500"""
+        with mock.patch.object(connection, "vendor", "mysql"):
+            with self.assertRaises(fulltext.SearchUnavailable):
+                fulltext.search_text("python")
+            response = self.client.get(reverse("search_text"), {"q": "python"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("mysql", response.json()["error"])
+
+    def test_limit_is_clamped(self):
+        """A negative limit (no LIMIT in SQLite) cannot bypass the cap"""
+        for limit in ("-1", "0"):
+            response = self.client.get(
+                reverse("search_text"), {"q": "python", "limit": limit}
+            )
+            self.assertEqual(response.status_code, 200, limit)
+            self.assertEqual(len(response.json()["results"]), 1, limit)
+
+    def test_ingestion_stores_raw_text(self):
+        """Background ingestion keeps the extracted text"""
+        candidate = Candidate.objects.create(
+            status=Candidate.Status.PENDING, uploaded_file="uploads/cv.pdf"
+        )
+        with mock.patch.object(
+            ingestion, "extract_text_cached", return_value="Haskell wizard"
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value="not json"
+        ):
+            ingestion.process_candidate(candidate.pk)
+
+        self.assertEqual(
+            CandidateText.objects.get(candidate=candidate).raw_text, "Haskell wizard"
+        )
+        self.assertEqual(self.ids("haskell"), [candidate.pk])
+
 
 @override_settings(MIDDLEWARE=TEST_MIDDLEWARE)
 class RateLimitMiddlewareTests(TestCase):
     def setUp(self):
         self.client = Client()
-        # Clear the cache before testing
+        # Clear the cache and any in-process limiter state before testing
         cache.clear()
+        ratelimit._limiters.clear()
         # Add the rate limit middleware back for this specific test
         with self.settings(
             MIDDLEWARE=TEST_MIDDLEWARE + ["core.middleware.RateLimitMiddleware"]
         ):
             self.test_client = Client()
 
+    def test_cheap_routes_have_their_own_budget(self):
+        """Exhausting the default budget does not block candidate pages"""
+        candidate = Candidate.objects.create(personal_info={"name": "Ada"})
+        with self.settings(
+            MIDDLEWARE=TEST_MIDDLEWARE + ["core.middleware.RateLimitMiddleware"],
+            RATE_LIMIT_PER_MINUTE=2,
+        ):
+            for _ in range(3):
+                response = self.test_client.get(reverse("upload_cv"))
+            self.assertEqual(response.status_code, 429)
+            self.assertIn("Retry-After", response)
+
+            response = self.test_client.get(
+                reverse("candidate_view", kwargs={"pk": candidate.pk})
+            )
+            self.assertEqual(response.status_code, 200)
+
     def test_rate_limit(self):
         """Test rate limiting"""
         # Make 11 requests (more than the limit of 10)
@@ -131,3 +609,1673 @@ class RateLimitMiddlewareTests(TestCase):
                 else:
                     # The 11th request should be rate limited
                     self.assertEqual(response.status_code, 429)
+
+    async def test_async_requests_are_limited(self):
+        """The ASGI path counts against the same budget"""
+        with self.settings(
+            MIDDLEWARE=TEST_MIDDLEWARE + ["core.middleware.RateLimitMiddleware"],
+            RATE_LIMIT_PER_MINUTE=2,
+        ):
+            statuses = [
+                (await self.async_client.get(reverse("upload_cv"))).status_code
+                for _ in range(3)
+            ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "extraction": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "extraction-tests",
+        },
+    }
+)
+class OCRTests(TestCase):
+    def setUp(self):
+        extraction_cache.caches["extraction"].clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmpdir.name, "scanned.pdf")
+        pdf = pdfium.PdfDocument.new()
+        # Slightly different sizes give each page its own fingerprint.
+        for n in range(3):
+            pdf.new_page(612, 792 + n)
+        pdf.save(self.pdf_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @override_settings(OCR_MAX_WORKERS=2)
+    def test_parallel_ocr_keeps_page_order(self):
+        """Scanned pages OCR'd on the pool are joined back in page order"""
+
+        def fake_ocr(pdf_path, page_number):
+            return ocr.OCRPageResult(f"page {page_number}", 400, None, 0.0)
+
+        with ThreadPoolExecutor(max_workers=2) as executor, mock.patch.object(
+            ocr, "_get_ocr_executor", return_value=executor
+        ), mock.patch.object(ocr, "ocr_pdf_page", side_effect=fake_ocr):
+            text = ocr.extract_text_from_pdf(self.pdf_path)
+
+        self.assertEqual(text, "page 0\npage 1\npage 2")
+
+    @override_settings(OCR_MAX_WORKERS=1, OCR_ADAPTIVE=False)
+    def test_serial_ocr_without_pool(self):
+        """With a single worker, pages are OCR'd inline without the pool"""
+        with mock.patch.object(
+            ocr, "_get_ocr_executor"
+        ) as get_executor, mock.patch.object(
+            ocr.pytesseract, "image_to_string", return_value="text"
+        ) as image_to_string:
+            text = ocr.extract_text_from_pdf(self.pdf_path)
+
+        get_executor.assert_not_called()
+        self.assertEqual(image_to_string.call_count, 3)
+        self.assertEqual(text, "text\ntext\ntext")
+
+    @override_settings(OCR_MAX_WORKERS=2, OCR_ADAPTIVE=False)
+    def test_worker_count_argument_overrides_setting(self):
+        """ocr_workers=1 OCRs inline without touching OCR_MAX_WORKERS"""
+        with mock.patch.object(
+            ocr, "_get_ocr_executor"
+        ) as get_executor, mock.patch.object(
+            ocr.pytesseract, "image_to_string", return_value="text"
+        ):
+            text = ocr.extract_text_from_file(self.pdf_path, ocr_workers=1)
+
+        get_executor.assert_not_called()
+        self.assertEqual(text, "text\ntext\ntext")
+        self.assertEqual(settings.OCR_MAX_WORKERS, 2)
+
+    def ocr_data(self, confidence):
+        return {
+            "text": ["Jane", "Doe", ""],
+            "conf": [confidence, confidence, -1],
+            "block_num": [1, 1, 1],
+            "par_num": [1, 1, 1],
+            "line_num": [1, 1, 2],
+        }
+
+    def scanned_pdf(self):
+        image = Image.new("L", (850, 1100), 255)
+        ImageDraw.Draw(image).rectangle((100, 100, 400, 160), fill=0)
+        path = os.path.join(self.tmpdir.name, "text.pdf")
+        image.save(path, resolution=100)
+        return path
+
+    @override_settings(
+        OCR_MAX_WORKERS=1,
+        OCR_ADAPTIVE=True,
+        OCR_DPI_STEPS=[150, 300],
+        OCR_CONFIDENCE_THRESHOLD=80,
+    )
+    def test_adaptive_ocr_rerenders_on_low_confidence(self):
+        """A low-confidence read at low DPI is retried at the next step"""
+        page_stats = []
+        with mock.patch.object(
+            ocr.pytesseract,
+            "image_to_data",
+            side_effect=[self.ocr_data(50), self.ocr_data(90)],
+        ) as image_to_data:
+            text = ocr.extract_text_from_pdf(self.scanned_pdf(), page_stats)
+
+        self.assertEqual(text, "Jane Doe")
+        self.assertEqual(image_to_data.call_count, 2)
+        self.assertEqual(page_stats[0]["dpi"], 300)
+        self.assertEqual(page_stats[0]["confidence"], 90)
+        # Only the inked region of the 2550x3300 px page is sent to Tesseract.
+        cropped = image_to_data.call_args[0][0]
+        self.assertLess(cropped.width * cropped.height, 2550 * 3300 / 10)
+
+    @override_settings(OCR_MAX_WORKERS=1, OCR_ADAPTIVE=True)
+    def test_adaptive_ocr_skips_blank_pages(self):
+        with mock.patch.object(ocr.pytesseract, "image_to_data") as image_to_data:
+            text = ocr.extract_text_from_pdf(self.pdf_path)
+        image_to_data.assert_not_called()
+        self.assertEqual(text, "\n\n")
+
+    @override_settings(OCR_MAX_WORKERS=1)
+    def test_unchanged_pages_are_not_ocrd_again(self):
+        """OCR results are reused for pages with the same fingerprint"""
+        result = ocr.OCRPageResult("scanned text", 200, 91.0, 1.5)
+        with mock.patch.object(ocr, "_ocr_page", return_value=result) as ocr_page:
+            first_stats, second_stats = [], []
+            first = ocr.extract_text_from_pdf(self.pdf_path, first_stats)
+            second = ocr.extract_text_from_pdf(self.pdf_path, second_stats)
+
+        self.assertEqual(ocr_page.call_count, 3)
+        self.assertEqual(first, second)
+        self.assertFalse(any(stats["cached"] for stats in first_stats))
+        self.assertTrue(all(stats["cached"] for stats in second_stats))
+
+    def mixed_pdf(self):
+        """A text page followed by the three scanned test pages."""
+        pdf = pdfium.PdfDocument.new()
+        page = pdf.new_page(612, 792)
+        text = pdfium.raw.FPDFPageObj_NewTextObj(pdf.raw, b"Helvetica", 12.0)
+        buffer = ctypes.create_string_buffer("Jane Doe\0".encode("utf-16-le"))
+        pdfium.raw.FPDFText_SetText(
+            text, ctypes.cast(buffer, ctypes.POINTER(pdfium.raw.FPDF_WCHAR))
+        )
+        pdfium.raw.FPDFPageObj_Transform(text, 1, 0, 0, 1, 72, 700)
+        pdfium.raw.FPDFPage_InsertObject(page.raw, text)
+        pdfium.raw.FPDFPage_GenerateContent(page.raw)
+        pdf.import_pages(pdfium.PdfDocument(self.pdf_path))
+        path = os.path.join(self.tmpdir.name, "mixed.pdf")
+        pdf.save(path)
+        return path
+
+    @override_settings(OCR_MAX_WORKERS=1)
+    def test_first_chunk_arrives_before_later_pages_are_ocrd(self):
+        """Time to first chunk is under one page's extraction time"""
+        page_seconds = 0.3
+
+        def slow_ocr(page):
+            time.sleep(page_seconds)
+            return ocr.OCRPageResult(f"page {page.page_number}", 200, 90.0, 0.3)
+
+        with mock.patch.object(ocr, "_ocr_page", side_effect=slow_ocr):
+            started = time.monotonic()
+            chunks = ocr.stream_text_from_file(self.mixed_pdf())
+            first = next(chunks)
+            first_chunk_seconds = time.monotonic() - started
+            rest = list(chunks)
+            total_seconds = time.monotonic() - started
+
+        self.assertEqual(first, "Jane Doe")
+        self.assertLess(first_chunk_seconds, page_seconds)
+        self.assertGreaterEqual(total_seconds, 3 * page_seconds)
+        self.assertEqual(rest, ["page 2", "page 3", "page 4"])
+
+    @override_settings(OCR_MAX_WORKERS=2)
+    def test_streaming_matches_joined_text(self):
+        """Chunks come out in page order and join to the wrapper's text"""
+
+        def fake_ocr(pdf_path, page_number):
+            time.sleep(0.05 * (4 - page_number))
+            return ocr.OCRPageResult(f"page {page_number}", 400, None, 0.0)
+
+        path = self.mixed_pdf()
+        with ThreadPoolExecutor(max_workers=3) as executor, mock.patch.object(
+            ocr, "_get_ocr_executor", return_value=executor
+        ), mock.patch.object(ocr, "ocr_pdf_page", side_effect=fake_ocr):
+            chunks = list(ocr.stream_text_from_file(path))
+            text = ocr.extract_text_from_file(path)
+
+        self.assertEqual(chunks, ["Jane Doe", "page 1", "page 2", "page 3"])
+        self.assertEqual(text, "\n".join(chunks))
+
+    def test_page_fingerprint_follows_content(self):
+        with pdfplumber.open(self.pdf_path) as pdf:
+            blank = ocr.page_fingerprint(pdf.pages[0])
+        with pdfplumber.open(self.scanned_pdf()) as pdf:
+            scanned = ocr.page_fingerprint(pdf.pages[0])
+        self.assertNotEqual(blank, scanned)
+
+
+class BlockExtractionTests(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.docx_path = os.path.join(self.tmpdir.name, "cv.docx")
+        doc = DocxDocument()
+        doc.add_paragraph("Experience")
+        doc.add_paragraph("Built the billing system", style="List Bullet")
+        doc.add_paragraph("")
+        doc.add_paragraph("Experience")
+        table = doc.add_table(rows=2, cols=3)
+        table.cell(0, 0).text = "Skill"
+        table.cell(0, 1).merge(table.cell(0, 2)).text = "Level"
+        table.cell(1, 0).text = "Python"
+        table.cell(1, 1).text = "Expert"
+        doc.add_paragraph("References on request")
+        doc.save(self.docx_path)
+
+    def test_docx_blocks_keep_order_duplicates_and_tables(self):
+        """Paragraphs, list items and table cells come out in document order"""
+        blocks = list(ocr.extract_blocks_from_docx(self.docx_path))
+        self.assertEqual(
+            [(block.kind, block.text) for block in blocks],
+            [
+                (ocr.PARAGRAPH, "Experience"),
+                (ocr.LIST_ITEM, "Built the billing system"),
+                (ocr.PARAGRAPH, "Experience"),
+                (ocr.TABLE_CELL, "Skill"),
+                (ocr.TABLE_CELL, "Level"),
+                (ocr.TABLE_CELL, "Python"),
+                (ocr.TABLE_CELL, "Expert"),
+                (ocr.PARAGRAPH, "References on request"),
+            ],
+        )
+        self.assertEqual(
+            ocr.extract_text_from_docx(self.docx_path),
+            "Experience\n- Built the billing system\nExperience\n"
+            "Skill | Level\nPython | Expert\nReferences on request",
+        )
+
+    def test_extraction_is_deterministic(self):
+        """The same file always produces the same blocks"""
+        runs = [list(ocr.extract_blocks(self.docx_path)) for _ in range(3)]
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[1], runs[2])
+
+    def test_docx_chunks_stream_one_per_line(self):
+        chunks = list(ocr.stream_text_from_file(self.docx_path))
+        self.assertEqual(chunks[3:5], ["Skill | Level", "Python | Expert"])
+        self.assertEqual("\n".join(chunks), ocr.extract_text_from_docx(self.docx_path))
+
+    def test_unsupported_format_fails_before_streaming(self):
+        with self.assertRaises(ValueError):
+            ocr.stream_text_from_file("cv.txt")
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "extraction": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "extraction-tests",
+        },
+    }
+)
+class ExtractionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        extraction_cache.caches["extraction"].clear()
+
+    def test_duplicate_content_skips_extraction(self):
+        """A second file with the same bytes is served from the cache"""
+        file_hash = extraction_cache.file_sha256([b"same ", b"bytes"])
+        with mock.patch.object(
+            extraction_cache, "extract_text_from_file", return_value="cv text"
+        ) as extract:
+            first = extraction_cache.extract_text_cached("a.pdf", file_hash)
+            second = extraction_cache.extract_text_cached("b.pdf", file_hash)
+
+        self.assertEqual(first, "cv text")
+        self.assertEqual(second, "cv text")
+        extract.assert_called_once_with("a.pdf", ocr_workers=None)
+        self.assertEqual(
+            extraction_cache.extraction_cache_stats(), {"hits": 1, "misses": 1}
+        )
+
+    def test_hash_is_chunking_independent(self):
+        """The content hash does not depend on how the upload was chunked"""
+        self.assertEqual(
+            extraction_cache.file_sha256([b"abc", b"def"]),
+            extraction_cache.file_sha256([b"abcdef"]),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class UploadHandlerTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_dir.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=self.media_dir.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def upload(self, name, content):
+        test_file = SimpleUploadedFile(name, content)
+        with mock.patch.object(views, "enqueue_candidate") as enqueue:
+            response = self.client.post(
+                reverse("upload_cv"), {"uploaded_file": test_file}
+            )
+        return response, enqueue
+
+    def test_upload_is_hashed_while_streaming(self):
+        """Accepted uploads are stored with the digest computed per chunk"""
+        content = b"%PDF-1.4\n" + b"x" * (200 * 1024)
+        with mock.patch.object(
+            views, "file_sha256", side_effect=AssertionError("re-read")
+        ):
+            response, enqueue = self.upload("cv.pdf", content)
+
+        candidate = Candidate.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("candidate_view", kwargs={"pk": candidate.pk}),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(candidate.file_hash, extraction_cache.file_sha256([content]))
+        enqueue.assert_called_once_with(candidate.pk, candidate.file_hash)
+
+    @override_settings(CV_UPLOAD_MAX_MB=1)
+    def test_oversized_upload_is_rejected_while_streaming(self):
+        """The size limit is enforced before the whole file is received"""
+        received = []
+        receive = uploads.CVUploadHandler.receive_data_chunk
+
+        def spy(handler, raw_data, start):
+            received.append(len(raw_data))
+            return receive(handler, raw_data, start)
+
+        with mock.patch.object(uploads.CVUploadHandler, "receive_data_chunk", spy):
+            response, enqueue = self.upload(
+                "cv.pdf", b"%PDF-1.4\n" + b"x" * (3 * 1024 * 1024)
+            )
+
+        self.assertContains(response, "File size should be less than 1 MB.")
+        self.assertLessEqual(sum(received), 1024 * 1024 + max(received))
+        self.assertFalse(Candidate.objects.exists())
+        enqueue.assert_not_called()
+
+    def test_content_must_match_extension(self):
+        """A file whose magic bytes do not match its extension is rejected"""
+        response, _ = self.upload("cv.pdf", b"PK\x03\x04 not a pdf")
+        self.assertContains(
+            response, "The file content does not match its .pdf extension."
+        )
+        response, _ = self.upload("cv.docx", b"%P")
+        self.assertContains(
+            response, "The file content does not match its .docx extension."
+        )
+
+    def test_handler_is_scoped_to_upload_view(self):
+        """Other views keep Django's default upload handlers"""
+        request = RequestFactory().post("/admin/", {})
+        self.assertFalse(
+            any(
+                isinstance(handler, uploads.CVUploadHandler)
+                for handler in request.upload_handlers
+            )
+        )
+
+    def test_upload_still_checks_csrf(self):
+        """Moving the CSRF check into the view keeps it enforced"""
+        client = Client(enforce_csrf_checks=True)
+        test_file = SimpleUploadedFile("cv.pdf", b"%PDF-1.4\n")
+        response = client.post(reverse("upload_cv"), {"uploaded_file": test_file})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Candidate.objects.exists())
+        self.assertFalse(Candidate.objects.exists())
+
+    def test_mapped_file_reads_like_a_file(self):
+        """MappedFile supports the read/seek calls the PDF and DOCX readers use"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(b"%PDF-1.4 mapped")
+            f.flush()
+            with uploads.open_mapped(f.name) as mapped:
+                self.assertEqual(mapped.read(5), b"%PDF-")
+                mapped.seek(-6, os.SEEK_END)
+                self.assertEqual(mapped.read(), b"mapped")
+                self.assertEqual(mapped.tell(), 15)
+            self.assertTrue(mapped.closed)
+
+
+class StubCompletions:
+    """Stand-in for `client.chat.completions` that records every call."""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            include_usage = kwargs.get("stream_options", {}).get("include_usage")
+            return self.stream(include_usage)
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)], usage=self.usage()
+        )
+
+    def usage(self):
+        return SimpleNamespace(
+            prompt_tokens=100, completion_tokens=len(self.content.split(" "))
+        )
+
+    def stream(self, include_usage=False):
+        for word in self.content.split(" "):
+            delta = SimpleNamespace(content=word + " ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        if include_usage:
+            yield SimpleNamespace(choices=[], usage=self.usage())
+
+
+class AsyncStubCompletions(StubCompletions):
+    """Stand-in for the async client's `chat.completions`."""
+
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+    async def stream(self, include_usage=False):
+        for chunk in super().stream(include_usage):
+            yield chunk
+
+
+class StubClient:
+    completions_class = StubCompletions
+
+    def __init__(self, content):
+        self.completions = self.completions_class(content)
+        self.chat = SimpleNamespace(completions=self.completions)
+
+
+class AsyncStubClient(StubClient):
+    completions_class = AsyncStubCompletions
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ParseMemoizationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = StubClient(json.dumps({"skills": ["Python"]}))
+
+    def test_same_normalized_text_hits_cache(self):
+        """Whitespace-only differences reuse the stored parse"""
+        first = openai_services.parse_resume_with_llm(
+            "Jane  Doe\nPython", client=self.client
+        )
+        second = openai_services.parse_resume_with_llm(
+            "Jane Doe Python ", client=self.client
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.client.completions.calls), 1)
+
+    def test_schema_version_change_invalidates(self):
+        """Entries written under another schema version are not reused"""
+        openai_services.parse_resume_with_llm("Jane Doe", client=self.client)
+        with mock.patch.object(openai_services, "SCHEMA_VERSION", "changed"):
+            openai_services.parse_resume_with_llm("Jane Doe", client=self.client)
+        self.assertEqual(len(self.client.completions.calls), 2)
+
+    def test_invalid_json_is_not_memoized(self):
+        """A malformed completion raises and is retried on the next call"""
+        bad_client = StubClient("not json")
+        for _ in range(2):
+            with self.assertRaises(json.JSONDecodeError):
+                openai_services.parse_resume_with_llm("Jane Doe", client=bad_client)
+        self.assertEqual(len(bad_client.completions.calls), 2)
+
+
+def long_cv(jobs=12, publications=24):
+    lines = ["Jane Doe", "jane@example.com", "Python, Django", "", "EXPERIENCE"]
+    lines += [
+        f"Engineer {i} | Company {i} | 20{i:02d} | 20{i + 1:02d} | "
+        + "Built and ran services. " * 4
+        for i in range(jobs)
+    ]
+    lines += ["", "Education", "BSc Computer Science | MIT | 2010", ""]
+    lines += ["Skills:", "python, SQL, Docker", "", "Publications"]
+    lines += [
+        f"Paper {i} | " + "A study of distributed systems. " * 3 + "| LaTeX"
+        for i in range(publications)
+    ]
+    return "\n".join(lines)
+
+
+class SectionParseTests(TestCase):
+    def test_split_sections_at_headings(self):
+        sections = split_sections(long_cv(jobs=1, publications=1))
+        self.assertEqual(
+            [section.key for section in sections],
+            ["header", "work_experience", "education", "skills", "projects"],
+        )
+        self.assertEqual(sections[0].text, "Jane Doe\njane@example.com\nPython, Django")
+        self.assertTrue(sections[3].text.startswith("Skills:\n"))
+
+    def test_long_sections_are_chunked_with_their_heading(self):
+        requests = openai_services.section_requests(long_cv(), max_chars=500)
+        experience = [text for keys, text in requests if keys == ("work_experience",)]
+        self.assertGreater(len(experience), 1)
+        self.assertTrue(all(text.startswith("EXPERIENCE\n") for text in experience))
+        self.assertTrue(
+            all(len(text) <= 500 + len("EXPERIENCE\n") for text in experience)
+        )
+        self.assertEqual(requests[0][0], openai_services.HEADER_KEYS)
+
+    def test_merge_dedupes_into_resume_shape(self):
+        merged = openai_services.merge_parsed_sections(
+            [
+                {
+                    "personal_info": {"name": "Jane Doe", "email": ""},
+                    "skills": ["Python"],
+                },
+                {"personal_info": {"email": "jane@example.com"}},
+                {"skills": ["python ", "SQL", ""]},
+                {"education": [{"degree": "BSc", "institution": "MIT", "year": ""}]},
+                {"education": [{"degree": "bsc", "institution": "MIT ", "year": ""}]},
+            ]
+        )
+        self.assertEqual(list(merged), list(openai_services.RESUME_KEYS))
+        self.assertEqual(merged["personal_info"]["name"], "Jane Doe")
+        self.assertEqual(merged["personal_info"]["email"], "jane@example.com")
+        self.assertEqual(merged["personal_info"]["phone"], "")
+        self.assertEqual(merged["skills"], ["Python", "SQL"])
+        self.assertEqual(len(merged["education"]), 1)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        LLM_SECTION_MAX_CHARS=800,
+    )
+    def test_edited_cv_only_reparses_changed_sections(self):
+        """Unchanged sections are served from the section cache"""
+        cache.clear()
+        text = long_cv(jobs=2, publications=2)
+        edited = text.replace("Python, Django", "Python, Flask")
+        client = AsyncStubClient(json.dumps({"skills": ["Python"]}))
+
+        for cv in (text, edited):
+            requests = openai_services.section_requests(cv, 800)
+            asyncio.run(openai_services.parse_resume_sections(cv, client, requests))
+
+        calls = client.completions.calls
+        first_run = len(openai_services.section_requests(text, 800))
+        self.assertGreater(first_run, 2)
+        self.assertEqual(len(calls), first_run + 1)
+        self.assertIn("Python, Flask", calls[-1]["messages"][-1]["content"])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+        LLM_SECTION_PARSE_MIN_CHARS=1000,
+        LLM_SECTION_MAX_CHARS=800,
+        LLM_PARSE_CONCURRENCY=8,
+        LLM_PREPARSE=False,
+    )
+    def test_section_parse_is_faster_on_slow_server(self):
+        """Concurrent section calls beat one large call on a slow stub"""
+        cache.clear()
+        text = long_cv()
+        with FakeOpenAIServer(latency=0.02, seconds_per_char=0.0002) as server:
+            sync_client = openai.OpenAI(base_url=server.base_url, api_key="test")
+            async_client = openai.AsyncOpenAI(base_url=server.base_url, api_key="test")
+            # Warm both clients up so one-off import and setup costs are not
+            # billed to either mode.
+            openai_services.parse_resume_with_llm("Jane Doe", client=sync_client)
+            asyncio.run(
+                openai_services.parse_resume_sections(
+                    "",
+                    openai.AsyncOpenAI(base_url=server.base_url, api_key="test"),
+                    [(("skills",), "Python, SQL")],
+                )
+            )
+            server.requests.clear()
+            with override_settings(LLM_SECTION_PARSE=False):
+                _, full_seconds = timed_call(
+                    openai_services.parse_resume_with_llm, text, client=sync_client
+                )
+            content, section_seconds = timed_call(
+                openai_services.parse_resume_with_llm, text, async_client=async_client
+            )
+            section_calls = len(server.requests) - 1
+
+        parsed = json.loads(content)
+        self.assertGreater(section_calls, 2)
+        self.assertEqual(parsed["personal_info"]["name"], "Jane Doe")
+        self.assertEqual(len(parsed["work_experience"]), 12)
+        self.assertEqual(len(parsed["projects"]), 24)
+        self.assertEqual(parsed["education"][0]["institution"], "MIT")
+        self.assertEqual(parsed["skills"], ["Python", "Django", "SQL", "Docker"])
+        self.assertLess(section_seconds, full_seconds / 2)
+
+
+def timed_call(func, *args, **kwargs):
+    started = time.monotonic()
+    result = func(*args, **kwargs)
+    return result, time.monotonic() - started
+
+
+STRUCTURED_CV = """Diann Kupha
+Python Developer
+Contact Details
+diannkupha@gmail.com
+(938) 032 7933
+North Arjun, 36142-1983, New
+Jersey
+Education
+Bachelor of Science in
+Computer Science
+University of California,
+Berkeley
+2017 - 2021
+Skills
+Object-Oriented - Expert
+SQL (PostgreSQL, Oracle)
+Work Experience
+Python Developer, Marks, Miller and Runte
+March 2023 - Present
+- Developed Python applications using Flask, Django, and PostgreSQL.
+- Implemented a suite of automated tests.
+Junior Developer
+Fritsch and Steuber
+May 2021 - February 2023
+- Built data pipelines for ETL processes.
+Certifications
+AWS Certified Developer - Amazon Web Services, 2022
+References
+References available upon request"""
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    LLM_PREPARSE=True,
+)
+class PreParseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_structured_cv_only_asks_for_missing_fields(self):
+        """Fields with no section are asked for over the whole text"""
+        client = StubClient("{}")
+        parsed = json.loads(
+            openai_services.parse_resume_with_llm(STRUCTURED_CV, client=client)
+        )
+        (call,) = client.completions.calls
+        schema = call["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["projects"])
+        self.assertEqual(call["messages"][1]["content"], STRUCTURED_CV)
+        self.assertEqual(
+            parsed["personal_info"],
+            {
+                "name": "Diann Kupha",
+                "email": "diannkupha@gmail.com",
+                "phone": "(938) 032 7933",
+                "address": "North Arjun, 36142-1983, New Jersey",
+            },
+        )
+        self.assertEqual(
+            parsed["education"],
+            [
+                {
+                    "degree": "Bachelor of Science in Computer Science",
+                    "institution": "University of California, Berkeley",
+                    "year": "2021",
+                }
+            ],
+        )
+        self.assertEqual(
+            [(job["job_title"], job["company"]) for job in parsed["work_experience"]],
+            [
+                ("Python Developer", "Marks, Miller and Runte"),
+                ("Junior Developer", "Fritsch and Steuber"),
+            ],
+        )
+        self.assertEqual(
+            parsed["work_experience"][1]["responsibilities"],
+            "Built data pipelines for ETL processes.",
+        )
+        self.assertEqual(
+            parsed["skills"], ["Object-Oriented - Expert", "SQL (PostgreSQL, Oracle)"]
+        )
+        self.assertEqual(parsed["projects"], [])
+        self.assertEqual(
+            parsed["certificates"],
+            [
+                {
+                    "certificate_name": "AWS Certified Developer",
+                    "issued_by": "Amazon Web Services",
+                    "year": "2022",
+                }
+            ],
+        )
+
+    def test_unrecognized_heading_is_not_read_as_empty(self):
+        """A section under an unknown heading still reaches the LLM"""
+        text = (
+            "Jane Roe\njane.roe@example.com\n"
+            "Education\nBSc Physics, MIT, 2019\n"
+            "Skills\nPython\n"
+            "Professional Background\nEngineer, Acme\n"
+            "Credentials\nPMP - PMI, 2021"
+        )
+        pre = preparse.preparse(text)
+        self.assertIn("work_experience", pre.pending)
+        self.assertIn("certificates", pre.pending)
+        self.assertNotIn("work_experience", pre.parsed)
+        requests = openai_services.pending_requests(text, pre)
+        self.assertEqual(requests, [(pre.pending, text)])
+
+    def test_only_ambiguous_sections_are_sent(self):
+        """Fields resolved locally are neither asked for nor sent"""
+        text = STRUCTURED_CV + "\nProjects\nPrice Tracker\nBuilt with D3.js"
+        projects = [
+            {"project_name": "Price Tracker", "description": "", "technologies": ""}
+        ]
+        client = StubClient(json.dumps({"projects": projects}))
+        parsed = json.loads(openai_services.parse_resume_with_llm(text, client=client))
+
+        (call,) = client.completions.calls
+        schema = call["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["projects"])
+        self.assertEqual(
+            call["messages"][1]["content"], "Projects\nPrice Tracker\nBuilt with D3.js"
+        )
+        self.assertEqual(parsed["projects"], projects)
+        self.assertEqual(parsed["personal_info"]["name"], "Diann Kupha")
+
+    def test_wrapped_bullets_leave_experience_to_llm(self):
+        """A job header that may be a wrapped bullet is not guessed at"""
+        text = STRUCTURED_CV.replace(
+            "- Implemented a suite of automated tests.",
+            "- Implemented a suite of automated tests for the\nUser Interface",
+        )
+        text += "\nProjects\nPrice Tracker"
+        pre = preparse.preparse(text)
+        self.assertEqual(pre.pending, ("work_experience", "projects"))
+        requests = openai_services.pending_requests(text, pre)
+        self.assertEqual(
+            [keys for keys, _ in requests], [("work_experience",), ("projects",)]
+        )
+        self.assertTrue(requests[0][1].startswith("Work Experience\n"))
+
+    def test_unrecognized_layout_uses_full_schema(self):
+        client = StubClient(json.dumps({"skills": []}))
+        openai_services.parse_resume_with_llm("Jane Doe\nPython", client=client)
+        (call,) = client.completions.calls
+        self.assertEqual(call["response_format"], openai_services.RESUME_SCHEMA)
+
+    @override_settings(LLM_PREPARSE=False)
+    def test_preparse_can_be_disabled(self):
+        client = StubClient("{}")
+        openai_services.parse_resume_with_llm(STRUCTURED_CV, client=client)
+        (call,) = client.completions.calls
+        self.assertEqual(call["response_format"], openai_services.RESUME_SCHEMA)
+
+    def test_contact_details(self):
+        text = (
+            "Phone: +44 20 7946 0958, 2015 - 2019\n"
+            "linkedin.com/in/jane-doe-12345678 jane.doe+cv@mail.example.org"
+        )
+        self.assertEqual(preparse.find_phones(text), ["+44 20 7946 0958"])
+        self.assertEqual(preparse.find_emails(text), ["jane.doe+cv@mail.example.org"])
+
+
+class PromptTests(TestCase):
+    def test_templates_are_immutable(self):
+        schema = RESUME_PROMPT.response_format
+        with self.assertRaises(TypeError):
+            schema["strict"] = False
+        with self.assertRaises(TypeError):
+            schema["json_schema"]["schema"]["required"].append("salary")
+        self.assertIs(copy.deepcopy(schema), schema)
+        self.assertEqual(json.loads(json.dumps(schema)), schema)
+
+    def test_schema_hash_is_stable(self):
+        """The hash depends only on the content, not on object identity"""
+        rebuilt = prompts.Prompt(
+            RESUME_PROMPT.name,
+            RESUME_PROMPT.version,
+            RESUME_PROMPT.system,
+            json.loads(json.dumps(RESUME_PROMPT.response_format)),
+        )
+        self.assertEqual(rebuilt.hash, RESUME_PROMPT.hash)
+        bumped = prompts.Prompt("cv_resume_parser", 2, RESUME_PROMPT.system)
+        self.assertNotEqual(bumped.hash, RESUME_PROMPT.hash)
+        self.assertIs(
+            prompts.section_prompt(("skills",)), prompts.section_prompt(("skills",))
+        )
+
+    def test_variable_data_comes_last(self):
+        messages = prompts.section_prompt(("education", "skills")).messages("CV")
+        self.assertTrue(messages[0]["content"].endswith("education, skills."))
+        self.assertEqual(messages[-1], {"role": "user", "content": "CV"})
+        self.assertIs(RESUME_PROMPT.messages("CV")[0], RESUME_PROMPT.system_message)
+
+    def test_precompiled_schema_is_sent_as_a_plain_dict(self):
+        """The SDK gets a mutable copy of the template, not the template"""
+        request = {"model": "gpt-4o", "response_format": RESUME_PROMPT.response_format}
+        wire = llm_client._wire_request(request)
+        self.assertNotIn("extra_body", wire)
+        self.assertIs(type(wire["response_format"]), dict)
+        self.assertIs(
+            type(wire["response_format"]["json_schema"]["schema"]["required"]), list
+        )
+        self.assertEqual(wire["response_format"], RESUME_PROMPT.response_format)
+        self.assertIs(request["response_format"], RESUME_PROMPT.response_format)
+
+    def test_precompiled_schema_reaches_the_server(self):
+        """The template arrives as response_format"""
+        with FakeOpenAIServer() as server:
+            with override_settings(OPENAI_KEY="test", OPENAI_BASE_URL=server.base_url):
+                response = llm_client.llm_client().chat.completions.create(
+                    model="gpt-4o",
+                    messages=RESUME_PROMPT.messages("Jane Doe"),
+                    response_format=RESUME_PROMPT.response_format,
+                )
+        self.assertEqual(
+            server.requests[0]["response_format"], RESUME_PROMPT.response_format
+        )
+        self.assertIn("personal_info", json.loads(response.choices[0].message.content))
+
+
+class LLMClientTests(TestCase):
+    def settings_for(self, server, **overrides):
+        options = {
+            "OPENAI_KEY": "test",
+            "OPENAI_BASE_URL": server.base_url,
+            "LLM_BACKOFF_BASE": 0.01,
+            "LLM_TOKENS_PER_MINUTE": 0,
+            "LLM_REQUESTS_PER_MINUTE": 0,
+            **overrides,
+        }
+        return override_settings(**options)
+
+    def ask(self, prompt):
+        return llm_client.llm_client().chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": prompt}]
+        )
+
+    def test_retries_respect_retry_after(self):
+        """429 and 5xx replies are retried after the server's Retry-After"""
+        with FakeOpenAIServer(errors=[429, 503], retry_after=0.2) as server:
+            with self.settings_for(server):
+                response, seconds = timed_call(self.ask, "hello")
+
+        self.assertEqual(response.choices[0].message.content, "hello")
+        self.assertEqual(len(server.requests), 3)
+        self.assertGreaterEqual(seconds, 0.4)
+
+    def test_client_errors_are_not_retried(self):
+        with FakeOpenAIServer(errors=[400]) as server:
+            with self.settings_for(server), self.assertRaises(openai.BadRequestError):
+                self.ask("hello")
+        self.assertEqual(len(server.requests), 1)
+
+    def test_gives_up_after_max_retries(self):
+        with FakeOpenAIServer(errors=[503] * 3) as server:
+            with self.settings_for(server, LLM_MAX_RETRIES=2), self.assertRaises(
+                openai.InternalServerError
+            ):
+                self.ask("hello")
+        self.assertEqual(len(server.requests), 3)
+
+    def test_governor_caps_concurrency(self):
+        with FakeOpenAIServer(latency=0.1) as server:
+            with self.settings_for(server, LLM_MAX_CONCURRENCY=2):
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    replies = list(executor.map(self.ask, [f"q{i}" for i in range(8)]))
+
+        self.assertEqual(len(replies), 8)
+        self.assertEqual(server.max_in_flight, 2)
+
+    def test_identical_requests_are_coalesced(self):
+        """Concurrent identical prompts share one upstream call"""
+        with FakeOpenAIServer(latency=0.3) as server:
+            with self.settings_for(server):
+                with ThreadPoolExecutor(max_workers=5) as executor:
+                    replies = list(executor.map(self.ask, ["same"] * 5))
+
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual({id(reply) for reply in replies}, {id(replies[0])})
+
+    def test_async_client_shares_governor(self):
+        async def ask_all():
+            client = llm_client.async_llm_client()
+            return await asyncio.gather(
+                *(
+                    client.chat.completions.create(
+                        model="gpt-4o", messages=[{"role": "user", "content": f"q{i}"}]
+                    )
+                    for i in range(6)
+                )
+            )
+
+        with FakeOpenAIServer(latency=0.1) as server:
+            with self.settings_for(server, LLM_MAX_CONCURRENCY=2):
+                replies = asyncio.run(ask_all())
+
+        self.assertEqual(
+            [reply.choices[0].message.content for reply in replies],
+            [f"q{i}" for i in range(6)],
+        )
+        self.assertEqual(server.max_in_flight, 2)
+
+    @override_settings(OPENAI_KEY="test")
+    def test_async_client_is_closed_with_its_loop(self):
+        async def open_client():
+            return llm_client.async_llm_client()
+
+        client = asyncio.run(open_client())
+
+        self.assertTrue(client._client.is_closed())
+
+    @override_settings(OPENAI_KEY="test")
+    def test_run_async_reuses_one_client(self):
+        async def open_client():
+            return llm_client.async_llm_client()
+
+        first = llm_client.run_async(open_client())
+        second = llm_client.run_async(open_client())
+
+        self.assertIs(first, second)
+        self.assertFalse(first._client.is_closed())
+
+    def test_governor_token_and_request_budgets(self):
+        now = [0.0]
+        governor = llm_client.LLMGovernor(
+            10, tokens_per_minute=600, requests_per_minute=120, clock=lambda: now[0]
+        )
+        self.assertEqual(governor.try_acquire(500), 0)
+        # The reply used fewer tokens than estimated; the rest is refunded.
+        governor.release(500, used_tokens=300)
+        self.assertAlmostEqual(governor.try_acquire(400), 10.0)
+        now[0] = 10.0
+        self.assertEqual(governor.try_acquire(400), 0)
+        self.assertEqual(governor.in_flight, 1)
+
+        governor.pause(5)
+        self.assertAlmostEqual(governor.try_acquire(1), 5.0)
+
+    def test_backoff_delay(self):
+        self.assertEqual(llm_client.backoff_delay(3, 0.5, 30, retry_after=7), 7)
+        delays = [llm_client.backoff_delay(3, 0.5, 2) for _ in range(200)]
+        self.assertTrue(all(0 <= delay <= 2 for delay in delays))
+        self.assertGreater(len(set(delays)), 100)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE, INGESTION_EAGER=True
+)
+class IngestionTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        self.client = Client()
+        self.parsed = {
+            "personal_info": {"name": "Ada Lovelace"},
+            "education": [],
+            "work_experience": [],
+            "skills": ["Math"],
+            "projects": [],
+            "certificates": [],
+        }
+
+    def upload(self):
+        test_file = SimpleUploadedFile(
+            "cv.pdf", b"%PDF-1.4 test", content_type="application/pdf"
+        )
+        return self.client.post(reverse("upload_cv"), {"uploaded_file": test_file})
+
+    def test_upload_is_processed_in_background(self):
+        """The upload redirects and the job fills in the Candidate"""
+        with mock.patch.object(
+            ingestion, "extract_text_cached", return_value="text"
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value=json.dumps(self.parsed)
+        ):
+            response = self.upload()
+
+        candidate = Candidate.objects.get()
+        self.assertRedirects(
+            response, reverse("candidate_view", kwargs={"pk": candidate.pk})
+        )
+        self.assertEqual(candidate.status, Candidate.Status.DONE)
+        self.assertEqual(candidate.skills, ["Math"])
+        self.assertIn("extraction_seconds", candidate.timings)
+        self.assertIn("parse_seconds", candidate.timings)
+
+    def test_failed_job_reports_error(self):
+        """A parse failure marks the Candidate as failed instead of deleting it"""
+        with mock.patch.object(
+            ingestion, "extract_text_cached", return_value="text"
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value="not json"
+        ):
+            self.upload()
+
+        candidate = Candidate.objects.get()
+        response = self.client.get(
+            reverse("candidate_status", kwargs={"pk": candidate.pk})
+        )
+        data = response.json()
+        self.assertEqual(data["status"], "failed")
+        self.assertEqual(data["error"], ingestion.PARSE_ERROR_MESSAGE)
+        self.assertIsNotNone(data["finished_at"])
+
+    def test_candidate_is_processed_once(self):
+        """Only pending candidates are claimed by a worker"""
+        candidate = Candidate.objects.create(status=Candidate.Status.DONE)
+        with mock.patch.object(ingestion, "extract_text_cached") as extract:
+            ingestion.process_candidate(candidate.pk)
+        extract.assert_not_called()
+
+    def test_deleted_candidate_is_logged_not_raised(self):
+        """A candidate deleted after it was claimed ends the job with a warning"""
+        candidate = Candidate.objects.create(
+            status=Candidate.Status.PENDING, uploaded_file="uploads/cv.pdf"
+        )
+        with mock.patch.object(
+            Candidate.objects, "get", side_effect=Candidate.DoesNotExist
+        ), self.assertLogs("core.ingestion", "WARNING") as logs:
+            ingestion.process_candidate(candidate.pk)
+        self.assertIn("deleted before ingestion", logs.output[0])
+
+    def test_candidate_deleted_mid_job_is_not_recreated(self):
+        """Saving the result does not insert a candidate deleted meanwhile"""
+        candidate = Candidate.objects.create(
+            status=Candidate.Status.PENDING, uploaded_file="uploads/cv.pdf"
+        )
+
+        def delete_and_extract(*args):
+            Candidate.objects.filter(pk=candidate.pk).delete()
+            return "text"
+
+        with mock.patch.object(
+            ingestion, "extract_text_cached", side_effect=delete_and_extract
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value=json.dumps(self.parsed)
+        ), self.assertLogs(
+            "core.ingestion", "WARNING"
+        ) as logs:
+            ingestion.process_candidate(candidate.pk)
+        self.assertIn("deleted during ingestion", logs.output[0])
+        self.assertFalse(Candidate.objects.exists())
+
+    def test_ingest_pending_command(self):
+        """Pending candidates left behind by a restart are drained by the command"""
+        candidate = Candidate.objects.create(
+            status=Candidate.Status.PENDING, uploaded_file="uploads/cv.pdf"
+        )
+        with mock.patch.object(
+            ingestion, "extract_text_cached", return_value="text"
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value=json.dumps(self.parsed)
+        ):
+            call_command("ingest_pending", stdout=StringIO())
+
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, Candidate.Status.DONE)
+
+    def test_status_missing_candidate(self):
+        response = self.client.get(reverse("candidate_status", kwargs={"pk": 999}))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportCVsCommandTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.sample_dir = os.path.join(settings.BASE_DIR, "data", "sample_cvs")
+        parsed = {
+            "personal_info": {"name": "Sample"},
+            "education": [],
+            "work_experience": [],
+            "skills": [],
+            "projects": [],
+            "certificates": [],
+        }
+        media_root = override_settings(
+            MEDIA_ROOT=self.media.name,
+            EMBEDDING_INDEX_DIR=os.path.join(self.media.name, "vectors"),
+        )
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        patches = [
+            mock.patch.object(import_cvs, "extract_text_cached", return_value="text"),
+            mock.patch.object(
+                import_cvs, "parse_resume_with_llm", return_value=json.dumps(parsed)
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.media.cleanup()
+
+    def run_import(self, source):
+        out = StringIO()
+        call_command(
+            "import_cvs", source, "--extract-workers=0", "--batch-size=4", stdout=out
+        )
+        return out.getvalue()
+
+    def test_import_directory_is_resumable(self):
+        """A second run skips every file already imported by hash"""
+        output = self.run_import(self.sample_dir)
+        self.assertEqual(Candidate.objects.count(), 6)
+        self.assertIn("CVs/min", output)
+        self.assertTrue(all(len(c.file_hash) == 64 for c in Candidate.objects.all()))
+
+        output = self.run_import(self.sample_dir)
+        self.assertEqual(Candidate.objects.count(), 6)
+        self.assertIn("skipped 6 already imported", output)
+
+    def test_import_zip_archive(self):
+        archive_path = os.path.join(self.media.name, "cvs.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            for name in sorted(os.listdir(self.sample_dir))[:2]:
+                archive.write(os.path.join(self.sample_dir, name), f"batch/{name}")
+
+        self.run_import(archive_path)
+        self.assertEqual(Candidate.objects.count(), 2)
+
+
+def cv_text(prefix, words=300, edits=()):
+    """Synthetic CV text of distinct words, with some of them replaced."""
+    tokens = [f"{prefix}{i}" for i in range(words)]
+    for position in edits:
+        tokens[position] = f"edited{position}"
+    return " ".join(tokens)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEDUP_ACTION="flag", DEDUP_THRESHOLD=0.8)
+class DedupeTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+
+    def ingest(self, text, skills=(), email=""):
+        candidate = Candidate.objects.create(
+            status=Candidate.Status.PENDING, uploaded_file="uploads/cv.pdf"
+        )
+        parsed = {
+            "personal_info": {"name": "Ada Lovelace", "email": email},
+            "education": [],
+            "work_experience": [],
+            "skills": list(skills),
+            "projects": [],
+            "certificates": [],
+        }
+        with mock.patch.object(
+            ingestion, "extract_text_cached", return_value=text
+        ), mock.patch.object(
+            ingestion, "parse_resume_with_llm", return_value=json.dumps(parsed)
+        ):
+            ingestion.process_candidate(candidate.pk)
+        candidate.refresh_from_db()
+        return candidate
+
+    def test_signature_estimates_jaccard(self):
+        a = dedupe.shingles(cv_text("w"))
+        b = dedupe.shingles(cv_text("w", edits=range(0, 300, 10)))
+        jaccard = len(a & b) / len(a | b)
+        estimate = dedupe.similarity(dedupe.minhash(a), dedupe.minhash(b))
+        self.assertAlmostEqual(estimate, jaccard, delta=0.1)
+        self.assertEqual(len(dedupe.band_buckets(dedupe.minhash(a))), dedupe.BANDS)
+        self.assertEqual(dedupe.band_buckets(dedupe.minhash(set())), [])
+
+    def test_edited_upload_flags_older_candidate(self):
+        """Re-uploading a slightly edited CV flags the old one, not the new"""
+        old = self.ingest(cv_text("w"))
+        new = self.ingest(cv_text("w", edits=[5, 100, 250]))
+        other = self.ingest(cv_text("v"))
+
+        old.refresh_from_db()
+        self.assertEqual(old.duplicate_of, new)
+        self.assertIsNone(new.duplicate_of)
+        self.assertIsNone(other.duplicate_of)
+        self.assertEqual(CandidateSignature.objects.count(), 3)
+        self.assertNotIn(old.pk, select_relevant_candidates("anything"))
+
+    def test_flagged_cluster_follows_newest_upload(self):
+        first = self.ingest(cv_text("w"))
+        second = self.ingest(cv_text("w", edits=[10]))
+        third = self.ingest(cv_text("w", edits=[10, 20]))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.duplicate_of, third)
+        self.assertEqual(second.duplicate_of, third)
+
+    def test_shared_email_lowers_threshold(self):
+        edits = range(0, 300, 12)
+        old = self.ingest(cv_text("w"), email="ada@example.com")
+        self.ingest(cv_text("w", edits=edits), email="other@example.com")
+        old.refresh_from_db()
+        self.assertIsNone(old.duplicate_of)
+
+        new = self.ingest(cv_text("w", edits=edits), email="ADA@example.com")
+        old.refresh_from_db()
+        self.assertEqual(old.duplicate_of, new)
+
+    @override_settings(DEDUP_ACTION="merge")
+    def test_merge_folds_duplicate_into_newest(self):
+        old = self.ingest(cv_text("w"), skills=["Python", "SQL"])
+        new = self.ingest(cv_text("w", edits=[7]), skills=["Python", "Django"])
+
+        self.assertFalse(Candidate.objects.filter(pk=old.pk).exists())
+        new.refresh_from_db()
+        self.assertEqual(new.skills, ["Python", "Django", "SQL"])
+
+    @override_settings(DEDUP_ACTION="off")
+    def test_off_stores_nothing(self):
+        self.ingest(cv_text("w"))
+        self.ingest(cv_text("w"))
+        self.assertFalse(Candidate.objects.exclude(duplicate_of=None).exists())
+        self.assertFalse(CandidateSignature.objects.exists())
+
+    def test_dedupe_candidates_command(self):
+        """The bulk pass signs unsigned candidates and flags each cluster"""
+        candidates = []
+        for text in [cv_text("w"), cv_text("w", edits=[3]), cv_text("v")]:
+            candidate = Candidate.objects.create(personal_info={"name": "x"})
+            CandidateText.objects.create(candidate=candidate, raw_text=text)
+            candidates.append(candidate)
+
+        out = StringIO()
+        call_command("dedupe_candidates", "--dry-run", stdout=out)
+        self.assertIn("Signed 3 candidate(s)", out.getvalue())
+        self.assertIn("1 cluster(s)", out.getvalue())
+        self.assertFalse(Candidate.objects.exclude(duplicate_of=None).exists())
+
+        out = StringIO()
+        call_command("dedupe_candidates", stdout=out)
+        self.assertIn("Signed 0 candidate(s)", out.getvalue())
+        self.assertIn("Flagged 1 duplicate(s)", out.getvalue())
+        first, second, third = candidates
+        first.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual(first.duplicate_of, second)
+        self.assertIsNone(third.duplicate_of)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE, CHAT_MAX_CANDIDATES=5
+)
+class RetrievalTests(TestCase):
+    def setUp(self):
+        self.react_dev = Candidate.objects.create(
+            personal_info={"name": "Ada Lovelace"},
+            skills=["React", "TypeScript"],
+            work_experience=[{"company": "Acme Corp", "job_title": "Frontend Dev"}],
+        )
+        self.others = [
+            Candidate.objects.create(
+                personal_info={"name": f"Person {i}"}, skills=["Cobol"]
+            )
+            for i in range(10)
+        ]
+
+    def test_terms_are_indexed_on_save(self):
+        values = set(
+            CandidateTerm.objects.filter(candidate=self.react_dev).values_list(
+                "kind", "value"
+            )
+        )
+        self.assertIn(("skill", "react"), values)
+        self.assertIn(("company", "acme corp"), values)
+        self.assertIn(("name", "lovelace"), values)
+
+        self.react_dev.skills = ["Vue"]
+        self.react_dev.save()
+        self.assertFalse(
+            CandidateTerm.objects.filter(
+                candidate=self.react_dev, value="react"
+            ).exists()
+        )
+
+    def test_select_relevant_candidates(self):
+        """Multi-word terms and punctuation in the question still match"""
+        self.assertEqual(
+            select_relevant_candidates("Who worked at Acme Corp?"),
+            [self.react_dev.pk],
+        )
+        self.assertEqual(len(select_relevant_candidates("Anyone at all?")), 5)
+
+    def test_unfinished_candidates_are_not_selected(self):
+        """Pending or failed candidates never reach the chat context"""
+        for status in (Candidate.Status.PROCESSING, Candidate.Status.FAILED):
+            Candidate.objects.filter(pk=self.react_dev.pk).update(status=status)
+            self.assertNotIn(
+                self.react_dev.pk, select_relevant_candidates("Who knows React?")
+            )
+
+    def test_async_selection_matches_sync(self):
+        Candidate.objects.update(status=Candidate.Status.DONE)
+        for question in ("Who worked at Acme Corp?", "Anyone at all?"):
+            self.assertEqual(
+                async_to_sync(aselect_relevant_candidates)(question),
+                select_relevant_candidates(question),
+            )
+
+    def test_chat_prompt_only_contains_relevant_candidates(self):
+        client = AsyncStubClient("Ada Lovelace")
+        with mock.patch.object(views, "async_llm_client", return_value=client):
+            self.client.post(reverse("chat_prompt"), {"prompt": "Who knows React?"})
+
+        prompt = client.completions.calls[0]["messages"][-1]["content"]
+        self.assertIn("Ada Lovelace", prompt)
+        self.assertNotIn("Person 1", prompt)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class VectorIndexTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        index_settings = override_settings(EMBEDDING_INDEX_DIR=self.index_dir.name)
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+
+        self.backend = Candidate.objects.create(
+            personal_info={"name": "Backend Dev"},
+            skills=["Python", "Django", "PostgreSQL"],
+            work_experience=[{"job_title": "Backend Engineer", "company": "Acme"}],
+        )
+        self.designer = Candidate.objects.create(
+            personal_info={"name": "Designer"},
+            skills=["Figma", "Illustrator", "Typography"],
+        )
+        self.other_backend = Candidate.objects.create(
+            personal_info={"name": "Other Backend Dev"},
+            skills=["Python", "Django", "Redis"],
+        )
+        embeddings.index_candidate_embeddings(
+            [self.backend, self.designer, self.other_backend]
+        )
+
+    def test_text_query_ranks_by_similarity(self):
+        results = embeddings.search_candidates(text="python django engineer", k=3)
+        self.assertEqual(results[-1][0], self.designer.pk)
+        self.assertIn(results[0][0], {self.backend.pk, self.other_backend.pk})
+
+    def test_like_query_excludes_itself(self):
+        results = embeddings.search_candidates(like=self.backend.pk, k=1)
+        self.assertEqual(results[0][0], self.other_backend.pk)
+
+    def test_upsert_replaces_and_delete_removes(self):
+        index = embeddings.get_vector_index()
+        embeddings.index_candidate_embeddings([self.backend])
+        self.assertEqual(index._read_meta()["count"], 3)
+
+        self.designer.delete()
+        pks = [pk for pk, _ in embeddings.search_candidates(text="figma", k=3)]
+        self.assertNotIn(self.designer.pk, pks)
+
+    def test_index_grows_past_initial_capacity(self):
+        index = embeddings.VectorIndex(os.path.join(self.index_dir.name, "grow"), 4)
+        vectors = np.eye(4, dtype=np.float32)[np.arange(10) % 4]
+        with mock.patch.object(embeddings, "INITIAL_CAPACITY", 3):
+            for start in range(0, 10, 2):
+                index.upsert(range(start, start + 2), vectors[start : start + 2])
+        self.assertEqual(index._read_meta()["count"], 10)
+        self.assertEqual(index.search(np.eye(4)[1], k=1)[0][1], 1.0)
+
+    def test_rebuild_holds_the_lock_and_swaps_in_new_files(self):
+        """Writers wait for a rebuild; readers keep the old rows until the swap"""
+        index = embeddings.get_vector_index()
+        self.assertEqual(len(index.search(np.ones(settings.EMBEDDING_DIM), k=3)), 3)
+        Candidate.objects.exclude(pk=self.backend.pk).update(
+            status=Candidate.Status.FAILED
+        )
+        embed = embeddings.HashingEmbedder.embed
+
+        def checked_embed(embedder, texts):
+            with self.assertRaises(filelock.Timeout):
+                filelock.FileLock(str(index._lock_path)).acquire(timeout=0)
+            found = {pk for pk, _ in index.search(np.ones(settings.EMBEDDING_DIM))}
+            self.assertEqual(len(found), 3)
+            return embed(embedder, texts)
+
+        with mock.patch.object(embeddings.HashingEmbedder, "embed", checked_embed):
+            call_command("rebuild_vector_index", stdout=StringIO())
+
+        results = index.search(np.ones(settings.EMBEDDING_DIM), k=3)
+        self.assertEqual([pk for pk, _ in results], [self.backend.pk])
+        self.assertEqual(index._read_meta()["generation"], 1)
+        parent, name = os.path.split(self.index_dir.name)
+        leftovers = [n for n in os.listdir(parent) if n.startswith(f"{name}.rebuild-")]
+        self.assertEqual(leftovers, [])
+
+    def test_search_endpoint(self):
+        response = self.client.get(
+            reverse("search_candidates"), {"q": "figma typography"}
+        )
+        self.assertEqual(response.json()["results"][0]["name"], "Designer")
+        response = self.client.get(reverse("search_candidates"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_k_is_clamped(self):
+        """Non-positive k cannot bypass the cap or reach argpartition"""
+        for k, expected in (("-1", 1), ("-50", 1), ("0", 1), ("500", 3)):
+            response = self.client.get(
+                reverse("search_candidates"), {"q": "python", "k": k}
+            )
+            self.assertEqual(response.status_code, 200, k)
+            self.assertEqual(len(response.json()["results"]), expected, k)
+        self.assertEqual(
+            embeddings.get_vector_index().search(np.ones(settings.EMBEDDING_DIM), k=-5),
+            [],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        Candidate.objects.create(personal_info={"name": "Ada"}, skills=["React"])
+
+    async def test_stream_sends_deltas_and_saves_history(self):
+        client = AsyncStubClient("Ada knows React")
+        with mock.patch.object(views, "async_llm_client", return_value=client):
+            response = await self.async_client.post(
+                reverse("chat_stream"), {"prompt": "Who knows React?"}
+            )
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            body = b"".join([chunk async for chunk in response.streaming_content])
+
+        events = body.decode().strip().split("\n\n")
+        self.assertEqual(events[0], 'data: {"delta": "Ada "}')
+        self.assertEqual(events[-1], "event: done\ndata: {}")
+        self.assertTrue(client.completions.calls[0]["stream"])
+
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget("final_response"), "Ada knows React ")
+        self.assertEqual((await session.aget("messages"))[-1]["role"], "assistant")
+
+    async def test_first_delta_is_sent_before_the_completion_ends(self):
+        """Under ASGI each delta is sent as it arrives, not buffered"""
+        client = AsyncStubClient("Ada knows React")
+        finish = asyncio.Event()
+        stream = client.completions.stream
+
+        async def gated_stream(include_usage=False):
+            async for chunk in stream(include_usage):
+                yield chunk
+                await finish.wait()
+
+        client.completions.stream = gated_stream
+        with mock.patch.object(views, "async_llm_client", return_value=client):
+            response = await self.async_client.post(
+                reverse("chat_stream"), {"prompt": "Who knows React?"}
+            )
+            chunks = response.streaming_content.__aiter__()
+            first = await asyncio.wait_for(chunks.__anext__(), timeout=5)
+            self.assertEqual(first, b'data: {"delta": "Ada "}\n\n')
+            finish.set()
+            rest = b"".join([chunk async for chunk in chunks])
+
+        self.assertTrue(rest.endswith(b"event: done\ndata: {}\n\n"))
+
+    def test_stream_requires_post(self):
+        response = self.client.get(reverse("chat_stream"))
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, MIDDLEWARE=TEST_MIDDLEWARE)
+class ConversationTests(TestCase):
+    def setUp(self):
+        Candidate.objects.create(personal_info={"name": "Ada"}, skills=["React"])
+
+    def test_history_stores_compact_turns(self):
+        """Candidate data is sent with the question but never stored"""
+        client = AsyncStubClient("Ada")
+        with mock.patch.object(views, "async_llm_client", return_value=client):
+            self.client.post(reverse("chat_prompt"), {"prompt": "Who knows React?"})
+            self.client.post(reverse("chat_prompt"), {"prompt": "Her email?"})
+
+        self.assertEqual(
+            self.client.session["messages"],
+            [
+                {"role": "user", "content": "Who knows React?"},
+                {"role": "assistant", "content": "Ada"},
+                {"role": "user", "content": "Her email?"},
+                {"role": "assistant", "content": "Ada"},
+            ],
+        )
+        second_request = client.completions.calls[1]["messages"]
+        self.assertEqual(second_request[0], CHAT_PROMPT.system_message)
+        self.assertEqual(second_request[1]["content"], "Who knows React?")
+        self.assertIn("candidate resumes", second_request[-1]["content"])
+        self.assertTrue(second_request[-1]["content"].startswith("Her email?"))
+
+    def test_history_is_trimmed_to_budget(self):
+        session = {}
+        conversation = Conversation(session, token_budget=60)
+        for i in range(10):
+            conversation.record_reply(f"question {i} " + "x" * 40, f"answer {i}")
+
+        self.assertEqual(session["messages"][-1]["content"], "answer 9")
+        self.assertLess(len(session["messages"]), 20)
+        metrics = conversation.metrics([])
+        self.assertLessEqual(metrics["history_tokens"], 60)
+
+    def test_latest_turn_is_kept_over_budget(self):
+        session = {}
+        Conversation(session, token_budget=1).record_reply("long " * 50, "reply")
+        self.assertEqual(len(session["messages"]), 2)
+
+
+class LocalRateLimiterTests(TestCase):
+    def hits(self, algorithm, times, now, limit=3, window=60):
+        limiter = ratelimit.LocalRateLimiter()
+        return [
+            limiter.hit(algorithm, "ip", limit, window, now=now + i * 0.001)
+            for i in range(times)
+        ], limiter
+
+    def test_fixed_window_resets_each_window(self):
+        results, limiter = self.hits(ratelimit.FIXED_WINDOW, 4, now=600)
+        self.assertEqual(results, [True, True, True, False])
+        self.assertTrue(limiter.hit(ratelimit.FIXED_WINDOW, "ip", 3, 60, now=660))
+
+    def test_sliding_window_weights_previous_window(self):
+        results, limiter = self.hits(ratelimit.SLIDING_WINDOW, 4, now=600)
+        self.assertEqual(results, [True, True, True, False])
+        # 15s into the next window, 3 * 0.75 of the previous window still
+        # counts, leaving room for a single request.
+        self.assertTrue(limiter.hit(ratelimit.SLIDING_WINDOW, "ip", 3, 60, now=675))
+        self.assertFalse(limiter.hit(ratelimit.SLIDING_WINDOW, "ip", 3, 60, now=676))
+
+    def test_token_bucket_refills_over_time(self):
+        results, limiter = self.hits(ratelimit.TOKEN_BUCKET, 4, now=600)
+        self.assertEqual(results, [True, True, True, False])
+        # One token is refilled every window / limit = 20 seconds.
+        self.assertTrue(limiter.hit(ratelimit.TOKEN_BUCKET, "ip", 3, 60, now=621))
+        self.assertFalse(limiter.hit(ratelimit.TOKEN_BUCKET, "ip", 3, 60, now=622))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    MIDDLEWARE=["core.middleware.RequestMetricsMiddleware", *TEST_MIDDLEWARE],
+)
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_parse_records_cache_latency_and_tokens(self):
+        """LLM parsing counts cache lookups, tokens and its latency"""
+        before = {
+            "miss": self.sample(
+                "cv_cache_requests_total", cache="llm_parse", result="miss"
+            ),
+            "hit": self.sample(
+                "cv_cache_requests_total", cache="llm_parse", result="hit"
+            ),
+            "in": self.sample("cv_llm_tokens_total", purpose="parse", direction="in"),
+            "out": self.sample("cv_llm_tokens_total", purpose="parse", direction="out"),
+            "count": self.sample("cv_stage_seconds_count", stage="llm_parse"),
+        }
+        client = StubClient('{"skills": ["metrics"]}')
+        openai_services.parse_resume_with_llm("metrics test cv", client=client)
+        openai_services.parse_resume_with_llm("metrics test cv", client=client)
+
+        self.assertEqual(
+            self.sample("cv_cache_requests_total", cache="llm_parse", result="miss"),
+            before["miss"] + 1,
+        )
+        self.assertEqual(
+            self.sample("cv_cache_requests_total", cache="llm_parse", result="hit"),
+            before["hit"] + 1,
+        )
+        self.assertEqual(
+            self.sample("cv_llm_tokens_total", purpose="parse", direction="in"),
+            before["in"] + 100,
+        )
+        self.assertEqual(
+            self.sample("cv_llm_tokens_total", purpose="parse", direction="out"),
+            before["out"] + 2,
+        )
+        self.assertEqual(
+            self.sample("cv_stage_seconds_count", stage="llm_parse"),
+            before["count"] + 1,
+        )
+
+    def test_chat_turn_sizes_are_recorded(self):
+        """Prompt, history and session sizes of each chat turn are exported"""
+        before = {
+            name: self.sample(f"{name}_count")
+            for name in (
+                "cv_chat_prompt_tokens",
+                "cv_chat_history_tokens",
+                "cv_chat_session_bytes",
+            )
+        }
+        session_bytes = self.sample("cv_chat_session_bytes_sum")
+        conversation = Conversation({})
+        messages = conversation.build_messages("Who knows Go?", [])
+        turn = conversation.record_reply("Who knows Go?", "Nobody.", messages)
+
+        for name, count in before.items():
+            self.assertEqual(self.sample(f"{name}_count"), count + 1, name)
+        self.assertEqual(
+            self.sample("cv_chat_session_bytes_sum"),
+            session_bytes + turn["session_bytes"],
+        )
+
+    def test_metrics_endpoint_exposes_request_latency(self):
+        """/metrics serves the Prometheus text format, including requests"""
+        self.client.get(reverse("upload_cv"))
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE cv_stage_seconds histogram", body)
+        self.assertIn(
+            'cv_http_request_seconds_count{method="GET",route="upload_cv"}', body
+        )
+
+    async def test_async_request_latency_is_recorded(self):
+        labels = {"route": "upload_cv", "method": "GET"}
+        before = self.sample("cv_http_request_seconds_count", **labels)
+        await self.async_client.get(reverse("upload_cv"))
+        self.assertEqual(
+            self.sample("cv_http_request_seconds_count", **labels), before + 1
+        )
+
+    def test_metrics_aggregate_across_processes(self):
+        """Samples written by other worker processes are summed"""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            for _ in range(2):
+                subprocess.run(
+                    [
+                        sys.executable,
+                        "-c",
+                        "from core import metrics; "
+                        "metrics.OCR_PAGES.labels('300').inc(3)",
+                    ],
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    check=True,
+                )
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+                body, _ = metrics.render_metrics()
+
+        self.assertIn(b'cv_ocr_pages_total{dpi="300"} 6.0', body)
@@ -0,0 +1,144 @@
+import hashlib
+import io
+import mmap
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+
+# Leading bytes of each supported CV format. DOCX files are ZIP archives.
+FILE_SIGNATURES = {
+    ".pdf": b"%PDF-",
+    ".docx": b"PK\x03\x04",
+}
+
+UNSUPPORTED_FILE_MESSAGE = "Only PDF and DOCX files are supported."
+MISMATCHED_FILE_MESSAGE = "The file content does not match its {} extension."
+
+
+def max_upload_size():
+    """
+    Returns the largest accepted CV upload in bytes.
+    """
+    return settings.CV_UPLOAD_MAX_MB * 1024 * 1024
+
+
+def too_large_message():
+    return f"File size should be less than {settings.CV_UPLOAD_MAX_MB} MB."
+
+
+def upload_errors(request):
+    """
+    Returns the {field_name: message} of files the upload handler rejected
+    while the request body was being read.
+    """
+    return getattr(request, "upload_errors", {})
+
+
+class CVUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded CVs to a temporary file while validating them chunk by
+    chunk.
+
+    Every chunk is fed into a SHA-256 digest and counted against
+    settings.CV_UPLOAD_MAX_MB, and the first bytes are checked against the
+    signature of the file's extension. Unsupported, mismatched or oversized
+    files are dropped as soon as that is known (the rest of their body is
+    read and discarded without buffering) and the reason is recorded in
+    request.upload_errors for the form to report. Accepted files carry their
+    digest as a sha256 attribute, so nothing needs to read them again to hash
+    them, and their memory use stays at one chunk regardless of size.
+    """
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        self.digest = hashlib.sha256()
+        self.received = 0
+        self.header = b""
+        extension = os.path.splitext(file_name)[1].lower()
+        self.signature = FILE_SIGNATURES.get(extension)
+        self.extension = extension
+        if self.signature is None:
+            self._reject(field_name, UNSUPPORTED_FILE_MESSAGE)
+        super().new_file(field_name, file_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > max_upload_size():
+            self._reject(self.field_name, too_large_message())
+        if len(self.header) < len(self.signature):
+            self.header += raw_data[: len(self.signature) - len(self.header)]
+            if not self.signature.startswith(self.header):
+                self._reject(self.field_name, self._mismatch_message())
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.header != self.signature:
+            # Too short to even hold the signature; SkipFile is not handled
+            # at this point, so drop the file by hand.
+            self.file.close()
+            self._record(self.field_name, self._mismatch_message())
+            return None
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+    def _mismatch_message(self):
+        return MISMATCHED_FILE_MESSAGE.format(self.extension)
+
+    def _record(self, field_name, message):
+        if self.request is not None:
+            if not hasattr(self.request, "upload_errors"):
+                self.request.upload_errors = {}
+            self.request.upload_errors[field_name] = message
+
+    def _reject(self, field_name, message):
+        self._record(field_name, message)
+        raise SkipFile(message)
+
+
+class MappedFile(io.RawIOBase):
+    """
+    A read-only, seekable file object over a memory-mapped file.
+
+    Reads are served from the page cache instead of a private buffer, so the
+    PDF/DOCX readers, the renderer and every OCR worker opening the same CV
+    share one copy of it.
+    """
+
+    def __init__(self, file_path):
+        super().__init__()
+        with open(file_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.name = file_path
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._map.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def tell(self):
+        return self._map.tell()
+
+    def close(self):
+        if not self.closed:
+            self._map.close()
+        super().close()
+
+
+def open_mapped(file_path):
+    """
+    Opens a stored file as a MappedFile; use it as a context manager so the
+    mapping is released afterwards.
+    """
+    return MappedFile(file_path)
@@ -1,8 +1,24 @@
 from django.urls import path
-from .views import upload_cv, candidate_view, handle_response
+from .views import (
+    upload_cv,
+    candidate_list,
+    candidate_view,
+    candidate_status,
+    handle_response,
+    chat_stream,
+    metrics_view,
+    search_candidates_view,
+    text_search_view,
+)
 
 urlpatterns = [
     path('', upload_cv, name='upload_cv'),
+    path('candidates/', candidate_list, name='candidate_list'),
     path('candidate/<int:pk>/', candidate_view, name='candidate_view'),
+    path('candidate/<int:pk>/status/', candidate_status, name='candidate_status'),
     path('chat/', handle_response, name='chat_prompt'),
+    path('chat/stream/', chat_stream, name='chat_stream'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('search/', search_candidates_view, name='search_candidates'),
+    path('search/text/', text_search_view, name='search_text'),
 ]
\ No newline at end of file
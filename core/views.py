@@ -1,124 +1,429 @@
 import json
 
-import openai
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.shortcuts import redirect, render
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
 
+from .conversation import Conversation
+from .embeddings import search_candidates
+from .extraction_cache import file_sha256
 from .forms import CandidateForm, PromptForm
+from .fulltext import InvalidSearchQuery, SearchUnavailable, search_text
+from .ingestion import CANDIDATE_FIELDS, enqueue_candidate, ingestion_status
+from .listing import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CandidateFilters,
+    InvalidQuery,
+    list_candidates,
+)
+from .llm_client import async_llm_client
+from .metrics import observe_stage, record_llm_usage, render_metrics
 from .models import Candidate
-from .ocr import extract_text_from_file
-from .openai_services import parse_resume_with_llm
+from .openai_services import CHAT_MODEL
+from .page_cache import candidate_page
+from .retrieval import aselect_relevant_candidates, select_relevant_candidates
+from .uploads import CVUploadHandler, upload_errors
 
 
 # Create your views here.
-def upload_cv(request):
+def _bind_upload(request):
+    """
+    Parses the multipart body (streamed to disk and hashed by
+    CVUploadHandler) and validates the CandidateForm. Returns the form and
+    the uploaded file's SHA-256, or None when the form is invalid or empty.
+    """
+    form = CandidateForm(
+        request.POST, request.FILES, upload_errors=upload_errors(request)
+    )
+    if not form.is_valid() or not form.cleaned_data["uploaded_file"]:
+        return form, None
+    uploaded_file = form.cleaned_data["uploaded_file"]
+    return form, getattr(uploaded_file, "sha256", None) or (
+        file_sha256(uploaded_file.chunks())
+    )
+
+
+@csrf_exempt
+async def upload_cv(request):
     """
     Handle the CV upload process.
 
     1. Renders a form (CandidateForm) to upload a CV (PDF or DOCX).
     2. On POST:
-       - Validates the form.
-       - Creates a Candidate model instance.
-       - Attempts to retrieve the file path; if no file, raises an error.
-       - Extracts text from the uploaded CV (OCR if needed).
-       - Sends the text to OpenAI GPT to parse into structured data (JSON).
-       - If parsing fails or an exception occurs, shows an error message and
-         deletes the Candidate.
-       - Otherwise, populates the Candidate fields from the parsed JSON and saves.
-       - Redirects to candidate_view on success.
+       - Validates the form. The file has already been streamed to disk by
+         CVUploadHandler, which hashes it and rejects oversized or
+         non-PDF/DOCX content before it is fully received.
+       - If no file was provided, shows an error.
+       - Creates a Candidate model instance in the "pending" state, recording
+         the SHA-256 of the uploaded content.
+       - Queues the Candidate for background ingestion, which extracts the
+         text (OCR if needed, reusing cached text for files seen before) and
+         parses it with OpenAI GPT into the Candidate fields.
+       - Redirects to candidate_view straight away; that page polls
+         candidate_status until ingestion is done or has failed.
+
+    The view is async: reading and hashing the upload and queueing the job
+    run in a worker thread (sync_to_async), the Candidate is saved through
+    the async ORM, and OCR and parsing happen on the ingestion executor, so
+    an ASGI worker keeps serving other requests meanwhile.
+
+    CVUploadHandler applies to this view only, so it is added to the
+    request's upload handlers before anything reads the body. The CSRF check
+    reads the body too, which is why it runs afterwards in _upload_cv
+    instead of in CsrfViewMiddleware.
     """
     if request.method == "POST":
-        form = CandidateForm(request.POST, request.FILES)
+        request.upload_handlers.insert(0, CVUploadHandler(request))
+        # Parse the multipart body in a worker thread, not on the event loop.
+        await sync_to_async(getattr)(request, "FILES")
+    return await _upload_cv(request)
+
+
+@csrf_protect
+async def _upload_cv(request):
+    if request.method == "POST":
+        form, file_hash = await sync_to_async(_bind_upload)(request)
         if form.is_valid():
-            candidate = form.save()
-            try:
-                file_path = candidate.uploaded_file.path
-            except ValueError:
+            if file_hash is None:
                 messages.error(
                     request, "No file was provided, Upload a PDF or DOCX file."
                 )
-                candidate.delete()
-                return redirect("upload_cv")
-            extracted_text = extract_text_from_file(file_path)
-            try:
-                candidate_data = json.loads(parse_resume_with_llm(extracted_text))
-            except json.JSONDecodeError:
-                messages.error(
-                    request,
-                    "We encountered an issue parsing your CV. Please try again.",
-                )
-                candidate.delete()
-                return redirect("upload_cv")
-            except Exception as e:
-                messages.error(request, f"An unexpected error occurred: {str(e)}")
-                candidate.delete()
                 return redirect("upload_cv")
-
-            candidate.personal_info = candidate_data["personal_info"]
-            candidate.education = candidate_data["education"]
-            candidate.work_experience = candidate_data["work_experience"]
-            candidate.skills = candidate_data["skills"]
-            candidate.projects = candidate_data["projects"]
-            candidate.certificates = candidate_data["certificates"]
-            candidate.save()
+            candidate = form.save(commit=False)
+            candidate.status = Candidate.Status.PENDING
+            candidate.file_hash = file_hash
+            with observe_stage("upload_save"):
+                await candidate.asave()
+            await sync_to_async(enqueue_candidate)(candidate.id, candidate.file_hash)
             return redirect("candidate_view", pk=candidate.id)
     else:
         form = CandidateForm()
 
-    return render(request, "core/upload.html", {"form": form})
+    return await sync_to_async(render)(request, "core/upload.html", {"form": form})
 
 
 def candidate_view(request, pk):
     """
     Display the parsed CV data for a single Candidate.
+
+    The rendered page is cached per candidate and updated_at (see
+    page_cache.candidate_page), so repeat views only read updated_at.
+    Responses carry an ETag and Last-Modified and ask browsers to
+    revalidate; a matching If-None-Match or If-Modified-Since gets a 304
+    with no body. Unknown candidates are a 404.
+    """
+    html, etag, updated_at = candidate_page(pk)
+    last_modified = int(updated_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(html)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def candidate_status(request, pk):
+    """
+    Report the ingestion status of a Candidate as JSON.
+
+    Returns pending, processing, done or failed along with the error message
+    (if any), queue/start/finish timestamps and per-stage timings.
+    """
+    candidate = get_object_or_404(Candidate, pk=pk)
+    return JsonResponse(ingestion_status(candidate))
+
+
+def candidate_list(request):
+    """
+    Paginated candidate listing/search, returned as JSON.
+
+    Query parameters (all optional, repeatable ones are ANDed):
+      - skill, company, degree: exact (case-insensitive) matches against the
+        candidate's indexed terms.
+      - created_from, created_to: inclusive date or datetime bounds.
+      - status: pending, processing, done or failed.
+      - name, email: exact match on the normalized name/email columns.
+      - min_experience_months, max_experience_months, min_skill_count:
+        inclusive bounds on the derived columns.
+      - page_size: rows per page (default 20, max 100).
+      - cursor: the next_cursor of the previous page.
+
+    Results are newest first and use keyset pagination (see
+    listing.list_candidates); the JSON columns are not loaded, only the id,
+    name, status and timestamps.
+    """
+    try:
+        page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise InvalidQuery(f"page_size must be between 1 and {MAX_PAGE_SIZE}.")
+        filters = CandidateFilters.from_query(request.GET)
+        candidates, next_cursor = list_candidates(
+            filters, request.GET.get("cursor"), page_size
+        )
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except ValueError:
+        return JsonResponse({"error": "page_size must be an integer."}, status=400)
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        next_url = f"{request.path}?{params.urlencode()}"
+    results = [
+        {
+            "id": candidate.pk,
+            "name": candidate.name,
+            "status": candidate.status,
+            "latest_title": candidate.latest_title,
+            "experience_months": candidate.experience_months,
+            "skill_count": candidate.skill_count,
+            "created_at": candidate.created_at.isoformat(),
+            "updated_at": candidate.updated_at.isoformat(),
+            "url": reverse("candidate_view", args=[candidate.pk]),
+        }
+        for candidate in candidates
+    ]
+    return JsonResponse(
+        {"results": results, "next_cursor": next_cursor, "next": next_url}
+    )
+
+
+def _serialize_candidates(candidate_ids, rows):
+    rows = {row["id"]: row for row in rows}
+    return json.dumps(
+        [rows[pk] for pk in candidate_ids if pk in rows], separators=(",", ":")
+    )
+
+
+def _candidate_context(prompt):
+    """
+    Serializes the candidates relevant to the prompt for the LLM, most
+    relevant first, as compact JSON. The same question over the same data
+    always gives the same bytes.
+    """
+    candidate_ids = select_relevant_candidates(prompt)
+    rows = Candidate.objects.filter(pk__in=candidate_ids).values(
+        "id", *CANDIDATE_FIELDS
+    )
+    return _serialize_candidates(candidate_ids, rows)
+
+
+async def _acandidate_context(prompt):
+    """
+    Async version of _candidate_context, using the async ORM.
     """
-    candidate = Candidate.objects.get(pk=pk)
-    return render(request, "core/candidate.html", {"candidate": candidate})
+    candidate_ids = await aselect_relevant_candidates(prompt)
+    rows = Candidate.objects.filter(pk__in=candidate_ids).values(
+        "id", *CANDIDATE_FIELDS
+    )
+    return _serialize_candidates(candidate_ids, [row async for row in rows])
 
 
-def handle_response(request):
+async def handle_response(request):
     """
     Provide a chatbot-like interface for querying candidate data.
 
-    The conversation history is kept in session under "messages".
-    - Each user prompt is appended as a 'user' role message.
-    - The code then calls OpenAI (gpt-4o model) with these messages.
-    - The assistant's reply is stored as "assistant" role, and
+    The conversation history is kept in session under "messages" (see
+    conversation.Conversation).
+    - Only the candidates relevant to the prompt (see
+      retrieval.select_relevant_candidates) are included as context, so the
+      prompt size does not grow with the Candidate table.
+    - The static CHAT_PROMPT system message and the stored history come
+      first, then the prompt with that context last, so the provider can
+      cache everything before it.
+    - The code then awaits OpenAI (gpt-4o model) with these messages
+      through the rate-governed async_llm_client() of the event loop.
+    - Only the compact prompt and the assistant's reply are stored, the
+      history is trimmed to CHAT_HISTORY_TOKEN_BUDGET, and the reply is
       saved to session under "final_response" for display.
+
+    The view is async: the session and the candidates are read through the
+    async APIs and the LLM call is awaited, so under ASGI a single worker
+    serves many chats that are waiting on the model at once.
+
+    The page submits to chat_stream when the browser supports streaming;
+    this view remains the non-streaming fallback.
     """
-    messages = request.session.get("messages", [])
     if request.method == "POST":
         form = PromptForm(request.POST)
         if form.is_valid():
-            candidate_data = Candidate.objects.values(
-                "personal_info",
-                "education",
-                "work_experience",
-                "skills",
-                "projects",
-                "certificates",
-            )
             prompt = form.cleaned_data["prompt"]
-            messages.append(
-                {
-                    "role": "user",
-                    "content": f"You have access to this dataset of candidate resumes:{candidate_data}, THe user is asking: {prompt}, Answer only using the data above, or say 'not found' if unavaialble.",
-                }
-            )
-            response = openai.chat.completions.create(
-                model="gpt-4o-2024-08-06", messages=messages
+            conversation = await Conversation.aload(request.session)
+            messages = conversation.build_messages(
+                prompt, await _acandidate_context(prompt)
             )
+            with observe_stage("llm_chat"):
+                response = await async_llm_client().chat.completions.create(
+                    model=CHAT_MODEL, messages=messages
+                )
+            record_llm_usage("chat", getattr(response, "usage", None))
             final_response = response.choices[0].message.content
-            messages.append({"role": "assistant", "content": final_response})
-            request.session["final_response"] = final_response
-            request.session["messages"] = messages
+            conversation.record_reply(prompt, final_response, messages)
             return redirect("chat_prompt")
     else:
         form = PromptForm()
-    final_response = request.session.get("final_response", "")
+    final_response = await request.session.aget("final_response", "")
 
-    return render(
+    return await sync_to_async(render)(
         request,
         "core/handle_response.html",
         {"form": form, "final_response": final_response},
     )
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@require_POST
+async def chat_stream(request):
+    """
+    Streaming variant of handle_response, using Server-Sent Events.
+
+    Each content delta from the streamed chat completion is sent as
+    `data: {"delta": "..."}` as soon as it arrives, followed by an
+    `event: done` message. Once the stream ends the full reply is stored in
+    the session history, exactly as handle_response does. The session is
+    saved explicitly because SessionMiddleware has already run by the time
+    the body is streamed.
+
+    The view and its body are async, so under ASGI each delta is sent as it
+    arrives from async_llm_client(); a sync body would be buffered whole.
+    """
+    form = PromptForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    prompt = form.cleaned_data["prompt"]
+    conversation = await Conversation.aload(request.session)
+    messages = conversation.build_messages(prompt, await _acandidate_context(prompt))
+    # Touch the session so SessionMiddleware issues the cookie now; the reply
+    # is saved under the same session key once the stream ends.
+    request.session["messages"] = conversation.history
+
+    async def event_stream():
+        parts = []
+        timer = observe_stage("llm_chat")
+        try:
+            with timer:
+                stream = await async_llm_client().chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    # The final chunk carries token usage and no choices.
+                    record_llm_usage("chat", getattr(chunk, "usage", None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield _sse({"delta": delta})
+        except Exception as e:
+            yield _sse({"error": f"An unexpected error occurred: {str(e)}"}, "error")
+            return
+
+        conversation.record_reply(prompt, "".join(parts), messages)
+        await request.session.asave()
+        yield _sse({}, "done")
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def search_candidates_view(request):
+    """
+    Semantic candidate search, returned as JSON.
+
+    Query parameters:
+      - q: free-text description of the profile being looked for, or
+      - like: id of a Candidate to find similar candidates to.
+      - k: number of results (default 10, clamped to 1..100).
+    """
+    try:
+        k = max(1, min(int(request.GET.get("k", 10)), 100))
+        like = request.GET.get("like")
+        like = int(like) if like else None
+    except ValueError:
+        return JsonResponse({"error": "k and like must be integers."}, status=400)
+    text = request.GET.get("q", "")
+    if not text and like is None:
+        return JsonResponse({"error": "Provide either q or like."}, status=400)
+
+    matches = search_candidates(text=text, like=like, k=k)
+    names = dict(
+        Candidate.objects.filter(pk__in=[pk for pk, _ in matches]).values_list(
+            "pk", "personal_info__name"
+        )
+    )
+    results = [
+        {"id": pk, "name": names.get(pk), "score": round(score, 4)}
+        for pk, score in matches
+        if pk in names
+    ]
+    return JsonResponse({"results": results})
+
+
+def text_search_view(request):
+    """
+    Keyword search over the raw text of the uploaded CVs, returned as JSON.
+
+    Query parameters:
+      - q: the query. On SQLite this is FTS5 syntax, e.g.
+        `python AND (django OR flask) NOT java`, `"machine learning"` or
+        `kube*`; on PostgreSQL it is web-search syntax.
+      - limit: number of results (default 20, clamped to 1..100).
+
+    Results are ranked with BM25 (ts_rank_cd on PostgreSQL) and include a
+    snippet with the matching terms in [brackets]. No LLM call is made.
+    """
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "Provide a query in q."}, status=400)
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+
+    try:
+        matches = search_text(query, limit)
+    except InvalidSearchQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except SearchUnavailable as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    names = dict(
+        Candidate.objects.filter(pk__in=[m.candidate_id for m in matches]).values_list(
+            "pk", "personal_info__name"
+        )
+    )
+    results = [
+        {
+            "id": match.candidate_id,
+            "name": names.get(match.candidate_id),
+            "score": round(match.score, 4),
+            "snippet": match.snippet,
+        }
+        for match in matches
+    ]
+    return JsonResponse({"results": results})
+
+
+def metrics_view(request):
+    """
+    Expose the ingestion, OCR, cache, LLM and request metrics (see
+    core.metrics) in the Prometheus text format.
+    """
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
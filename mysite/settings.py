@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "core.middleware.RateLimitMiddleware",
@@ -126,12 +127,50 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Largest CV upload_cv accepts; CVUploadHandler enforces it while streaming.
+CV_UPLOAD_MAX_MB = env.int("CV_UPLOAD_MAX_MB", default=5)
+
 OPENAI_KEY = os.environ.get("OPENAI_KEY")
 TESSERACT_CMD = env("TESSERACT_CMD", default="tesseract")
+OCR_MAX_WORKERS = env.int("OCR_MAX_WORKERS", default=os.cpu_count() or 1)
+# Adaptive OCR renders scanned pages at increasing DPI until Tesseract's mean
+# word confidence reaches the threshold. Disable to always OCR at 400 DPI.
+OCR_ADAPTIVE = env.bool("OCR_ADAPTIVE", default=True)
+OCR_DPI_STEPS = env.list("OCR_DPI_STEPS", cast=int, default=[200, 300, 400])
+OCR_CONFIDENCE_THRESHOLD = env.int("OCR_CONFIDENCE_THRESHOLD", default=80)
+
+# Background CV ingestion. With INGESTION_EAGER on, uploads are processed
+# inside the request instead of on the worker pool.
+INGESTION_MAX_WORKERS = env.int("INGESTION_MAX_WORKERS", default=4)
+INGESTION_EAGER = env.bool("INGESTION_EAGER", default=False)
+
+# Upper bound on how many candidates are sent to the LLM per chat question.
+CHAT_MAX_CANDIDATES = env.int("CHAT_MAX_CANDIDATES", default=20)
+# Token budget for the stored chat history; older turns are evicted beyond it.
+CHAT_HISTORY_TOKEN_BUDGET = env.int("CHAT_HISTORY_TOKEN_BUDGET", default=2000)
+
+# Semantic candidate search. EMBEDDING_BACKEND is any class taking `dim` and
+# exposing `embed(texts)`; the default hashing embedder runs fully offline.
+EMBEDDING_BACKEND = env("EMBEDDING_BACKEND", default="core.embeddings.HashingEmbedder")
+EMBEDDING_DIM = env.int("EMBEDDING_DIM", default=256)
+EMBEDDING_INDEX_DIR = env(
+    "EMBEDDING_INDEX_DIR", default=str(BASE_DIR / "cache" / "vectors")
+)
 
 # Rate limiting settings
 RATE_LIMIT_PER_MINUTE = env.int("RATE_LIMIT_PER_MINUTE", default=20)
 RATE_LIMIT_WINDOW_SECONDS = env.int("RATE_LIMIT_WINDOW_SECONDS", default=3600)
+# One of fixed_window, sliding_window or token_bucket.
+RATE_LIMIT_ALGORITHM = env("RATE_LIMIT_ALGORITHM", default="sliding_window")
+RATE_LIMIT_CACHE_ALIAS = "default"
+# Per-route budgets keyed by URL name, separate from the default budget above.
+# Set a route to None to exempt it entirely.
+RATE_LIMIT_ROUTES = {
+    "candidate_view": {"limit": 300, "window": 60},
+    "candidate_status": {"limit": 300, "window": 60},
+    "candidate_list": {"limit": 120, "window": 60},
+    "metrics": None,
+}
 
 CACHES = {
     "default": {
@@ -140,5 +179,68 @@ CACHES = {
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         },
-    }
+    },
+    # Local disk tier for extracted CV text, keyed by file content hash.
+    "extraction": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": env(
+            "EXTRACTION_CACHE_LOCATION", default=str(BASE_DIR / "cache" / "extraction")
+        ),
+        "TIMEOUT": env.int("EXTRACTION_CACHE_TIMEOUT", default=60 * 60 * 24 * 30),
+        "OPTIONS": {
+            "MAX_ENTRIES": env.int("EXTRACTION_CACHE_MAX_ENTRIES", default=5000),
+        },
+    },
 }
+
+EXTRACTION_CACHE_ALIAS = env("EXTRACTION_CACHE_ALIAS", default="extraction")
+
+# Memoized LLM parse results, keyed by normalized-text fingerprint.
+LLM_PARSE_CACHE_ALIAS = env("LLM_PARSE_CACHE_ALIAS", default="default")
+LLM_PARSE_CACHE_TIMEOUT = env.int("LLM_PARSE_CACHE_TIMEOUT", default=60 * 60 * 24 * 30)
+
+# Rendered candidate pages, keyed by candidate and updated_at; superseded
+# entries expire after CANDIDATE_PAGE_CACHE_TIMEOUT.
+CANDIDATE_PAGE_CACHE_ALIAS = env("CANDIDATE_PAGE_CACHE_ALIAS", default="default")
+CANDIDATE_PAGE_CACHE_TIMEOUT = env.int(
+    "CANDIDATE_PAGE_CACHE_TIMEOUT", default=60 * 60 * 24
+)
+
+# Long CVs are split at their section headings and parsed with concurrent,
+# smaller schema calls (at most LLM_PARSE_CONCURRENCY in flight per CV).
+LLM_SECTION_PARSE = env.bool("LLM_SECTION_PARSE", default=True)
+LLM_SECTION_PARSE_MIN_CHARS = env.int("LLM_SECTION_PARSE_MIN_CHARS", default=6000)
+LLM_SECTION_MAX_CHARS = env.int("LLM_SECTION_MAX_CHARS", default=4000)
+LLM_PARSE_CONCURRENCY = env.int("LLM_PARSE_CONCURRENCY", default=4)
+
+# Rule-based pre-parsing (core.preparse): contact details and regular
+# sections are read locally and only the remaining fields are sent to the
+# LLM, which is skipped entirely when nothing is left.
+LLM_PREPARSE = env.bool("LLM_PREPARSE", default=True)
+
+# Near-duplicate CV detection (core.dedupe). New uploads whose MinHash
+# similarity to an existing candidate reaches DEDUP_THRESHOLD (or
+# DEDUP_IDENTITY_THRESHOLD when they share an email or phone number) are
+# flagged as duplicates of the new one, merged into it, or left alone.
+DEDUP_ACTION = env("DEDUP_ACTION", default="flag")  # flag, merge or off
+DEDUP_THRESHOLD = env.float("DEDUP_THRESHOLD", default=0.8)
+DEDUP_IDENTITY_THRESHOLD = env.float("DEDUP_IDENTITY_THRESHOLD", default=0.5)
+
+# Shared LLM client (core.llm_client). OPENAI_BASE_URL points it at another
+# OpenAI-compatible server, e.g. the fake server used by the benchmarks.
+OPENAI_BASE_URL = env("OPENAI_BASE_URL", default=None)
+LLM_TIMEOUT = env.float("LLM_TIMEOUT", default=60.0)
+LLM_CONNECT_TIMEOUT = env.float("LLM_CONNECT_TIMEOUT", default=5.0)
+LLM_MAX_RETRIES = env.int("LLM_MAX_RETRIES", default=4)
+LLM_BACKOFF_BASE = env.float("LLM_BACKOFF_BASE", default=0.5)
+LLM_BACKOFF_MAX = env.float("LLM_BACKOFF_MAX", default=30.0)
+# Process-wide caps, matched to the OpenAI tier (tier 1 gpt-4o: 500 RPM,
+# 30,000 TPM). Set a per-minute budget to 0 to disable it.
+LLM_MAX_CONCURRENCY = env.int("LLM_MAX_CONCURRENCY", default=16)
+LLM_MAX_CONNECTIONS = env.int("LLM_MAX_CONNECTIONS", default=LLM_MAX_CONCURRENCY)
+LLM_TOKENS_PER_MINUTE = env.int("LLM_TOKENS_PER_MINUTE", default=30000)
+LLM_REQUESTS_PER_MINUTE = env.int("LLM_REQUESTS_PER_MINUTE", default=500)
+# Completion size assumed when a request sets no max_tokens.
+LLM_EXPECTED_COMPLETION_TOKENS = env.int("LLM_EXPECTED_COMPLETION_TOKENS", default=1000)
+# Identical requests already in flight share one call.
+LLM_COALESCE = env.bool("LLM_COALESCE", default=True)